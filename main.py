@@ -1,5 +1,5 @@
 import uvicorn
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, HTTPException, WebSocket
 from fastapi.responses import HTMLResponse
 import webthing
 from webthing import (
@@ -18,8 +18,17 @@ import logging
 import time
 import uuid
 import asyncio
+import functools
+import numpy as np
 from typing import Dict
-from plugins.vmb_camera.api import VmbCamera
+
+try:
+    from oicp_server.settings import get_settings
+except ImportError:
+    # run from the repo root without oicp_server installed, the outer
+    # directory is a namespace package around the real one
+    from oicp_server.oicp_server.settings import get_settings
+from plugins.vmb_camera.manager import CameraManager
 
 app = FastAPI()
 
@@ -88,6 +97,32 @@ class CaptureAction(Action):
         )
 
 
+class HdrCaptureAction(Action):
+    def __init__(self, thing, input_):
+        Action.__init__(self, uuid.uuid4().hex, thing, "hdr_capture", input_=input_)
+
+    async def perform_action(self):
+        print(f"action: id={self.id}, name={self.name}")
+        radiance = await self.thing.camera.capture_hdr(
+            self.id, self.input["exposures"]
+        )
+        await asyncio.get_running_loop().run_in_executor(
+            None, np.save, f"hdr_{self.id}.npy", radiance
+        )
+
+
+class AutoExposeAction(Action):
+    def __init__(self, thing, input_):
+        Action.__init__(self, uuid.uuid4().hex, thing, "auto_expose", input_=input_)
+
+    async def perform_action(self):
+        print(f"action: id={self.id}, name={self.name}")
+        params = dict(self.input or {})
+        exposure = params.pop("exposure_time_hint", None)
+        result = await self.thing.camera.auto_expose(exposure, **params)
+        self.thing.auto_exposure.notify_of_external_update(result)
+
+
 class InitAction(Action):
     def __init__(self, thing, input_):
         Action.__init__(self, uuid.uuid4().hex, thing, "init", input_=input_)
@@ -143,15 +178,20 @@ class DisarmAction(Action):
 
 
 class MyThing(Thing):
-    def __init__(self):
+    def __init__(self, camera, camera_id: str | None = None):
         super().__init__(
-            "urn:dev:ops:my-lamp-1234",
+            "urn:dev:ops:my-lamp-1234"
+            if camera_id is None
+            else "urn:dev:ops:my-lamp-1234:{}".format(camera_id),
             "My Lamp",
             ["OnOffSwitch", "Light"],
             "A web connected lamp",
         )
 
-        self.camera = VmbCamera()
+        self.camera = camera
+        self.camera.on("statistics", self.on_statistics)
+        # the server loop, set once it runs
+        self.loop: asyncio.AbstractEventLoop | None = None
 
         self.add_property(
             Property(
@@ -183,6 +223,81 @@ class MyThing(Thing):
             )
         )
 
+        self.statistics = Value({})
+        self.add_property(
+            Property(
+                self,
+                "statistics",
+                self.statistics,
+                metadata={
+                    "title": "Frame statistics",
+                    "type": "object",
+                    "description": "Mean, extremes, saturation, percentiles and histogram of the last frame",
+                    "readOnly": True,
+                },
+            )
+        )
+
+        self.writer = Value(self.camera.writer.metrics())
+        self.add_property(
+            Property(
+                self,
+                "writer",
+                self.writer,
+                metadata={
+                    "title": "Frame writer",
+                    "type": "object",
+                    "description": "Queue depth and counters of the background frame writer",
+                    "readOnly": True,
+                },
+            )
+        )
+
+        self.acquisition = Value({})
+        self.add_property(
+            Property(
+                self,
+                "acquisition",
+                self.acquisition,
+                metadata={
+                    "title": "Acquisition queue",
+                    "type": "object",
+                    "description": "Depth and produced, consumed and dropped counts of the frame queue",
+                    "readOnly": True,
+                },
+            )
+        )
+
+        self.trigger_latency = Value({})
+        self.add_property(
+            Property(
+                self,
+                "trigger_latency",
+                self.trigger_latency,
+                metadata={
+                    "title": "Trigger latency",
+                    "type": "object",
+                    "description": "Median, 90th percentile and maximum time from software trigger to frame arrival, over recent triggers",
+                    "readOnly": True,
+                },
+            )
+        )
+
+        self.auto_exposure = Value({})
+        self.add_property(
+            Property(
+                self,
+                "auto_exposure",
+                self.auto_exposure,
+                metadata={
+                    "title": "Auto-exposure",
+                    "type": "object",
+                    "description": "Resulting exposure time and per-iteration statistics of the last auto_expose",
+                    "readOnly": True,
+                },
+            )
+        )
+
         self.add_available_action(
             "fade",
             {
@@ -264,6 +379,18 @@ class MyThing(Thing):
                             "minimum": 0,
                             "unit": "microseconds",
                         },
+                        "pixel_format": {
+                            "type": "string",
+                            "enum": ["Mono8", "Mono10", "Mono12", "Mono10p", "Mono12p"],
+                            "default": "Mono8",
+                            "description": "Checked against the formats the camera supports",
+                        },
+                        "ring_size": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "default": 16,
+                            "description": "Frame buffers allocated for the stream",
+                        },
                     },
                 },
             },
@@ -298,6 +425,67 @@ class MyThing(Thing):
             CaptureAction,
         )
 
+        self.add_available_action(
+            "hdr_capture",
+            {
+                "title": "HDR capture",
+                "description": "Capture an exposure bracket on the armed camera and merge it into a float32 radiance map.",
+                "input": {
+                    "type": "object",
+                    "required": ["exposures"],
+                    "properties": {
+                        "exposures": {
+                            "type": "array",
+                            "minItems": 1,
+                            "items": {
+                                "type": "integer",
+                                "minimum": 1,
+                                "maximum": 1000000,
+                                "unit": "us",
+                            },
+                        }
+                    },
+                },
+            },
+            HdrCaptureAction,
+        )
+
+        self.add_available_action(
+            "auto_expose",
+            {
+                "title": "Auto-expose",
+                "description": "Find the integration time that puts a percentile of the frame at a target level, on the armed camera.",
+                "input": {
+                    "type": "object",
+                    "properties": {
+                        "exposure_time_hint": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 1000000,
+                            "unit": "us",
+                        },
+                        "target": {
+                            "type": "number",
+                            "exclusiveMinimum": 0,
+                            "maximum": 1,
+                            "description": "Target level as a fraction of full scale",
+                        },
+                        "percentile": {
+                            "type": "number",
+                            "minimum": 0,
+                            "maximum": 100,
+                        },
+                        "step": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "description": "Decimation of the frame for the statistics",
+                        },
+                    },
+                },
+            },
+            AutoExposeAction,
+        )
+
         self.add_available_event(
             "overheated",
             {
@@ -307,8 +495,46 @@ class MyThing(Thing):
             },
         )
 
+    def on_statistics(self, statistics):
+        # emitted on the camera's statistics thread, while the properties'
+        # subscribers are served from the server loop
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.publish_statistics, statistics)
+
+    def publish_statistics(self, statistics):
+        self.statistics.notify_of_external_update(statistics.as_dict())
+        self.writer.notify_of_external_update(self.camera.writer.metrics())
+        if self.camera.frame_queue is not None:
+            self.acquisition.notify_of_external_update(self.camera.frame_queue.metrics())
+        self.trigger_latency.notify_of_external_update(self.camera.trigger_latency.metrics())
+
+
+# one thing per camera, each camera on its own thread and event loop
+settings = get_settings()
+if settings.camera_backend == "simulated":
+    from plugins.sim_camera.api import SimulatedCamera
+
+    camera_manager = CameraManager(
+        functools.partial(SimulatedCamera.from_settings, settings=settings),
+        lambda: [f"sim{i}" for i in range(settings.sim_cameras)],
+    )
+else:
+    camera_manager = CameraManager()
+camera_manager.start()
+things = MultipleThings(
+    [
+        MyThing(camera, camera_id)
+        for camera_id, camera in zip(camera_manager.threads, camera_manager.cameras)
+    ],
+    "OICP cameras",
+)
+thing = things.get_thing(0)
+
 
-thing = MyThing()
+@app.on_event("startup")
+async def bind_server_loop():
+    for t in things.get_things():
+        t.loop = asyncio.get_running_loop()
 
 ws = None
 
@@ -329,11 +555,28 @@ async def websocket_endpoint(websocket: WebSocket):
         await websocket.send_text(f"Message text was: {data}")
 
 
+def get_thing(idx) -> MyThing:
+    t = things.get_thing(idx)
+    if t is None:
+        raise HTTPException(status_code=404, detail="no thing {}".format(idx))
+    return t
+
+
+@app.get("/things")
+async def get_things():
+    return [t.as_thing_description() for t in things.get_things()]
+
+
 @app.get("/properties")
 async def get_properties():
     return thing.get_properties()
 
 
+@app.get("/things/{idx}/properties")
+async def get_thing_properties(idx: int):
+    return get_thing(idx).get_properties()
+
+
 @app.put("/properties/{property_name}")
 async def put_property_by_name(property_name: str, p: int):
     print(property_name)
@@ -341,6 +584,11 @@ async def put_property_by_name(property_name: str, p: int):
     thing.set_property(property_name, p)
 
 
+@app.put("/things/{idx}/properties/{property_name}")
+async def put_thing_property_by_name(idx: int, property_name: str, p: int):
+    get_thing(idx).set_property(property_name, p)
+
+
 @app.get("/properties/{property_name}")
 async def get_property_by_name(property_name: str):
     print(property_name)
@@ -348,21 +596,46 @@ async def get_property_by_name(property_name: str):
     return {property_name: p}
 
 
+@app.get("/things/{idx}/properties/{property_name}")
+async def get_thing_property_by_name(idx: int, property_name: str):
+    return {property_name: get_thing(idx).get_property(property_name)}
+
+
 @app.get("/actions")
 async def get_actions():
     return thing.get_action_descriptions()
 
 
+@app.get("/things/{idx}/actions")
+async def get_thing_actions(idx: int):
+    return get_thing(idx).get_action_descriptions()
+
+
 @app.get("/actions/{action_name}/{action_id}")
 async def get_action_by_name_id(action_name: str, action_id: str):
     action = thing.get_action(action_name, action_id)
     return action.as_action_description()
 
 
-@app.post("/actions/{action_name}")
-async def post_actions(action_name: str, input: dict | None = None):
-    if action_name in ["capture", "init", "deinit", "arm", "disarm", "open", "close"]:
-        action = thing.create_action(action_name, input)
+@app.get("/things/{idx}/actions/{action_name}/{action_id}")
+async def get_thing_action_by_name_id(idx: int, action_name: str, action_id: str):
+    action = get_thing(idx).get_action(action_name, action_id)
+    return action.as_action_description()
+
+
+def start_action(t: MyThing, action_name: str, input: dict | None):
+    if action_name in [
+        "capture",
+        "hdr_capture",
+        "auto_expose",
+        "init",
+        "deinit",
+        "arm",
+        "disarm",
+        "open",
+        "close",
+    ]:
+        action = t.create_action(action_name, input)
         response = action.as_action_description()
 
     # asyncio.get_event_loop().run_in_executor(None, action.start)
@@ -377,6 +650,16 @@ async def post_actions(action_name: str, input: dict | None = None):
     return response
 
 
+@app.post("/actions/{action_name}")
+async def post_actions(action_name: str, input: dict | None = None):
+    return start_action(thing, action_name, input)
+
+
+@app.post("/things/{idx}/actions/{action_name}")
+async def post_thing_actions(idx: int, action_name: str, input: dict | None = None):
+    return start_action(get_thing(idx), action_name, input)
+
+
 @app.get("/events/{event_name}")
 async def get_event_by_name(event_name: str):
     return thing.get_event_descriptions(event_name)
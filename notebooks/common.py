@@ -5,6 +5,7 @@ from scipy.ndimage import rotate
 import PIL
 import matplotlib.pyplot as plt
 import math
+from functools import lru_cache
 from scipy.fft import fft, fftfreq, fftshift
 
 def a(b):
@@ -33,16 +34,26 @@ def get_roi(image, topleft, bottomright):
     return (roi_image, roi)
 
 # get_hamming
+def hamming_window(window_width, mid):
+    wid = np.maximum(mid, window_width - 1 - mid)
+    return 0.54 + 0.45 * np.cos(np.pi * (np.arange(window_width) - mid) / wid)
+
+# windows depend on (window_width, mid) only; cached arrays are read-only
+@lru_cache(maxsize=128)
+def cached_hamming(window_width, mid):
+    data = hamming_window(window_width, mid)
+    data.flags.writeable = False
+    return data
+
 def get_hamming(window_width, mid = None):
+    # only centred and whole-sample windows repeat; a fitted edge position is
+    # a fresh float on every line and would only churn the cache. An array of
+    # centres shaped (n, 1) gives one window per row in a single call.
     if mid is None:
         mid = (window_width - 1) / 2
-        
-    wid1 = mid
-    wid2 = window_width - 1 - mid
-    wid = max(wid1, wid2)
-    pie = math.pi
-    data = [0.54+0.45*math.cos(pie*(i-mid)/wid) for i in range(window_width)]
-    return data
+    if np.ndim(mid) == 0 and float(mid) * 2 == round(float(mid) * 2):
+        return cached_hamming(int(window_width), float(mid))
+    return hamming_window(window_width, np.asarray(mid, dtype=np.float64))
 
 # get_deriv1
 def get_deriv1(a, fil):
@@ -54,13 +65,12 @@ def get_deriv1(a, fil):
 # get_centroid
 def get_centroid(a): 
 #     print(a.shape)
-    dist = np.arange(a.shape[1])
+    dist = np.arange(a.shape[1], dtype=np.float64)
     # print(dist.shape)
     weight = a
-    moment = weight * dist
-#     print(moment.shape)
     weight_sum = np.sum(weight, axis=1)
-    moment_sum = np.sum(moment, axis=1)
+    # matrix-vector product instead of a full-size weight * dist temporary
+    moment_sum = weight @ dist
     result = moment_sum/weight_sum
     return result
 
@@ -69,6 +79,7 @@ def get_polyfit(x, y, deg):
     p = np.polyfit(x, y, deg, full=False)
     return p
 
+@lru_cache(maxsize=128)
 def get_fir2fix(n, m):
     """
     n = frequency data length [0-half-sampling (Nyquist) frequency]
@@ -79,12 +90,12 @@ def get_fir2fix(n, m):
     returns: nxl MTF correction array (limited to a maximum of 10)
     """
     m = m - 1
-    scale = 1
-    correct = [abs((math.pi * (i+1) * m/(2*(n+1)))/math.sin(math.pi*(i+1)*m/(2*(n+1)))) for i in range(n)]
+    x = np.pi * np.arange(1, n + 1) * m / (2 * (n + 1))
+    correct = np.abs(x / np.sin(x))
     correct[0] = 1
-    correct = np.array(correct)
     gt10 = correct > 10
     correct[gt10] = 10
+    correct.flags.writeable = False
     return correct
     
 def project2(ary, fit, fac = 4):
@@ -5,11 +5,14 @@ import numpy as np
 import cv2
 from uuid import uuid4
 
+from pipeline.averaging import FrameAverager
+
 os.environ["PYLON_CAMEMU"] = "1"
 
 class Basler:
     def init_controller(self):
         self.cam = pylon.InstantCamera(pylon.TlFactory.GetInstance().CreateFirstDevice())
+        self.noise = None
 
     def init_dector(self, controller=None):
         self.cam.Open()
@@ -17,11 +20,37 @@ class Basler:
     def commit_settings(self, param):
         pass
 
-    def grab_data(self, naverage):
-        result = self.cam.GrabOne(100)
-        print("Mean Gray value:", np.mean(result.Array[0:20, 0]))
-        cv2.imwrite(f'test_{uuid4().hex}.png', result.Array)
-        return result.Array
+    def grab_data(self, naverage=1):
+        """
+        Grab naverage frames and return their per-pixel float32 mean.
+
+        Each frame is folded into a FrameAverager as it is retrieved, so
+        memory stays at a few frame-sized arrays however many frames are
+        averaged. The per-pixel temporal noise is left in self.noise when
+        two or more frames were grabbed.
+        """
+        if naverage < 1:
+            raise ValueError("naverage must be positive")
+        averager = None
+        self.cam.StartGrabbingMax(naverage)
+        try:
+            while self.cam.IsGrabbing():
+                result = self.cam.RetrieveResult(1000, pylon.TimeoutHandling_ThrowException)
+                try:
+                    if not result.GrabSucceeded():
+                        raise RuntimeError("grab failed: {}".format(result.ErrorDescription))
+                    frame = result.Array
+                    if averager is None:
+                        averager = FrameAverager(frame.shape, np.float32)
+                    averager.add(frame)
+                finally:
+                    result.Release()
+        finally:
+            self.cam.StopGrabbing()
+        self.noise = averager.noise() if averager.count > 1 else None
+        print("Mean Gray value:", np.mean(averager.mean[0:20, 0]))
+        cv2.imwrite(f'test_{uuid4().hex}.png', np.rint(averager.mean).astype(frame.dtype))
+        return averager.mean
 
     def stop(self):
         self.cam.Close()
@@ -1,5 +1,13 @@
-from .main import app
-
 __all__ = [
     "app",
 ]
+
+
+def __getattr__(name):
+    # the app is imported on first use, so that oicp_server.settings can be
+    # read without the hardware drivers and their vendor SDKs installed
+    if name == "app":
+        from .main import app
+
+        return app
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -11,19 +11,37 @@ from dotenv import load_dotenv
 log = logging.getLogger(__name__)
 
 
+# settings for running without hardware, loaded only when asked for
+EMULATOR_ENV = Path(__file__).parent / "emulator.env"
+
+
 def get_settings() -> "ServerSettings":
     """Get the settings"""
-    load_dotenv(get_dotenv_path())
+    dot_env_path = get_dotenv_path()
+    if dot_env_path is not None:
+        load_dotenv(dot_env_path)
     return ServerSettings()
 
 
-def get_dotenv_path() -> Path:
-    """Get the location of the settings file"""
-    return Environment().dot_env_path
+def get_dotenv_path() -> typing.Optional[Path]:
+    """Get the location of the settings file, if one was asked for"""
+    environment = Environment()
+    if environment.dot_env_path is not None:
+        return environment.dot_env_path
+    if environment.emulator:
+        return EMULATOR_ENV
+    return None
 
 
 class Environment(BaseSettings):
-    dot_env_path: Path = "emulator.env"
+    dot_env_path: typing.Optional[Path] = Field(
+        default=None,
+        description="A settings file to load before reading the settings.",
+    )
+    emulator: bool = Field(
+        default=False,
+        description="Load the bundled emulator.env, which selects simulated cameras.",
+    )
 
     class Config:
         env_prefix = "OICP_SERVER_"
@@ -35,6 +53,34 @@ class ServerSettings(BaseSettings):
         gt=0,
         description="The maximum nmber of runs to allow HTTP clients to create before auto-deleting old ones.",
     )
+    camera_backend: typing.Literal["vmb", "simulated"] = Field(
+        default="vmb",
+        description="Run Vimba cameras, or simulated ones for testing without hardware.",
+    )
+    sim_cameras: int = Field(
+        default=1,
+        gt=0,
+        description="The number of simulated cameras.",
+    )
+    sim_width: int = Field(default=2048, gt=0, description="The width of simulated frames.")
+    sim_height: int = Field(default=1536, gt=0, description="The height of simulated frames.")
+    sim_pixel_format: typing.Literal["Mono8", "Mono10", "Mono12", "Mono10p", "Mono12p"] = Field(
+        default="Mono8",
+        description="The pixel format of simulated frames.",
+    )
+    sim_fps: float = Field(
+        default=10.0,
+        gt=0,
+        description="The highest frame rate of a simulated camera.",
+    )
+    sim_trigger_mode: typing.Literal["Software", "FreeRun"] = Field(
+        default="Software",
+        description="Whether simulated frames are software-triggered or free-running.",
+    )
+    sim_write_frames: bool = Field(
+        default=False,
+        description="Whether simulated frames are written to disk like real captures.",
+    )
 
     class Config:
         env_prefix = "OICP_SERVER_"
@@ -0,0 +1,29 @@
+from .tiling import TileScheduler  # noqa: F401
+from .preprocess import FlatFieldCorrector, flatfieldcorrect, subtract_dark  # noqa: F401
+from .dark import DarkModel  # noqa: F401
+from .linearize import LinearizationLUT, bit_depth  # noqa: F401
+from .averaging import FrameAverager  # noqa: F401
+from .hdr import HDRMerger  # noqa: F401
+from .statistics import FrameStatistics  # noqa: F401
+from .exposure import AutoExposure  # noqa: F401
+from .roi import ROISet  # noqa: F401
+from .mtf import SFR, SFRBatch, EdgeSet, mtf_crossing, project2, sfr  # noqa: F401
+from .focus import FocusCurve, FocusResult, ThroughFocus  # noqa: F401
+from .defects import BadPixelCorrector, detect_bad_pixels  # noqa: F401
+from .unpack import pack_mono10p, pack_mono12p, unpack_mono10p, unpack_mono12p  # noqa: F401
+from .binning import bin_frame  # noqa: F401
+from .color import ColorMatrix, correct_color  # noqa: F401
+from .vignetting import RadialFlatModel, fit_radial_model, radial_field  # noqa: F401
+from .calibration import CalibrationKey, CalibrationStore  # noqa: F401
+from .stages import (  # noqa: F401
+    Stage,
+    LinearizeStage,
+    DarkStage,
+    FlatStage,
+    BadPixelStage,
+    BinningStage,
+    ColorMatrixStage,
+    ClipStage,
+    RoiStage,
+)
+from .pipeline import Pipeline  # noqa: F401
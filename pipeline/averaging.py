@@ -0,0 +1,78 @@
+import numpy as np
+
+from .tiling import TileScheduler, row_band
+
+
+class FrameAverager:
+    """
+    Streaming per-pixel mean and variance of a frame sequence.
+
+    Frames are folded into running mean and M2 arrays with Welford's update,
+    band by band, so memory stays at two frame-sized accumulators however many
+    frames are averaged.
+    """
+
+    def __init__(
+        self,
+        shape,
+        dtype=np.float32,
+        scheduler: TileScheduler | None = None,
+    ):
+        """
+        Initialize the accumulators.
+
+        shape -- frame shape
+        dtype -- accumulator dtype, float32 or float64
+        scheduler -- TileScheduler to run row bands on, one thread if None
+        """
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.float32, np.float64):
+            raise TypeError("accumulator dtype must be float32 or float64")
+        self.scheduler = scheduler or TileScheduler(workers=1)
+        self.mean = np.zeros(shape, dtype=self.dtype)
+        self.m2 = np.zeros(shape, dtype=self.dtype)
+        self.count = 0
+
+    @property
+    def shape(self):
+        return self.mean.shape
+
+    def reset(self) -> None:
+        self.mean.fill(0)
+        self.m2.fill(0)
+        self.count = 0
+
+    def add(self, frame: np.ndarray) -> None:
+        """Fold a frame into the accumulators."""
+        if frame.shape != self.shape:
+            raise ValueError(
+                "frame shape {} does not match {}".format(frame.shape, self.shape)
+            )
+        self.count += 1
+        inv_count = self.dtype.type(1.0 / self.count)
+
+        def _rows(rows):
+            x = row_band(frame, rows)
+            mean = row_band(self.mean, rows)
+            delta = np.subtract(x, mean, dtype=self.dtype)
+            # mean += delta / n
+            step = np.multiply(delta, inv_count)
+            np.add(mean, step, out=mean)
+            # m2 += delta * (x - mean)
+            np.subtract(x, mean, out=step)
+            np.multiply(step, delta, out=step)
+            m2 = row_band(self.m2, rows)
+            np.add(m2, step, out=m2)
+
+        self.scheduler.run(_rows, self.mean)
+
+    def variance(self, out: np.ndarray | None = None) -> np.ndarray:
+        """Get the per-pixel sample variance; needs at least two frames."""
+        if self.count < 2:
+            raise ValueError("variance needs at least two frames")
+        return np.divide(self.m2, self.count - 1, out=out)
+
+    def noise(self, out: np.ndarray | None = None) -> np.ndarray:
+        """Get the per-pixel temporal noise (standard deviation)."""
+        out = self.variance(out)
+        return np.sqrt(out, out=out)
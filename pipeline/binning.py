@@ -0,0 +1,101 @@
+from typing import Tuple
+
+import numpy as np
+
+from .tiling import TileScheduler
+
+# values of plugins.vmb_camera.api.BinningMode
+SUM = "sum"
+AVERAGE = "average"
+
+
+def binned_dtype(dtype: np.dtype, mode: str) -> np.dtype:
+    """
+    Get the dtype bin_frame produces.
+
+    Sums of integer frames are kept as uint32, which cannot overflow for any
+    binning factor of a 16-bit sensor, and averages as float32. Float frames
+    keep their own precision, at least float32.
+    """
+    if np.issubdtype(dtype, np.integer):
+        return np.dtype(np.uint32 if mode == SUM else np.float32)
+    return np.result_type(dtype, np.float32)
+
+
+def _is_channel_frame(shape: Tuple[int, ...]) -> bool:
+    # an (h, w, 1) frame as from vmbpy
+    return len(shape) == 3 and shape[-1] == 1
+
+
+def binned_shape(shape: Tuple[int, ...], factor: Tuple[int, int]) -> Tuple[int, ...]:
+    by, bx = factor
+    if _is_channel_frame(shape):
+        shape = shape[:-1]
+    return tuple(shape[:-2]) + (shape[-2] // by, shape[-1] // bx)
+
+
+def bin_frame(
+    frame: np.ndarray,
+    factor: Tuple[int, int] = (2, 2),
+    mode: str = SUM,
+    out: np.ndarray | None = None,
+    scheduler: TileScheduler | None = None,
+) -> np.ndarray:
+    """
+    Bin blocks of (by, bx) pixels on the host.
+
+    frame -- frame, (h, w, 1) frame as from vmbpy, or (c, h, w) stack,
+             integer or float
+    factor -- (by, bx) block size, e.g. (2, 2), (4, 4) or anisotropic (1, 4)
+    mode -- BinningMode.Sum or BinningMode.Average
+    out -- output buffer of binned_shape, allocated if None; its dtype must
+           be castable from binned_dtype with same_kind casting
+    scheduler -- TileScheduler to run row bands on, one thread if None
+
+    Rows and columns that do not fill a whole block are dropped, and so is
+    the channel axis of an (h, w, 1) frame. The block offsets are combined
+    through strided views, rows first into a band-sized accumulator and then
+    columns straight into out, so every pass is a plain elementwise add.
+    """
+    by, bx = factor
+    if by < 1 or bx < 1:
+        raise ValueError("binning factor must be positive, got {}".format(factor))
+    if mode not in (SUM, AVERAGE):
+        raise ValueError("unsupported binning mode: {}".format(mode))
+    if _is_channel_frame(frame.shape):
+        frame = frame[..., 0]
+
+    shape = binned_shape(frame.shape, factor)
+    dtype = binned_dtype(frame.dtype, mode)
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    elif out.shape != shape:
+        raise ValueError("out shape {} does not match {}".format(out.shape, shape))
+    elif not np.can_cast(dtype, out.dtype, "same_kind"):
+        raise TypeError("cannot bin {} into out of dtype {}".format(dtype, out.dtype))
+    acc_dtype = binned_dtype(frame.dtype, SUM)
+    width = shape[-1] * bx
+    scale = 1.0 / (by * bx)
+
+    def _rows(rows):
+        start, stop, _ = rows.indices(shape[-2])
+        src = frame[..., start * by : stop * by, :width]
+        dst = out[..., rows, :]
+
+        if by == 1:
+            acc = src
+        else:
+            acc = np.add(src[..., 0::by, :], src[..., 1::by, :], dtype=acc_dtype)
+            for i in range(2, by):
+                np.add(acc, src[..., i::by, :], out=acc)
+        if bx == 1:
+            np.copyto(dst, acc, casting="unsafe")
+        else:
+            np.add(acc[..., 0::bx], acc[..., 1::bx], out=dst, dtype=acc_dtype, casting="unsafe")
+            for j in range(2, bx):
+                np.add(dst, acc[..., j::bx], out=dst, casting="unsafe")
+        if mode == AVERAGE:
+            np.multiply(dst, scale, out=dst, casting="unsafe")
+
+    (scheduler or TileScheduler(workers=1)).run(_rows, out)
+    return out
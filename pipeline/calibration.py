@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from .dark import DarkModel
+from .linearize import LinearizationLUT
+from .preprocess import FlatFieldCorrector
+from .vignetting import RadialFlatModel
+
+DARK = "dark"
+FLAT = "flat"
+DARK_OFFSET = "dark_offset"
+DARK_CURRENT = "dark_current"
+FLAT_MODEL = "flat_model"
+BAD_PIXELS = "bad_pixels"
+LINEARIZATION = "linearization"
+
+
+class CalibrationKey(NamedTuple):
+    """Acquisition settings a calibration master was taken with."""
+
+    serial: str
+    pixel_format: str
+    exposure_time: float | None
+    gain: float | None
+    binning: str = "1x1"
+
+
+class CalibrationStore:
+    """
+    Calibration masters kept as .npy files and memory-mapped on demand.
+
+    The store directory holds one file per master and an index.json mapping
+    (kind, key) to file names. Opening the store reads only the index; a
+    master is mapped the first time it is requested and then kept in a
+    bounded LRU, so switching between recently used settings is a dictionary
+    lookup.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, root: str | Path, capacity: int = 8):
+        """
+        Initialize the store.
+
+        root -- directory holding the masters, created if missing
+        capacity -- number of mapped arrays and derived objects kept in the LRU
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.capacity = capacity
+        self._index: Dict[Tuple[str, CalibrationKey], str] | None = None
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _get_index(self) -> Dict[Tuple[str, CalibrationKey], str]:
+        if self._index is None:
+            self._index = {}
+            path = self.root / self.INDEX_FILE
+            if path.exists():
+                with open(path) as f:
+                    for entry in json.load(f):
+                        key = CalibrationKey(*entry["key"])
+                        self._index[(entry["kind"], key)] = entry["file"]
+        return self._index
+
+    def _write_index(self) -> None:
+        entries = [
+            {"kind": kind, "key": list(key), "file": filename}
+            for (kind, key), filename in self._get_index().items()
+        ]
+        path = self.root / self.INDEX_FILE
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(entries, f, indent=1)
+        os.replace(tmp, path)
+
+    def _cached(self, entry: Tuple[str, CalibrationKey], factory) -> Any:
+        with self._lock:
+            if entry in self._cache:
+                self._cache.move_to_end(entry)
+                return self._cache[entry]
+            value = factory()
+            self._cache[entry] = value
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+            return value
+
+    @staticmethod
+    def _related(saved: CalibrationKey, key: CalibrationKey) -> bool:
+        # derived objects mix masters across exposure times (DarkModel) and
+        # gains (linearization), so a field left None by saved matches any
+        if saved.serial != key.serial or saved.pixel_format != key.pixel_format:
+            return False
+        if saved.gain is not None and saved.gain != key.gain:
+            return False
+        return saved.binning == key.binning
+
+    def _invalidate(self, key: CalibrationKey) -> None:
+        for entry in [e for e in self._cache if self._related(key, e[1])]:
+            del self._cache[entry]
+
+    def keys(self, kind: str | None = None) -> List[CalibrationKey]:
+        """Get the keys stored for a kind of master, or for all kinds, without duplicates."""
+        with self._lock:
+            return list(
+                dict.fromkeys(k for (t, k) in self._get_index() if kind is None or t == kind)
+            )
+
+    def contains(self, kind: str, key: CalibrationKey) -> bool:
+        with self._lock:
+            return (kind, key) in self._get_index()
+
+    def save(self, kind: str, key: CalibrationKey, array: np.ndarray) -> Path:
+        """
+        Store a master and return the path of its file.
+
+        kind -- kind of master, e.g. DARK or FLAT
+        key -- settings the master was taken with
+        array -- master frame
+        """
+        digest = hashlib.sha1(repr((kind, tuple(key))).encode()).hexdigest()[:16]
+        filename = "{}_{}.npy".format(kind, digest)
+        with self._lock:
+            # written aside and renamed over the old file, so memory maps of
+            # the previous master keep reading it rather than a truncated file
+            fd, tmp = tempfile.mkstemp(suffix=".npy.tmp", dir=self.root)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, np.ascontiguousarray(array))
+                os.replace(tmp, self.root / filename)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            self._get_index()[(kind, key)] = filename
+            self._write_index()
+            self._invalidate(key)
+        return self.root / filename
+
+    def load(self, kind: str, key: CalibrationKey) -> np.ndarray:
+        """
+        Get a master as a read-only memory map.
+
+        Raises KeyError if the store has no such master.
+        """
+
+        def _map():
+            filename = self._get_index()[(kind, key)]
+            return np.load(self.root / filename, mmap_mode="r")
+
+        return self._cached((kind, key), _map)
+
+    def dark(self, key: CalibrationKey) -> np.ndarray:
+        return self.load(DARK, key)
+
+    def flat(self, key: CalibrationKey) -> np.ndarray:
+        return self.load(FLAT, key)
+
+    def bad_pixels(self, key: CalibrationKey) -> np.ndarray:
+        """Get the flat indices of defective pixels, see detect_bad_pixels."""
+        return self.load(BAD_PIXELS, key)
+
+    def save_linearization(self, key: CalibrationKey, lut: LinearizationLUT) -> None:
+        """Store a LinearizationLUT; it depends only on the camera and pixel format."""
+        key = key._replace(exposure_time=None, gain=None, binning="1x1")
+        self.save(LINEARIZATION, key, lut.table)
+
+    def linearization(self, key: CalibrationKey) -> LinearizationLUT:
+        key = key._replace(exposure_time=None, gain=None, binning="1x1")
+        return self._cached(
+            ("linearization_lut", key),
+            lambda: LinearizationLUT(self.load(LINEARIZATION, key)),
+        )
+
+    def save_dark_model(self, key: CalibrationKey, model: DarkModel) -> None:
+        """Store a DarkModel; it covers every exposure time, so that is dropped from key."""
+        key = key._replace(exposure_time=None)
+        self.save(DARK_OFFSET, key, model.offset)
+        self.save(DARK_CURRENT, key, model.dark_current)
+
+    def dark_model(self, key: CalibrationKey) -> DarkModel:
+        key = key._replace(exposure_time=None)
+        return self._cached(
+            ("dark_model", key),
+            lambda: DarkModel(self.load(DARK_OFFSET, key), self.load(DARK_CURRENT, key)),
+        )
+
+    def save_flat_model(self, key: CalibrationKey, model: RadialFlatModel) -> None:
+        """Store a RadialFlatModel, fitted to a dark-subtracted flat, in place of a flat frame."""
+        self.save(FLAT_MODEL, key, model.to_array())
+
+    def flat_model(self, key: CalibrationKey) -> RadialFlatModel:
+        return self._cached(
+            ("flat_model_params", key),
+            lambda: RadialFlatModel.from_array(self.load(FLAT_MODEL, key)),
+        )
+
+    def corrector(self, key: CalibrationKey) -> FlatFieldCorrector:
+        """
+        Get the FlatFieldCorrector for the flat stored under key.
+
+        Uses the dark stored under key, or the DarkModel for the key's other
+        settings when no dark was measured at that exposure time. Likewise a
+        stored RadialFlatModel stands in for a missing flat frame.
+
+        Raises ValueError if key has no exposure time.
+        """
+        if key.exposure_time is None:
+            raise ValueError("a corrector needs the exposure time of its flat")
+
+        def _create():
+            if self.contains(DARK, key):
+                dark = self.dark(key)
+            else:
+                dark = self.dark_model(key)
+            if self.contains(FLAT, key):
+                flat = self.flat(key)
+            else:
+                flat = self.flat_model(key).field()
+                if isinstance(dark, DarkModel):
+                    flat = flat + dark.synthesize(key.exposure_time)
+                else:
+                    flat = flat + dark
+            return FlatFieldCorrector(dark, flat, key.exposure_time)
+
+        return self._cached(("corrector", key), _create)
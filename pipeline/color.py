@@ -0,0 +1,122 @@
+import threading
+from typing import Tuple
+
+import numpy as np
+
+from .tiling import TileScheduler, for_each_band
+
+
+class ColorMatrix:
+    """
+    A color matrix applied in float32 over row bands of a channel stack.
+
+    out[i] = sum_j matrix[i, j] * img[j]
+
+    Zero coefficients are skipped and unit coefficients become copies, so
+    diagonal and sparse matrices (channel selection, white balance) cost one
+    pass per output channel instead of one per matrix element. The result can
+    be clipped in the same pass.
+    """
+
+    def __init__(self, matrix: np.ndarray, clip: Tuple[float, float] | None = None):
+        """
+        Initialize the color matrix.
+
+        matrix -- (n, c) color matrix
+        clip -- (lo, hi) range to clip the result to, or None
+        """
+        self.matrix = np.asarray(matrix, dtype=np.float32)
+        if self.matrix.ndim != 2:
+            raise ValueError("color matrix must be 2-D, got {}".format(self.matrix.shape))
+        self.clip = clip
+        self.terms = [
+            [(j, self.matrix[i, j]) for j in np.flatnonzero(self.matrix[i])]
+            for i in range(self.matrix.shape[0])
+        ]
+        # every output channel reads only its own input channel
+        self.diagonal = all(j == i for i, terms in enumerate(self.terms) for j, _ in terms)
+        self._local = threading.local()
+
+    def _scratch(self, shape) -> np.ndarray:
+        term = getattr(self._local, "term", None)
+        if term is None or term.shape != shape:
+            term = np.empty(shape, dtype=np.float32)
+            self._local.term = term
+        return term
+
+    def apply_rows(self, src: np.ndarray, dst: np.ndarray) -> None:
+        """
+        Apply the matrix to a block of a channel stack.
+
+        src -- (c, ...) block of the input stack
+        dst -- (n, ...) float32 block of the output stack; may be src only
+               for a diagonal matrix
+        """
+        term = None
+        for i, terms in enumerate(self.terms):
+            out = dst[i]
+            if not terms:
+                out.fill(0)
+            else:
+                j, coef = terms[0]
+                if coef == 1:
+                    np.copyto(out, src[j], casting="unsafe")
+                else:
+                    np.multiply(src[j], coef, out=out)
+                for j, coef in terms[1:]:
+                    if term is None:
+                        term = self._scratch(out.shape)
+                    np.multiply(src[j], coef, out=term)
+                    np.add(out, term, out=out)
+            if self.clip is not None:
+                np.clip(out, self.clip[0], self.clip[1], out=out)
+
+    def apply(
+        self,
+        img: np.ndarray,
+        out: np.ndarray | None = None,
+        scheduler: TileScheduler | None = None,
+    ) -> np.ndarray:
+        """
+        Apply the matrix to a (c, h, w) channel stack.
+
+        img -- (c, h, w) channel stack
+        out -- preallocated (n, h, w) float32 output, allocated if None
+        scheduler -- TileScheduler to run row bands on, whole frame if None
+
+        The sum is evaluated per pixel in a fixed order, so tiled and untiled
+        runs give identical results.
+        """
+        c, h, w = img.shape
+        if self.matrix.shape[1] != c:
+            raise ValueError(
+                "matrix shape {} does not match {} channels".format(self.matrix.shape, c)
+            )
+        if out is None:
+            out = np.empty((self.matrix.shape[0], h, w), dtype=np.float32)
+        elif out.dtype != np.float32 or out.shape != (self.matrix.shape[0], h, w):
+            raise ValueError(
+                "out must be float32 of shape {}".format((self.matrix.shape[0], h, w))
+            )
+        if np.shares_memory(out, img) and not (out is img and self.diagonal):
+            raise ValueError("out must not overlap img")
+
+        def _rows(rows):
+            self.apply_rows(img[:, rows], out[:, rows])
+
+        for_each_band(_rows, out, scheduler)
+        return out
+
+
+def correct_color(
+    matrix: np.ndarray,
+    img: np.ndarray,
+    out: np.ndarray | None = None,
+    scheduler: TileScheduler | None = None,
+) -> np.ndarray:
+    """
+    Apply a color matrix to a (c, h, w) channel stack.
+
+    Builds the ColorMatrix on every call; see ColorMatrix.apply.
+    """
+    return ColorMatrix(matrix).apply(img, out, scheduler)
@@ -0,0 +1,98 @@
+from typing import Iterable, Tuple
+
+import numpy as np
+
+from .tiling import TileScheduler, for_each_band, row_band
+
+
+class DarkModel:
+    """
+    Per-pixel linear dark frame model.
+
+    D(t) = offset + dark_current * t
+
+    Two float32 maps replace a measured dark frame per exposure time; the dark
+    frame for any exposure is synthesized with one multiply-add per pixel.
+    """
+
+    def __init__(self, offset: np.ndarray, dark_current: np.ndarray):
+        """
+        Initialize the model.
+
+        offset -- per-pixel dark level at zero exposure, in DN
+        dark_current -- per-pixel dark current, in DN per exposure time unit
+        """
+        if offset.shape != dark_current.shape:
+            raise ValueError(
+                "offset and dark current differ in shape: {} != {}".format(
+                    offset.shape, dark_current.shape
+                )
+            )
+        self.offset = np.asarray(offset, dtype=np.float32)
+        self.dark_current = np.asarray(dark_current, dtype=np.float32)
+
+    @property
+    def shape(self):
+        return self.offset.shape
+
+    @classmethod
+    def fit(cls, frames: Iterable[Tuple[float, np.ndarray]]) -> "DarkModel":
+        """
+        Fit the model to dark frames by per-pixel least squares.
+
+        frames -- (exposure time, dark frame) pairs, at least two distinct
+                  exposure times; consumed one at a time, so a generator
+                  keeps only one frame in memory
+        """
+        n = 0
+        sum_t = 0.0
+        sum_tt = 0.0
+        sum_y = None
+        sum_ty = None
+        for exposure, frame in frames:
+            if sum_y is None:
+                sum_y = np.zeros(frame.shape, dtype=np.float64)
+                sum_ty = np.zeros(frame.shape, dtype=np.float64)
+            n += 1
+            sum_t += exposure
+            sum_tt += exposure * exposure
+            np.add(sum_y, frame, out=sum_y)
+            sum_ty += np.multiply(frame, exposure, dtype=np.float64)
+
+        det = n * sum_tt - sum_t * sum_t
+        if sum_y is None or det <= 0:
+            raise ValueError("need dark frames at two or more exposure times")
+
+        # dark_current = (n*sum_ty - sum_t*sum_y)/det, reusing sum_ty
+        sum_ty *= n
+        sum_ty -= sum_t * sum_y
+        sum_ty /= det
+        # offset = (sum_y - dark_current*sum_t)/n, reusing sum_y
+        sum_y -= sum_t * sum_ty
+        sum_y /= n
+        return cls(sum_y.astype(np.float32), sum_ty.astype(np.float32))
+
+    def synthesize(
+        self,
+        exposure: float,
+        out: np.ndarray | None = None,
+        scheduler: TileScheduler | None = None,
+    ) -> np.ndarray:
+        """
+        Get the dark frame for an exposure time.
+
+        exposure -- exposure time, in the unit used when fitting
+        out -- float32 output buffer, allocated if None
+        scheduler -- TileScheduler to run row bands on, whole frame if None
+        """
+        if out is None:
+            out = np.empty(self.shape, dtype=np.float32)
+        exposure = np.float32(exposure)
+
+        def _rows(rows):
+            band = row_band(out, rows)
+            np.multiply(row_band(self.dark_current, rows), exposure, out=band)
+            np.add(band, row_band(self.offset, rows), out=band)
+
+        for_each_band(_rows, out, scheduler)
+        return out
@@ -0,0 +1,106 @@
+from typing import Tuple
+
+import numpy as np
+
+# 1.4826 * MAD estimates the standard deviation of normally distributed data
+MAD_TO_SIGMA = 1.4826
+
+
+def detect_bad_pixels(
+    dark_field_img: np.ndarray,
+    bright_field_img: np.ndarray,
+    hot_sigma: float = 6.0,
+    dead_fraction: float = 0.5,
+    bright_fraction: float = 1.5,
+) -> np.ndarray:
+    """
+    Find defective pixels in a calibration pair.
+
+    dark_field_img -- dark frame D
+    bright_field_img -- flat frame F, taken at the exposure of D
+    hot_sigma -- hot pixel threshold in robust sigmas above the dark median
+    dead_fraction -- dead pixel threshold as a fraction of the median of F-D
+    bright_fraction -- stuck-bright threshold as a multiple of the median of F-D
+
+    Returns the sorted flat indices of the defective pixels.
+    """
+    if dark_field_img.shape != bright_field_img.shape:
+        raise ValueError(
+            "dark and bright frames differ in shape: {} != {}".format(
+                dark_field_img.shape, bright_field_img.shape
+            )
+        )
+    dark = np.asarray(dark_field_img, dtype=np.float32)
+    dark_median = np.median(dark)
+    mad = np.median(np.abs(dark - dark_median))
+    mask = dark > dark_median + hot_sigma * max(MAD_TO_SIGMA * mad, 1.0)
+
+    response = np.subtract(bright_field_img, dark, dtype=np.float32)
+    response_median = np.median(response)
+    mask |= response < dead_fraction * response_median
+    mask |= response > bright_fraction * response_median
+
+    indices = np.flatnonzero(mask)
+    return indices.astype(np.int32 if mask.size < 2**31 else np.int64)
+
+
+class BadPixelCorrector:
+    """
+    Replaces defective pixels with the median of their good 8-neighbours.
+
+    The neighbour indices of every defect are computed once, so correcting a
+    frame gathers and writes only those pixels: the cost scales with the
+    number of defects, not with the frame size.
+    """
+
+    def __init__(self, indices: np.ndarray, shape: Tuple[int, int]):
+        """
+        Initialize the corrector.
+
+        indices -- flat indices of the defective pixels, see detect_bad_pixels
+        shape -- (height, width) of the frames to correct
+        """
+        h, w = shape
+        self.shape = (h, w)
+        self.indices = np.unique(np.asarray(indices, dtype=np.intp))
+        if len(self.indices) and (self.indices[0] < 0 or self.indices[-1] >= h * w):
+            raise ValueError("bad pixel index out of range for shape {}".format(shape))
+
+        y, x = np.divmod(self.indices, w)
+        offsets = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx]
+        ny = y[:, None] + np.array([dy for dy, _ in offsets])
+        nx = x[:, None] + np.array([dx for _, dx in offsets])
+        inside = (ny >= 0) & (ny < h) & (nx >= 0) & (nx < w)
+        neighbours = np.where(inside, ny * w + nx, 0)
+        good = inside & ~np.isin(neighbours, self.indices)
+
+        # defects surrounded by defects keep their value
+        self.count = good.sum(axis=1)
+        keep = self.count > 0
+        self.targets = self.indices[keep]
+        self.count = self.count[keep]
+        self.good = good[keep]
+        self.neighbours = np.where(self.good, neighbours[keep], 0)
+
+        rows = np.arange(len(self.targets))
+        self._lo = (rows, (self.count - 1) // 2)
+        self._hi = (rows, self.count // 2)
+
+    def apply(self, frame: np.ndarray) -> np.ndarray:
+        """Correct a (height, width) frame in place and return it."""
+        if frame.shape != self.shape:
+            raise ValueError(
+                "frame shape {} does not match {}".format(frame.shape, self.shape)
+            )
+        if len(self.targets) == 0:
+            return frame
+
+        values = np.take(frame, self.neighbours).astype(np.float32)
+        # missing neighbours sort last and fall outside the median
+        values[~self.good] = np.inf
+        values.sort(axis=1)
+        median = (values[self._lo] + values[self._hi]) / 2
+        if np.issubdtype(frame.dtype, np.integer):
+            median = np.rint(median)
+        np.put(frame, self.targets, median)
+        return frame
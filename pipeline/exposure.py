@@ -0,0 +1,86 @@
+from typing import Dict, Tuple
+
+from .statistics import FrameStatistics
+
+
+class AutoExposure:
+    """
+    Model-based auto-exposure on a percentile of the frame.
+
+    Pixel values are linear in exposure time, so the exposure that puts the
+    chosen percentile at the target level is predicted directly from the
+    last frame instead of stepping towards it. When that percentile is
+    clipped, the saturated fraction bounds how far the exposure must drop.
+    Statistics come from a decimated view of the frame.
+    """
+
+    def __init__(
+        self,
+        max_value: int,
+        target: float = 0.7,
+        percentile: float = 99.0,
+        step: int = 4,
+        black_level: float = 0.0,
+        tolerance: float = 0.05,
+        min_exposure: float = 1.0,
+        max_exposure: float = 1000000.0,
+        max_iterations: int = 6,
+    ):
+        """
+        Initialize the controller.
+
+        max_value -- saturation code of the pixel format, e.g. 4095
+        target -- target level of the percentile, as a fraction of max_value
+        percentile -- percentile of the frame to control, 0..100
+        step -- decimation of the frame for the statistics
+        black_level -- dark level, in DN
+        tolerance -- relative level error accepted as converged
+        min_exposure -- shortest exposure time
+        max_exposure -- longest exposure time
+        max_iterations -- frames to try before giving up
+        """
+        self.max_value = max_value
+        self.target_level = target * max_value - black_level
+        if self.target_level <= 0:
+            raise ValueError("target is below the black level")
+        self.percentile = percentile
+        self.step = step
+        self.black_level = black_level
+        self.tolerance = tolerance
+        self.min_exposure = min_exposure
+        self.max_exposure = max_exposure
+        self.max_iterations = max_iterations
+
+    def update(self, exposure: float, statistics: FrameStatistics) -> Tuple[float, bool, Dict]:
+        """
+        Predict the next exposure from a frame taken at exposure.
+
+        Returns (next exposure, converged, report of this iteration).
+        """
+        level = float(statistics.percentile(self.percentile)) - self.black_level
+        clipped = statistics.percentile(self.percentile) >= statistics.max_value
+
+        if clipped:
+            # the percentile pixel is somewhere above full scale; at least the
+            # saturated fraction of the frame must come down below it
+            excess = statistics.saturated_fraction / max(1e-6, 1 - self.percentile / 100)
+            scale = self.target_level / (self.max_value - self.black_level) / max(2.0, excess)
+        elif level <= 0:
+            scale = 16.0
+        else:
+            scale = self.target_level / level
+        scale = min(max(scale, 1 / 16), 16.0)
+
+        converged = not clipped and abs(level - self.target_level) <= self.tolerance * self.target_level
+        next_exposure = exposure if converged else exposure * scale
+        next_exposure = min(max(next_exposure, self.min_exposure), self.max_exposure)
+        report = {
+            "exposure": exposure,
+            "level": level,
+            "target": self.target_level,
+            "clipped": bool(clipped),
+            "mean": statistics.mean,
+            "saturated": statistics.saturated_fraction,
+            "next_exposure": next_exposure,
+        }
+        return next_exposure, converged, report
@@ -0,0 +1,177 @@
+import math
+from typing import List, NamedTuple, Sequence
+
+import numpy as np
+
+from .mtf import EdgeSet
+
+
+class FocusCurve:
+    """
+    Focus score against focus position, with its peak fitted as samples arrive.
+
+    The peak is the vertex of a parabola through the logarithm of the scores
+    nearest the best sample, i.e. a Gaussian fit to the top of the curve,
+    refitted on every sample from at most fit_points samples. The peak is
+    bracketed once the scores on both sides of the best sample have fallen
+    to drop times its score and patience samples have arrived after it.
+    """
+
+    def __init__(self, drop: float = 0.8, patience: int = 2, fit_points: int = 5):
+        """
+        Initialize an empty curve.
+
+        drop -- fraction of the best score the curve has to fall to on both sides
+        patience -- samples to take after the best one before stopping
+        fit_points -- samples around the best one used for the peak fit
+        """
+        self.drop = drop
+        self.patience = patience
+        self.fit_points = max(3, fit_points)
+        self.positions: List[float] = []
+        self.scores: List[float] = []
+        self._best = -1
+
+    def __len__(self):
+        return len(self.positions)
+
+    def add(self, position: float, score: float) -> None:
+        self.positions.append(float(position))
+        self.scores.append(float(score))
+        if math.isfinite(score) and (self._best < 0 or score > self.scores[self._best]):
+            self._best = len(self.scores) - 1
+
+    @property
+    def best_position(self) -> float | None:
+        """Position of the best sample."""
+        return self.positions[self._best] if self._best >= 0 else None
+
+    @property
+    def bracketed(self) -> bool:
+        if self._best < 0 or len(self) - 1 - self._best < self.patience:
+            return False
+        best_position = self.positions[self._best]
+        limit = self.drop * self.scores[self._best]
+        below = [(p, s) for p, s in zip(self.positions, self.scores) if s <= limit]
+        return any(p < best_position for p, _ in below) and any(
+            p > best_position for p, _ in below
+        )
+
+    @property
+    def peak(self) -> float | None:
+        """Fitted position of the peak, the best sample if it cannot be fitted."""
+        if self._best < 0:
+            return None
+        positions = np.array(self.positions)
+        scores = np.array(self.scores)
+        order = np.argsort(positions)
+        positions, scores = positions[order], scores[order]
+        i = int(np.flatnonzero(order == self._best)[0])
+        lo = max(0, min(i - self.fit_points // 2, len(positions) - self.fit_points))
+        window = slice(lo, lo + self.fit_points)
+        x, y = positions[window], scores[window]
+        usable = np.isfinite(y) & (y > 0)
+        if usable.sum() < 3 or len(np.unique(x[usable])) < 3:
+            return self.best_position
+
+        a, b, _ = np.polyfit(x[usable], np.log(y[usable]), 2)
+        if a >= 0:
+            return self.best_position
+        vertex = -b / (2 * a)
+        # a vertex outside the fitted samples is an extrapolation; keep the sample
+        if not x[usable].min() <= vertex <= x[usable].max():
+            return self.best_position
+        return float(vertex)
+
+
+class FocusResult(NamedTuple):
+    """
+    Outcome of a through-focus sweep.
+
+    peak -- fitted best focus position
+    bracketed -- whether the sweep passed the peak on both sides
+    positions -- focus position of every analysed frame
+    scores -- focus score of every analysed frame
+    frequencies -- spatial frequencies the MTF is reported at, cycles per pixel
+    mtf -- (n_positions, n_roi, n_frequencies) MTF at those frequencies
+    """
+
+    peak: float | None
+    bracketed: bool
+    positions: np.ndarray
+    scores: np.ndarray
+    frequencies: np.ndarray
+    mtf: np.ndarray
+
+
+class ThroughFocus:
+    """
+    Streaming through-focus analysis of slanted-edge frames.
+
+    Every frame added is measured with an EdgeSet and reduced to the MTF of
+    each edge at a few spatial frequencies. Its score, the mean MTF of the
+    edges at the first frequency, feeds a FocusCurve. done turns true as
+    soon as the peak is bracketed, so a sweep can stop there instead of
+    running to its last position.
+    """
+
+    def __init__(
+        self,
+        edges: EdgeSet,
+        frequencies: Sequence[float] = (0.125,),
+        drop: float = 0.8,
+        patience: int = 2,
+    ):
+        """
+        Initialize the analysis.
+
+        edges -- edge ROIs to measure on every frame
+        frequencies -- spatial frequencies to report, cycles per pixel; the
+                       first one is the focus score
+        drop -- see FocusCurve
+        patience -- see FocusCurve
+        """
+        self.edges = edges
+        self.frequencies = np.asarray(frequencies, dtype=np.float64)
+        if len(self.frequencies) == 0:
+            raise ValueError("no frequencies given")
+        grid = edges.freq
+        if self.frequencies.min() < grid[0] or self.frequencies.max() > grid[-1]:
+            raise ValueError("frequencies outside the EdgeSet grid")
+        # linear interpolation on the grid, as column indices and weights
+        index = np.clip(np.searchsorted(grid, self.frequencies) - 1, 0, len(grid) - 2)
+        self._index = index
+        self._weight = (self.frequencies - grid[index]) / (grid[index + 1] - grid[index])
+        self.curve = FocusCurve(drop, patience)
+        self.mtf: List[np.ndarray] = []
+
+    def add(self, position: float, image: np.ndarray) -> np.ndarray:
+        """
+        Analyse the frame taken at a focus position.
+
+        Returns the (n_roi, n_frequencies) MTF of the frame.
+        """
+        batch = self.edges.measure(image)
+        mtf = (
+            batch.mtf[:, self._index] * (1 - self._weight)
+            + batch.mtf[:, self._index + 1] * self._weight
+        )
+        score = np.nanmean(mtf[:, 0]) if np.isfinite(mtf[:, 0]).any() else math.nan
+        self.mtf.append(mtf)
+        self.curve.add(position, score)
+        return mtf
+
+    @property
+    def done(self) -> bool:
+        return self.curve.bracketed
+
+    def result(self) -> FocusResult:
+        n_roi = len(self.edges)
+        return FocusResult(
+            self.curve.peak,
+            self.curve.bracketed,
+            np.array(self.curve.positions),
+            np.array(self.curve.scores),
+            self.frequencies,
+            np.array(self.mtf).reshape(-1, n_roi, len(self.frequencies)),
+        )
@@ -0,0 +1,104 @@
+import numpy as np
+
+from .tiling import TileScheduler, row_band
+
+
+class HDRMerger:
+    """
+    Streaming merge of an exposure bracket into a float32 radiance map.
+
+    Each frame estimates radiance as x = (frame - black) / t. Estimates are
+    combined with inverse-variance weights t^2 / (signal + read_noise^2),
+    which favours long exposures until they approach saturation; pixels at or
+    above the saturation threshold get no weight. Only the weighted sum and
+    the weight sum are kept, so memory is two frame-sized float32 arrays
+    however many exposures are merged.
+    """
+
+    def __init__(
+        self,
+        shape,
+        max_value: int,
+        black_level: float = 0.0,
+        read_noise: float = 2.0,
+        saturation: float = 0.95,
+        scheduler: TileScheduler | None = None,
+    ):
+        """
+        Initialize the accumulators.
+
+        shape -- frame shape
+        max_value -- saturation code of the pixel format, e.g. 4095
+        black_level -- dark level subtracted from every frame, in DN
+        read_noise -- read noise, in DN
+        saturation -- fraction of max_value above which pixels are dropped
+        scheduler -- TileScheduler to run row bands on, one thread if None
+        """
+        self.black_level = np.float32(black_level)
+        self.read_variance = np.float32(max(read_noise, 1e-3) ** 2)
+        self.threshold = saturation * max_value
+        self.scheduler = scheduler or TileScheduler(workers=1)
+        self.weighted = np.zeros(shape, dtype=np.float32)
+        self.weights = np.zeros(shape, dtype=np.float32)
+        self.shortest: float | None = None
+        self.count = 0
+
+    @property
+    def shape(self):
+        return self.weighted.shape
+
+    def add(self, frame: np.ndarray, exposure: float) -> None:
+        """
+        Fold a frame into the merge.
+
+        frame -- raw frame
+        exposure -- its exposure time, in any unit used consistently
+        """
+        if frame.shape != self.shape:
+            raise ValueError(
+                "frame shape {} does not match {}".format(frame.shape, self.shape)
+            )
+        if exposure <= 0:
+            raise ValueError("exposure must be positive")
+        t = np.float32(exposure)
+
+        def _rows(rows):
+            raw = row_band(frame, rows)
+            signal = np.subtract(raw, self.black_level, dtype=np.float32)
+            # w = t^2 / variance, and w * x = t * signal / variance
+            variance = np.maximum(signal, 0)
+            np.add(variance, self.read_variance, out=variance)
+            contribution = np.multiply(signal, t)
+            np.divide(contribution, variance, out=contribution)
+            np.divide(t * t, variance, out=variance)
+            unsaturated = raw < self.threshold
+            weighted = row_band(self.weighted, rows)
+            weights = row_band(self.weights, rows)
+            np.add(weighted, contribution, out=weighted, where=unsaturated)
+            np.add(weights, variance, out=weights, where=unsaturated)
+
+        self.scheduler.run(_rows, self.weighted)
+        self.count += 1
+        self.shortest = exposure if self.shortest is None else min(self.shortest, exposure)
+
+    def result(self, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Get the radiance map, in DN per exposure time unit.
+
+        Pixels saturated in every frame get the lower bound given by the
+        saturation threshold at the shortest exposure.
+        """
+        if self.count == 0:
+            raise ValueError("no frames merged")
+        if out is None:
+            out = np.empty(self.shape, dtype=np.float32)
+        floor = np.float32((self.threshold - self.black_level) / self.shortest)
+
+        def _rows(rows):
+            weights = row_band(self.weights, rows)
+            o = row_band(out, rows)
+            o.fill(floor)
+            np.divide(row_band(self.weighted, rows), weights, out=o, where=weights > 0)
+
+        self.scheduler.run(_rows, out)
+        return out
@@ -0,0 +1,82 @@
+from typing import Sequence
+
+import numpy as np
+
+from .tiling import TileScheduler, row_band
+
+# keyed by the values of plugins.vmb_camera.api.PxielFormat
+BIT_DEPTHS = {"mono8": 8, "mono10": 10, "mono12": 12, "mono10p": 10, "mono12p": 12}
+
+
+def bit_depth(pixel_format: str) -> int:
+    """Get the number of bits per pixel of a mono pixel format, once unpacked."""
+    try:
+        return BIT_DEPTHS[str(pixel_format).lower()]
+    except KeyError:
+        raise ValueError("unsupported pixel format: {}".format(pixel_format)) from None
+
+
+class LinearizationLUT:
+    """
+    Sensor nonlinearity correction as a lookup table over all input codes.
+
+    A Mono10 or Mono12 frame has only 1024 or 4096 distinct values, so the
+    correction curve is evaluated once per code and frames are linearized by
+    integer indexing straight into the float32 working buffer.
+    """
+
+    def __init__(self, table: np.ndarray):
+        """
+        Initialize the LUT.
+
+        table -- float32 output value for each input code
+        """
+        self.table = np.ascontiguousarray(table, dtype=np.float32)
+        if self.table.ndim != 1:
+            raise ValueError("lookup table must be 1-D")
+
+    @classmethod
+    def from_polynomial(
+        cls, coeffs: Sequence[float], pixel_format: str
+    ) -> "LinearizationLUT":
+        """
+        Tabulate a correction polynomial for a pixel format.
+
+        coeffs -- polynomial in the raw code, highest power first
+        pixel_format -- e.g. PxielFormat.Mono12
+        """
+        codes = np.arange(2 ** bit_depth(pixel_format), dtype=np.float64)
+        return cls(np.polyval(coeffs, codes))
+
+    def apply_rows(self, src: np.ndarray, out: np.ndarray) -> None:
+        """Linearize a block of integer codes into a float32 block."""
+        if not np.issubdtype(src.dtype, np.integer):
+            raise TypeError("linearization needs integer frames, got {}".format(src.dtype))
+        # codes beyond the table (e.g. stray high bits) map to its last entry
+        np.take(self.table, src, out=out, mode="clip")
+
+    def apply(
+        self,
+        frame: np.ndarray,
+        out: np.ndarray | None = None,
+        scheduler: TileScheduler | None = None,
+    ) -> np.ndarray:
+        """
+        Linearize an integer frame.
+
+        frame -- raw frame
+        out -- float32 output buffer, allocated if None
+        scheduler -- TileScheduler to run row bands on, one thread if None
+
+        Always runs in bands: np.take converts its indices to intp, and a
+        band-sized index temporary stays in cache where a frame-sized one
+        would not.
+        """
+        if out is None:
+            out = np.empty(frame.shape, dtype=np.float32)
+
+        def _rows(rows):
+            self.apply_rows(row_band(frame, rows), row_band(out, rows))
+
+        (scheduler or TileScheduler(workers=1)).run(_rows, out)
+        return out
@@ -0,0 +1,426 @@
+import functools
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+# oversampling of the edge spread function, in bins per pixel
+DEFAULT_NBIN = 4
+
+# bins beyond the projected ROI width, as in ISO 12233 sfrmat
+BIN_MARGIN = 150
+
+# largest derivative correction applied to the SFR
+MAX_FIR_CORRECTION = 10.0
+
+
+class SFR(NamedTuple):
+    """
+    Spatial frequency response of a slanted edge.
+
+    freq -- frequencies, in cycles per pixel normal to the edge
+    mtf -- SFR at freq, corrected for the derivative filter
+    esf -- super-sampled edge spread function
+    lsf -- line spread function, the derivative of esf
+    angle -- edge angle from vertical, in degrees
+    contrast -- (left - right) / (left + right) of the ROI, in 0..1
+    """
+
+    freq: np.ndarray
+    mtf: np.ndarray
+    esf: np.ndarray
+    lsf: np.ndarray
+    angle: float
+    contrast: float
+
+
+# windows and corrections depend only on the ROI geometry, of which a
+# test chart has few
+KERNEL_CACHE_SIZE = 128
+
+
+def _window(window_width: int, mid) -> np.ndarray:
+    wid = np.maximum(mid, window_width - 1 - mid)
+    return 0.54 + 0.45 * np.cos(np.pi * (np.arange(window_width) - mid) / wid)
+
+
+@functools.lru_cache(maxsize=KERNEL_CACHE_SIZE)
+def _hamming(window_width: int, mid: float) -> np.ndarray:
+    window = _window(window_width, mid)
+    window.flags.writeable = False
+    return window
+
+
+def hamming(window_width: int, mid=None) -> np.ndarray:
+    """
+    Get a Hamming window, optionally off-center, as notebooks.common.get_hamming.
+
+    Windows with a scalar center are cached and returned read-only.
+
+    window_width -- number of samples
+    mid -- window center, the middle sample if None; an array of centers,
+           shaped (n, 1), gives one window per row
+    """
+    if mid is None:
+        mid = (window_width - 1) / 2
+    if np.ndim(mid) == 0:
+        return _hamming(int(window_width), float(mid))
+    return _window(window_width, np.asarray(mid, dtype=np.float64))
+
+
+def deriv1(a: np.ndarray, fil: Sequence[float]) -> np.ndarray:
+    """
+    Apply a derivative filter along the last axis of a 1-D or 2-D array.
+
+    Same as np.convolve(row, fil, mode="same") on every row, with the first
+    and last samples copied from their neighbours.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    m = len(fil)
+    n = a.shape[-1]
+    lead = (m - 1) // 2
+    padded = np.zeros(a.shape[:-1] + (n + 2 * (m - 1),))
+    padded[..., m - 1 : m - 1 + n] = a
+    result = np.zeros(a.shape)
+    for i, f in enumerate(fil):
+        # output k is the sum of fil[i] * a[k + lead - i]
+        start = lead - i + m - 1
+        result += f * padded[..., start : start + n]
+    result[..., 0] = result[..., 1]
+    result[..., -1] = result[..., -2]
+    return result
+
+
+def centroid(a: np.ndarray) -> np.ndarray:
+    """Get the centroid of every row of a 2-D array, in samples."""
+    # the moments as one matrix-vector product, without an a-sized temporary
+    dist = np.arange(a.shape[1], dtype=np.float64)
+    return (a @ dist) / np.sum(a, axis=1)
+
+
+@functools.lru_cache(maxsize=KERNEL_CACHE_SIZE)
+def fir2fix(n: int, m: int) -> np.ndarray:
+    """
+    Get the SFR correction for an m-point difference filter, cached and read-only.
+
+    n -- number of frequencies, from 0 to the half-sampling frequency
+    m -- length of the difference filter, e.g. 3 for [0.5, 0, -0.5]
+    """
+    x = np.pi * np.arange(1, n + 1) * (m - 1) / (2 * (n + 1))
+    correct = np.abs(x / np.sin(x))
+    correct[0] = 1
+    np.minimum(correct, MAX_FIR_CORRECTION, out=correct)
+    correct.flags.writeable = False
+    return correct
+
+
+def project2(ary: np.ndarray, fit: Sequence[float], fac: int = DEFAULT_NBIN) -> np.ndarray:
+    """
+    Project a ROI along an edge into a super-sampled edge spread function.
+
+    Every pixel is shifted by the edge position on its line, given by fit,
+    and binned at 1/fac pixel. Bin indices are computed for the whole ROI at
+    once and accumulated with np.bincount. Empty bins, which occur for
+    near-vertical edges, are filled by linear interpolation from their
+    neighbours.
+
+    ary -- ROI, lines along axis 0
+    fit -- edge position polynomial in the line number, highest power first
+    fac -- oversampling factor
+    """
+    nlin, npix = ary.shape
+    nn = math.floor(npix * fac)
+    slope = fit[-2]
+    offset = round(fac * (0 - (nlin - 1) * slope))
+    del1 = abs(offset)
+    if offset > 0:
+        offset = 0
+    bwidth = nn + del1 + BIN_MARGIN
+
+    shift = np.polyval(fit, np.arange(nlin)) - fit[-1]
+    x = np.arange(npix, dtype=np.float64)
+    bins = np.ceil((x[None, :] - shift[:, None]) * fac).astype(np.intp)
+    bins += 1 - offset
+    np.clip(bins, 1, bwidth - 1, out=bins)
+    bins = bins.ravel()
+    counts = np.bincount(bins, minlength=bwidth)
+    sums = np.bincount(bins, weights=ary.ravel(), minlength=bwidth)
+
+    start = 1 + round(0.5 * del1)
+    counts = counts[start : start + nn]
+    sums = sums[start : start + nn]
+    filled = counts > 0
+    if not filled.any():
+        raise ValueError("no pixels project into the edge profile")
+    esf = np.zeros(nn)
+    np.divide(sums, counts, out=esf, where=filled)
+    if not filled.all():
+        index = np.arange(nn)
+        esf[~filled] = np.interp(index[~filled], index[filled], esf[filled])
+    return esf
+
+
+def sfr(roi: np.ndarray, nbin: int = DEFAULT_NBIN, deg: int = 1, window: bool = False) -> SFR:
+    """
+    Measure the SFR of a slanted-edge ROI following ISO 12233, as notebooks/mtf.ipynb.
+
+    roi -- ROI with a near-vertical edge, lines along axis 0
+    nbin -- oversampling of the edge spread function
+    deg -- degree of the edge position fit
+    window -- Hamming-window the line derivatives around the edge and the
+              LSF around its peak; the notebook leaves both unwindowed
+    """
+    return _sfr(roi, nbin, deg, window, _kernels(roi.shape[1], nbin))
+
+
+def _kernels(npix: int, nbin: int):
+    # everything in the SFR that depends on the ROI width only
+    nn = math.ceil(npix * nbin)
+    nn2 = nn // 2 + 1
+    return hamming(npix), fir2fix(nn2, 3)
+
+
+def _sfr(roi: np.ndarray, nbin: int, deg: int, window: bool, kernels) -> SFR:
+    win1, dcorr = kernels
+    roi = np.asarray(roi, dtype=np.float32)
+    nlin, npix = roi.shape
+
+    # edge polarity, so that the derivatives are positive
+    tleft = float(np.sum(roi[:, :5]))
+    tright = float(np.sum(roi[:, -5:]))
+    if tleft > tright:
+        fil1 = [-0.5, 0.5]
+        fil2 = [-0.5, 0, 0.5]
+    else:
+        fil1 = [0.5, -0.5]
+        fil2 = [0.5, 0, -0.5]
+    contrast = abs((tleft - tright) / (tleft + tright))
+
+    # edge location: centroids of the windowed line derivatives, -0.5 for
+    # the phase of the 2-point filter, then refined around the first fit
+    deriv = deriv1(roi, fil1)
+    rows = np.arange(nlin)
+    fit = np.polyfit(rows, centroid(deriv * win1) - 0.5, deg)
+    if window:
+        deriv = deriv * hamming(npix, np.polyval(fit, rows)[:, None])
+    fit = np.polyfit(rows, centroid(deriv), deg)
+
+    slope = fit[-2]
+    if slope == 0:
+        raise ValueError("edge is not slanted")
+    angle = math.degrees(math.atan(-slope))
+
+    # whole number of edge phase cycles
+    nlinl = round(math.floor(nlin * abs(slope)) / abs(slope))
+    if nlinl < 1:
+        raise ValueError("ROI is too short for one phase cycle of the edge")
+    roi = roi[:nlinl]
+
+    # super-sampling interval normal to the edge
+    del2 = math.cos(math.atan(slope)) / nbin
+    nn2out = round(len(dcorr) * (2 if nbin == 1 else 1) / 2)
+
+    esf = project2(roi, fit, nbin)
+    esf[-1] = esf[-2]
+    lsf = deriv1(esf, fil2)
+    if window:
+        lsf = lsf * hamming(len(lsf), np.argmax(lsf))
+
+    # only the non-negative frequencies are used
+    spectrum = np.abs(np.fft.rfft(lsf))
+    mtf = spectrum[:nn2out] / spectrum[0] * dcorr[:nn2out]
+    freq = np.arange(nn2out) / (del2 * len(lsf))
+    return SFR(freq, mtf, esf, lsf, angle, contrast)
+
+
+def mtf_crossing(freq: np.ndarray, mtf: np.ndarray, level: float) -> float:
+    """
+    Get the frequency at which the SFR first drops below level, e.g. 0.5 for MTF50.
+
+    Interpolates linearly between the samples around the crossing; NaN if
+    the SFR never drops below level.
+    """
+    below = mtf < level
+    if not below.any():
+        return math.nan
+    i = int(np.argmax(below))
+    if i == 0:
+        return float(freq[0])
+    f0, f1 = freq[i - 1], freq[i]
+    m0, m1 = mtf[i - 1], mtf[i]
+    return float(f0 + (m0 - level) / (m0 - m1) * (f1 - f0))
+
+
+class SFRBatch(NamedTuple):
+    """
+    SFRs of a batch of edges on a common frequency grid.
+
+    freq -- frequency grid, in cycles per pixel normal to the edges
+    mtf -- (n_roi, n_freq) SFRs, NaN beyond the range an edge measures
+    mtf50 -- frequency of 50% SFR of each edge
+    mtf10 -- frequency of 10% SFR of each edge
+    angle -- edge angle of each edge, in degrees
+    """
+
+    freq: np.ndarray
+    mtf: np.ndarray
+    mtf50: np.ndarray
+    mtf10: np.ndarray
+    angle: np.ndarray
+
+
+# default common frequency grid, up to the sampling frequency
+FREQ_GRID = np.linspace(0.0, 1.0, 101)
+
+
+class EdgeSet:
+    """
+    A batch of slanted-edge ROIs measured together on every frame.
+
+    Work that depends on the ROI geometry only, the centroid window, the
+    derivative correction and the FFT size, is done once per ROI width in
+    the constructor. ROIs are measured concurrently on a thread pool, and
+    each SFR is resampled onto one frequency grid so a frame yields a single
+    (n_roi, n_freq) array.
+    """
+
+    def __init__(
+        self,
+        rects: Sequence[Tuple[Sequence[int], Sequence[int]]],
+        nbin: int = DEFAULT_NBIN,
+        deg: int = 1,
+        window: bool = False,
+        freq: np.ndarray = FREQ_GRID,
+        workers: int | None = None,
+    ):
+        """
+        Initialize the edge set.
+
+        rects -- (topleft, bottomright) pairs of [x, y] corners, as get_roi takes them
+        nbin -- oversampling of the edge spread functions
+        deg -- degree of the edge position fits
+        window -- window the derivatives and LSFs, see sfr
+        freq -- common frequency grid, in cycles per pixel
+        workers -- size of the thread pool, at least 1; os.cpu_count() if None
+        """
+        if workers is not None and workers < 1:
+            raise ValueError("workers must be positive")
+        self.slices = []
+        for i, (topleft, bottomright) in enumerate(rects):
+            left, top = int(topleft[0]), int(topleft[1])
+            right, bottom = int(bottomright[0]), int(bottomright[1])
+            if not (0 <= left < right and 0 <= top < bottom):
+                raise ValueError("ROI {} is empty: {}".format(i, (topleft, bottomright)))
+            self.slices.append((slice(top, bottom), slice(left, right)))
+        self.nbin = nbin
+        self.deg = deg
+        self.window = window
+        self.freq = np.asarray(freq, dtype=np.float64)
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.kernels = {
+            width: _kernels(width, nbin)
+            for width in {s.stop - s.start for _, s in self.slices}
+        }
+        self._executor: ThreadPoolExecutor | None = None
+
+    def __len__(self):
+        return len(self.slices)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def _measure(self, image: np.ndarray, i: int):
+        rows, cols = self.slices[i]
+        roi = image[rows, cols]
+        if roi.shape != (rows.stop - rows.start, cols.stop - cols.start):
+            raise ValueError("ROI {} is outside the frame".format(i))
+        result = _sfr(roi, self.nbin, self.deg, self.window, self.kernels[roi.shape[1]])
+        mtf = np.interp(self.freq, result.freq, result.mtf, left=np.nan, right=np.nan)
+        return (
+            mtf,
+            mtf_crossing(result.freq, result.mtf, 0.5),
+            mtf_crossing(result.freq, result.mtf, 0.1),
+            result.angle,
+        )
+
+    def measure(self, image: np.ndarray) -> SFRBatch:
+        """Measure the SFR of every edge of an image."""
+        if self.workers == 1 or len(self) < 2:
+            results = [self._measure(image, i) for i in range(len(self))]
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="sfr"
+                )
+            results = list(self._executor.map(lambda i: self._measure(image, i), range(len(self))))
+
+        mtf = np.empty((len(self), len(self.freq)))
+        mtf50 = np.empty(len(self))
+        mtf10 = np.empty(len(self))
+        angle = np.empty(len(self))
+        for i, (m, m50, m10, a) in enumerate(results):
+            mtf[i] = m
+            mtf50[i] = m50
+            mtf10[i] = m10
+            angle[i] = a
+        return SFRBatch(self.freq, mtf, mtf50, mtf10, angle)
+
+    def shutdown(self) -> None:
+        """Stop the worker threads."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+if __name__ == "__main__":
+    import time
+
+    def project2_loop(ary, fit, fac=DEFAULT_NBIN):
+        # notebooks.common.project2, with the out-of-range bin clamped
+        nlin, npix = ary.shape
+        nn = math.floor(npix * fac)
+        offset = round(fac * (0 - (nlin - 1) * fit[0]))
+        del1 = abs(offset)
+        if offset > 0:
+            offset = 0
+        bwidth = nn + del1 + BIN_MARGIN
+        p2 = [np.polyval(fit, y) - fit[1] for y in range(nlin)]
+        barray = np.zeros((2, bwidth))
+        for n in range(npix):
+            for m in range(nlin):
+                ling = math.ceil((n - p2[m]) * fac) + 1 - offset
+                ling = min(max(ling, 1), bwidth - 1)
+                barray[0, ling] = barray[0, ling] + 1
+                barray[1, ling] = barray[1, ling] + ary[m, n]
+        start = 1 + round(0.5 * del1)
+        return np.array([barray[1, i + start] / barray[0, i + start] for i in range(nn)])
+
+    # 400x400 edge at 5 degrees from vertical, blurred and noisy
+    h = w = 400
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:h, 0:w]
+    distance = (x - w / 2) - math.tan(math.radians(5)) * (y - h / 2)
+    edge = 200 + 3000 / (1 + np.exp(-distance / 1.5))
+    roi = (edge + rng.normal(0, 10, edge.shape)).astype(np.float32)
+    fit = np.array([math.tan(math.radians(5)), w / 2 - math.tan(math.radians(5)) * h / 2])
+
+    start = time.perf_counter()
+    reference = project2_loop(roi, fit)
+    loop = time.perf_counter() - start
+    vectorized = min(
+        (lambda t: (project2(roi, fit), time.perf_counter() - t)[1])(time.perf_counter())
+        for _ in range(5)
+    )
+    assert np.allclose(project2(roi, fit), reference, rtol=1e-12)
+    print("project2 loop:       {:.1f} ms".format(loop * 1e3))
+    print("project2 vectorized: {:.2f} ms ({:.0f}x)".format(vectorized * 1e3, loop / vectorized))
+
+    result = sfr(roi)
+    print("edge angle {:.2f} deg, MTF50 near {:.3f} cy/px".format(
+        result.angle, result.freq[np.argmax(result.mtf < 0.5)]
+    ))
@@ -0,0 +1,123 @@
+import threading
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .stages import Stage
+from .tiling import TileScheduler, row_band
+
+
+class Pipeline:
+    """
+    A sequence of named stages run over every frame.
+
+    Adjacent elementwise stages are fused: each row band of the frame goes
+    through all of them before the next band is touched, in one float32
+    scratch buffer. Scratch buffers are kept between runs and reused while
+    the frame shape stays the same, so the result of run() is only valid
+    until the next call unless an out buffer is given.
+
+    After each run, timings maps stage names to the seconds spent in them.
+    For fused stages on a thread pool that is time summed over all bands.
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[Stage | Tuple[str, Stage]],
+        scheduler: TileScheduler | None = None,
+    ):
+        """
+        Initialize the pipeline.
+
+        stages -- stages in order, optionally as (name, stage) pairs;
+                  unnamed stages go by their class name attribute
+        scheduler -- TileScheduler for fused stages, one thread if None
+        """
+        self.stages: List[Tuple[str, Stage]] = [
+            s if isinstance(s, tuple) else (s.name, s) for s in stages
+        ]
+        names = [name for name, _ in self.stages]
+        if len(set(names)) != len(names):
+            raise ValueError("stage names must be unique: {}".format(names))
+
+        self.scheduler = scheduler or TileScheduler(workers=1)
+        self.groups: List[List[Tuple[str, Stage]]] = []
+        for name, stage in self.stages:
+            if (
+                stage.elementwise
+                and self.groups
+                and self.groups[-1][-1][1].elementwise
+            ):
+                self.groups[-1].append((name, stage))
+            else:
+                self.groups.append([(name, stage)])
+
+        self.timings: Dict[str, float] = {name: 0.0 for name in names}
+        self.total_time = 0.0
+        self._buffers: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _buffer(self, group: int, shape: Tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+        buf = self._buffers.get(group)
+        if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[group] = buf
+        return buf
+
+    def _run_fused(self, group, src: np.ndarray, buf: np.ndarray) -> None:
+        def _rows(rows):
+            elapsed = []
+            band = row_band(buf, rows)
+            data = row_band(src, rows)
+            for _, stage in group:
+                start = time.perf_counter()
+                stage.apply_rows(data, band, rows)
+                elapsed.append(time.perf_counter() - start)
+                data = band
+            with self._lock:
+                for (name, _), seconds in zip(group, elapsed):
+                    self.timings[name] += seconds
+
+        self.scheduler.run(_rows, buf)
+
+    def run(self, frame: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Run all stages over a frame.
+
+        frame -- input frame, left unmodified
+        out -- buffer to copy the result into, if given
+        """
+        start = time.perf_counter()
+        for name in self.timings:
+            self.timings[name] = 0.0
+
+        data = frame
+        owned = False
+        for index, group in enumerate(self.groups):
+            name, stage = group[0]
+            if stage.elementwise:
+                buf = self._buffer(index, data.shape, np.dtype(np.float32))
+                self._run_fused(group, data, buf)
+                data = buf
+                owned = True
+                continue
+
+            stage_start = time.perf_counter()
+            if stage.view:
+                data = stage.apply(data, None)
+            elif stage.inplace and owned:
+                data = stage.apply(data, data)
+            else:
+                buf = self._buffer(
+                    index, stage.output_shape(data.shape), stage.output_dtype(data.dtype)
+                )
+                data = stage.apply(data, buf)
+                owned = True
+            self.timings[name] = time.perf_counter() - stage_start
+
+        if out is not None:
+            np.copyto(out, data, casting="unsafe")
+            data = out
+        self.total_time = time.perf_counter() - start
+        return data
@@ -1,11 +1,174 @@
 import numpy as np
 
+from .dark import DarkModel
+from .tiling import TileScheduler, for_each_band, row_band
+
+
+def subtract_dark(
+    raw_image: np.ndarray,
+    dark_field_img: np.ndarray,
+    out: np.ndarray | None = None,
+    scheduler: TileScheduler | None = None,
+) -> np.ndarray:
+    """
+    Subtract a dark frame into a float32 buffer.
+
+    raw_image -- raw frame R
+    dark_field_img -- dark frame D of the same shape
+    out -- float32 output buffer, allocated if None
+    scheduler -- TileScheduler to run row bands on, whole frame if None
+    """
+    if out is None:
+        out = np.empty(raw_image.shape, dtype=np.float32)
+
+    def _rows(rows):
+        np.subtract(
+            row_band(raw_image, rows), row_band(dark_field_img, rows), out=row_band(out, rows)
+        )
+
+    for_each_band(_rows, out, scheduler)
+    return out
+
+
+class FlatFieldCorrector:
+    """
+    Flat-field correction with a precomputed gain map.
+
+    https://en.wikipedia.org/wiki/Flat-field_correction
+
+    C=(R-D)*G, G=mean(F-D)/(F-D)
+
+    The reciprocal gain map G already carries the "avg of high" normalization,
+    so correcting a frame is one subtraction and one multiplication, both done
+    in place in the output buffer.
+    """
+
+    def __init__(
+        self,
+        dark_field_img: np.ndarray | DarkModel,
+        bright_field_img: np.ndarray,
+        exposure_time: float | None = None,
+    ):
+        """
+        Initialize the corrector from a calibration pair.
+
+        dark_field_img -- dark frame D, or a DarkModel to synthesize D from
+        bright_field_img -- flat (bright) frame F, taken at the exposure of D
+        exposure_time -- exposure time of F, required with a DarkModel
+        """
+        if isinstance(dark_field_img, DarkModel):
+            if exposure_time is None:
+                raise ValueError("exposure_time is required with a DarkModel")
+            self.dark_model: DarkModel | None = dark_field_img
+            self.dark = dark_field_img.synthesize(exposure_time)
+        else:
+            self.dark_model = None
+            self.dark = np.asarray(dark_field_img, dtype=np.float32).copy()
+        self.exposure_time = exposure_time
+
+        if self.dark.shape != bright_field_img.shape:
+            raise ValueError(
+                "dark and bright frames differ in shape: {} != {}".format(
+                    self.dark.shape, bright_field_img.shape
+                )
+            )
+        self.gain = np.subtract(bright_field_img, self.dark, dtype=np.float32)
+
+        # pixels without flat response would divide by zero; leave them at 0
+        valid = self.gain > 0
+        if not np.any(valid):
+            raise ValueError("bright frame has no pixels above the dark frame")
+        self.mean = float(np.mean(self.gain, where=valid, dtype=np.float64))
+        np.divide(self.mean, self.gain, out=self.gain, where=valid)
+        self.gain[~valid] = 0
+
+        self._scratch: np.ndarray | None = None
+
+    @property
+    def shape(self):
+        return self.dark.shape
+
+    def _get_scratch(self) -> np.ndarray:
+        if self._scratch is None:
+            self._scratch = np.empty(self.shape, dtype=np.float32)
+        return self._scratch
+
+    def apply(
+        self,
+        raw_image: np.ndarray,
+        out: np.ndarray | None = None,
+        scheduler: TileScheduler | None = None,
+        exposure_time: float | None = None,
+    ) -> np.ndarray:
+        """
+        Correct a raw frame.
+
+        raw_image -- raw frame R, any integer or float dtype
+        out -- float32 or uint16 output buffer, allocated as float32 if None
+        scheduler -- TileScheduler to run row bands on, whole frame if None
+        exposure_time -- exposure time of R; with a DarkModel the dark frame
+                         is synthesized for it, and kept until it changes
+
+        Returns the output buffer. Integer output is rounded and clipped to the
+        range of the dtype.
+        """
+        if raw_image.shape != self.shape:
+            raise ValueError(
+                "frame shape {} does not match calibration {}".format(
+                    raw_image.shape, self.shape
+                )
+            )
+        if out is None:
+            out = np.empty(self.shape, dtype=np.float32)
+        elif out.shape != self.shape:
+            raise ValueError(
+                "output shape {} does not match calibration {}".format(
+                    out.shape, self.shape
+                )
+            )
+
+        if exposure_time is not None and exposure_time != self.exposure_time:
+            if self.dark_model is None:
+                raise ValueError(
+                    "dark frame was measured at {}, not {}; use a DarkModel".format(
+                        self.exposure_time, exposure_time
+                    )
+                )
+            self.dark_model.synthesize(exposure_time, out=self.dark, scheduler=scheduler)
+            self.exposure_time = exposure_time
+
+        if out.dtype == np.float32:
+
+            def _rows(rows):
+                work = row_band(out, rows)
+                np.subtract(row_band(raw_image, rows), row_band(self.dark, rows), out=work)
+                np.multiply(work, row_band(self.gain, rows), out=work)
+
+        elif out.dtype == np.uint16:
+            scratch = self._get_scratch()
+
+            def _rows(rows):
+                work = row_band(scratch, rows)
+                np.subtract(row_band(raw_image, rows), row_band(self.dark, rows), out=work)
+                np.multiply(work, row_band(self.gain, rows), out=work)
+                np.rint(work, out=work)
+                np.clip(work, 0, np.iinfo(np.uint16).max, out=work)
+                np.copyto(row_band(out, rows), work, casting="unsafe")
+
+        else:
+            raise TypeError("unsupported output dtype: {}".format(out.dtype))
+
+        for_each_band(_rows, out, scheduler)
+        return out
+
+
 def flatfieldcorrect(raw_image: np.ndarray, dark_field_img: np.ndarray, bright_field_img: np.ndarray) -> np.ndarray:
     """
     https://en.wikipedia.org/wiki/Flat-field_correction
 
     C=(R-D)/(F-D)*(avg of high)
-    """
-    result = (raw_image - dark_field_img)/bright_field_img
-    return result
 
+    Builds the gain map on every call; keep a FlatFieldCorrector around when
+    correcting more than one frame with the same calibration.
+    """
+    return FlatFieldCorrector(dark_field_img, bright_field_img).apply(raw_image)
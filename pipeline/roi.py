@@ -0,0 +1,228 @@
+import threading
+from typing import Sequence, Tuple
+
+import numpy as np
+
+# bounds follow notebooks.common.get_roi: frame[top:bottom, left:right];
+# mask is an index into ROISet.masks, or -1 for the full rectangle
+ROI_DTYPE = np.dtype(
+    [
+        ("left", np.int32),
+        ("top", np.int32),
+        ("right", np.int32),
+        ("bottom", np.int32),
+        ("mask", np.int32),
+    ]
+)
+
+MEASUREMENT_DTYPE = np.dtype(
+    [
+        ("mean", np.float64),
+        ("std", np.float64),
+        ("min", np.float64),
+        ("max", np.float64),
+        ("count", np.int64),
+    ]
+)
+
+# summed-area tables cost about this many gathered ROI pixels per pixel of
+# the ROIs' bounding box, both tables included
+SAT_PIXEL_COST = 1.2
+
+# summed-area table rows are built in bands of about this size, which stay
+# in cache; only the entries at ROI corners are kept
+SAT_BAND_BYTES = 1 << 20
+
+
+class ROISet:
+    """
+    A batch of rectangular, optionally masked, regions of interest.
+
+    The flat indices of every ROI's pixels are laid out once, grouped by ROI.
+    Measuring a frame is then one gather of those pixels followed by grouped
+    reductions (np.add/minimum/maximum.reduceat), so the cost depends on the
+    number of ROI pixels, not on the number of ROIs or the frame size.
+
+    When unmasked ROIs cover their bounding box many times over, sums and
+    sums of squares come instead from summed-area tables of the bounding
+    box, four lookups per ROI, so that part of the cost stays flat as ROIs
+    are added. The tables are built a cache-sized band of rows at a time and
+    only their entries at ROI corners are kept, so they take no frame-sized
+    memory. Values are shifted by a frame-wide level before squaring to keep
+    the variance from cancelling; integer frames are summed exactly. Minimum
+    and maximum are only measured when asked for, from the gathered pixels.
+    """
+
+    def __init__(self, rois: np.ndarray, shape: Tuple[int, int], masks: Sequence[np.ndarray] = ()):
+        """
+        Initialize the ROI set.
+
+        rois -- structured array of ROI_DTYPE
+        shape -- (height, width) of the frames to measure
+        masks -- boolean masks, each of its ROI's (bottom - top, right - left)
+                 shape, referenced by the mask field
+        """
+        self.rois = np.asarray(rois, dtype=ROI_DTYPE)
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.masks = [np.asarray(m, dtype=bool) for m in masks]
+        h, w = self.shape
+
+        indices = []
+        for i, roi in enumerate(self.rois):
+            left, top, right, bottom, mask = (int(v) for v in roi)
+            if not (0 <= left < right <= w and 0 <= top < bottom <= h):
+                raise ValueError("ROI {} is empty or outside the frame: {}".format(i, roi))
+            index = (np.arange(top, bottom)[:, None] * w + np.arange(left, right)).ravel()
+            if mask >= 0:
+                selected = self.masks[mask]
+                if selected.shape != (bottom - top, right - left):
+                    raise ValueError("mask {} does not match ROI {}".format(mask, i))
+                index = index[selected.ravel()]
+                if len(index) == 0:
+                    raise ValueError("mask {} of ROI {} selects no pixels".format(mask, i))
+            indices.append(index)
+
+        self.counts = np.array([len(index) for index in indices], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)[:-1]]).astype(np.intp)
+        self.index = (
+            np.concatenate(indices).astype(np.intp) if indices else np.empty(0, dtype=np.intp)
+        )
+
+        self.bbox: Tuple[int, int, int, int] | None = None
+        self._corner_rows: np.ndarray | None = None
+        self._corner_cols: np.ndarray | None = None
+        self._corner_order: np.ndarray | None = None
+        self._bands: Tuple[np.ndarray, np.ndarray] | None = None
+        self._lock = threading.Lock()
+        if len(self.rois) and np.all(self.rois["mask"] < 0):
+            left, top = int(self.rois["left"].min()), int(self.rois["top"].min())
+            right, bottom = int(self.rois["right"].max()), int(self.rois["bottom"].max())
+            if (bottom - top) * (right - left) * SAT_PIXEL_COST < self.counts.sum():
+                self.bbox = (left, top, right, bottom)
+                rows = [self.rois["top"] - top, self.rois["bottom"] - top]
+                cols = [self.rois["left"] - left, self.rois["right"] - left]
+                # summed-area table entries added or subtracted per ROI, see
+                # _sat_sums; entry (r, c) sums the box's rows < r and cols < c
+                self._corner_rows = np.concatenate([rows[1], rows[0], rows[1], rows[0]])
+                self._corner_cols = np.concatenate([cols[1], cols[1], cols[0], cols[0]])
+                self._corner_rows = self._corner_rows.astype(np.intp)
+                self._corner_cols = self._corner_cols.astype(np.intp)
+                # corners in the order the table rows are built
+                self._corner_order = np.argsort(self._corner_rows, kind="stable")
+
+    def __len__(self):
+        return len(self.rois)
+
+    @classmethod
+    def from_rects(
+        cls,
+        rects: Sequence[Tuple[Sequence[int], Sequence[int]]],
+        shape: Tuple[int, int],
+    ) -> "ROISet":
+        """
+        Build an ROI set from rectangles given as get_roi takes them.
+
+        rects -- (topleft, bottomright) pairs of [x, y] corners
+        shape -- (height, width) of the frames to measure
+        """
+        rois = np.empty(len(rects), dtype=ROI_DTYPE)
+        for i, (topleft, bottomright) in enumerate(rects):
+            rois[i] = (topleft[0], topleft[1], bottomright[0], bottomright[1], -1)
+        return cls(rois, shape)
+
+    def measure(self, frame: np.ndarray, extrema: bool = False) -> np.ndarray:
+        """
+        Measure every ROI of a frame.
+
+        extrema -- whether to measure min and max, which are NaN otherwise;
+                   they are reduced from every ROI pixel, so they cost time
+                   in proportion to the total ROI area
+
+        Returns a structured array of MEASUREMENT_DTYPE, one entry per ROI.
+        """
+        if frame.shape != self.shape:
+            raise ValueError(
+                "frame shape {} does not match {}".format(frame.shape, self.shape)
+            )
+        result = np.empty(len(self), dtype=MEASUREMENT_DTYPE)
+        if len(self) == 0:
+            return result
+
+        values = None
+        if self.bbox is None or extrema:
+            values = np.take(frame, self.index)
+        if self.bbox is None:
+            sums = np.add.reduceat(values, self.offsets, dtype=np.float64)
+            mean = sums / self.counts
+            # two passes: deviations from each ROI's own mean
+            deviations = np.subtract(values, np.repeat(mean, self.counts), dtype=np.float64)
+            variance = np.add.reduceat(np.square(deviations, out=deviations), self.offsets)
+            variance /= self.counts
+        else:
+            mean, variance = self._sat_moments(frame)
+
+        result["mean"] = mean
+        result["std"] = np.sqrt(variance)
+        if extrema:
+            result["min"] = np.minimum.reduceat(values, self.offsets)
+            result["max"] = np.maximum.reduceat(values, self.offsets)
+        else:
+            result["min"] = np.nan
+            result["max"] = np.nan
+        result["count"] = self.counts
+        return result
+
+    def _sat_moments(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        left, top, right, bottom = self.bbox
+        crop = frame[top:bottom, left:right]
+        exact = np.issubdtype(frame.dtype, np.integer) and frame.dtype.itemsize <= 2
+        dtype = np.dtype(np.int64 if exact else np.float64)
+        # a frame-wide level from a decimated view; sums are taken around it
+        shift = np.mean(crop[::16, ::16], dtype=np.float64)
+        shift = dtype.type(round(shift)) if exact else shift
+
+        height, width = crop.shape
+        with self._lock:
+            rows = max(1, SAT_BAND_BYTES // ((width + 1) * dtype.itemsize))
+            if self._bands is None or self._bands[0].dtype != dtype:
+                self._bands = tuple(np.zeros((rows, width + 1), dtype=dtype) for _ in range(2))
+            sums, squares = self._bands
+            # table entries at every corner, of the values and of the squares
+            corners = np.zeros((2, len(self._corner_rows)), dtype=dtype)
+            # running last table row, the sum over all rows built so far
+            carry = np.zeros((2, width + 1), dtype=dtype)
+
+            order = self._corner_order
+            sorted_rows = self._corner_rows[order]
+            # corners on table row 0 sum nothing and stay 0
+            done = np.searchsorted(sorted_rows, 0, side="right")
+            for start in range(0, height, rows):
+                stop = min(start + rows, height)
+                s1, s2 = sums[: stop - start], squares[: stop - start]
+                # column 0 stays 0, the table's leading zero column
+                np.subtract(crop[start:stop], shift, out=s1[:, 1:], dtype=dtype)
+                np.square(s1[:, 1:], out=s2[:, 1:])
+                for band, previous in ((s1, carry[0]), (s2, carry[1])):
+                    np.cumsum(band[:, 1:], axis=1, out=band[:, 1:])
+                    band[0] += previous
+                    np.cumsum(band, axis=0, out=band)
+                    previous[:] = band[-1]
+                # table row r is band row r - 1 - start
+                end = np.searchsorted(sorted_rows, stop, side="right")
+                entries = order[done:end]
+                band_rows = self._corner_rows[entries] - 1 - start
+                band_cols = self._corner_cols[entries]
+                corners[0, entries] = s1[band_rows, band_cols]
+                corners[1, entries] = s2[band_rows, band_cols]
+                done = end
+
+        s1 = self._sat_sums(corners[0]).astype(np.float64)
+        s2 = self._sat_sums(corners[1]).astype(np.float64)
+        mean = s1 / self.counts
+        variance = np.maximum(s2 / self.counts - np.square(mean), 0)
+        return mean + shift, variance
+
+    def _sat_sums(self, corners: np.ndarray) -> np.ndarray:
+        # bottom-right - top-right - bottom-left + top-left
+        a, b, c, d = corners.reshape(4, -1)
+        return a - b - c + d
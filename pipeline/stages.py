@@ -0,0 +1,203 @@
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from .binning import AVERAGE, bin_frame, binned_dtype, binned_shape
+from .color import ColorMatrix
+from .defects import BadPixelCorrector
+from .linearize import LinearizationLUT
+from .tiling import row_band
+
+
+class Stage:
+    """
+    A processing step of a Pipeline.
+
+    Elementwise stages map every pixel independently and keep the frame
+    shape; the pipeline fuses runs of them into one pass over row bands and
+    calls apply_rows. Other stages see the whole frame through apply.
+    """
+
+    name = "stage"
+    elementwise = False
+    # apply may write its result into its own input
+    inplace = False
+    # apply returns a view of its input and needs no output buffer
+    view = False
+
+    def output_shape(self, shape: Tuple[int, ...]) -> Tuple[int, ...]:
+        return tuple(shape)
+
+    def output_dtype(self, dtype: np.dtype) -> np.dtype:
+        return np.dtype(np.float32)
+
+    def apply(self, src: np.ndarray, out: np.ndarray | None) -> np.ndarray:
+        """
+        Process a whole frame.
+
+        src -- input frame
+        out -- output buffer of output_shape/output_dtype, src itself for an
+               inplace stage, or None for a view stage
+
+        Returns the result, normally out.
+        """
+        raise NotImplementedError
+
+    def apply_rows(self, src: np.ndarray, out: np.ndarray, rows: slice) -> None:
+        """
+        Process a row band of an elementwise stage.
+
+        src -- input band, may be the same array as out
+        out -- float32 output band
+        rows -- position of the band in the frame, for per-pixel maps
+        """
+        raise NotImplementedError
+
+
+class LinearizeStage(Stage):
+    """
+    Map raw integer codes through a LinearizationLUT.
+
+    Must come first in its run of elementwise stages, which reads the raw frame.
+    """
+
+    name = "linearize"
+    elementwise = True
+
+    def __init__(self, lut: LinearizationLUT):
+        self.lut = lut
+
+    def apply_rows(self, src, out, rows):
+        self.lut.apply_rows(src, out)
+
+
+class DarkStage(Stage):
+    """Subtract a dark frame."""
+
+    name = "dark"
+    elementwise = True
+
+    def __init__(self, dark_field_img: np.ndarray):
+        self.dark = np.asarray(dark_field_img, dtype=np.float32)
+
+    def apply_rows(self, src, out, rows):
+        np.subtract(src, row_band(self.dark, rows), out=out)
+
+
+class FlatStage(Stage):
+    """Multiply by a reciprocal gain map, e.g. FlatFieldCorrector.gain."""
+
+    name = "flat"
+    elementwise = True
+
+    def __init__(self, gain: np.ndarray):
+        self.gain = np.asarray(gain, dtype=np.float32)
+
+    def apply_rows(self, src, out, rows):
+        np.multiply(src, row_band(self.gain, rows), out=out)
+
+
+class ColorMatrixStage(Stage):
+    """Apply a square color matrix to a (c, h, w) channel stack."""
+
+    name = "color"
+    elementwise = True
+
+    def __init__(self, matrix: np.ndarray):
+        self.color = ColorMatrix(matrix)
+        if self.color.matrix.shape[0] != self.color.matrix.shape[1]:
+            raise ValueError(
+                "color matrix must be square, got {}".format(self.color.matrix.shape)
+            )
+
+    def apply_rows(self, src, out, rows):
+        if not self.color.diagonal and np.shares_memory(src, out):
+            src = src.copy()
+        self.color.apply_rows(src, out)
+
+
+class ClipStage(Stage):
+    """Clip values to [lo, hi]."""
+
+    name = "clip"
+    elementwise = True
+
+    def __init__(self, lo: float, hi: float):
+        self.lo = lo
+        self.hi = hi
+
+    def apply_rows(self, src, out, rows):
+        np.clip(src, self.lo, self.hi, out=out)
+
+
+class BadPixelStage(Stage):
+    """
+    Replace defective pixels of a mono frame with the median of their good
+    neighbours, see BadPixelCorrector.
+
+    indices -- flat indices of the defective pixels, see detect_bad_pixels
+    """
+
+    name = "bad-pixel"
+    inplace = True
+
+    def __init__(self, indices: np.ndarray):
+        self.indices = indices
+        self.corrector: BadPixelCorrector | None = None
+
+    def apply(self, src, out):
+        if out is not src:
+            np.copyto(out, src)
+        if self.corrector is None or self.corrector.shape != out.shape:
+            self.corrector = BadPixelCorrector(self.indices, out.shape)
+        return self.corrector.apply(out)
+
+
+class BinningStage(Stage):
+    """
+    Bin blocks of (by, bx) pixels, see bin_frame.
+
+    Placed before the elementwise stages, it bins the raw integer frame
+    (uint32 sums in Sum mode) and shrinks every stage after it; their
+    per-pixel maps must then be binned the same way.
+    """
+
+    name = "binning"
+
+    def __init__(self, factor: Tuple[int, int] = (2, 2), mode: str = AVERAGE):
+        self.factor = factor
+        self.mode = mode
+
+    def output_shape(self, shape):
+        return binned_shape(shape, self.factor)
+
+    def output_dtype(self, dtype):
+        return binned_dtype(dtype, self.mode)
+
+    def apply(self, src, out):
+        return bin_frame(src, self.factor, self.mode, out)
+
+
+class RoiStage(Stage):
+    """
+    Crop to a rectangle, given like notebooks.common.get_roi as [x, y] corners.
+
+    Stages after the crop see the cropped frame, so per-pixel maps they use
+    must be cropped the same way.
+    """
+
+    name = "roi"
+    view = True
+
+    def __init__(self, topleft: Sequence[int], bottomright: Sequence[int]):
+        self.left, self.top = topleft
+        self.right, self.bottom = bottomright
+
+    def output_shape(self, shape):
+        return tuple(shape[:-2]) + (self.bottom - self.top, self.right - self.left)
+
+    def output_dtype(self, dtype):
+        return np.dtype(dtype)
+
+    def apply(self, src, out):
+        return src[..., self.top : self.bottom, self.left : self.right]
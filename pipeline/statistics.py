@@ -0,0 +1,133 @@
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+# rows per np.bincount call; bincount converts its input to intp, so this
+# bounds that temporary instead of materializing it for the whole frame
+BAND_PIXELS = 1 << 18
+
+DEFAULT_PERCENTILES = (1.0, 50.0, 99.0, 99.9)
+
+
+class FrameStatistics:
+    """
+    Statistics of an integer frame, all derived from one pixel-value histogram.
+
+    The histogram has one bin per code (np.bincount), so the mean, extremes,
+    saturation count, percentiles and histograms with any binning are cheap
+    reductions over at most 65536 counts instead of passes over the frame.
+    """
+
+    def __init__(self, counts: np.ndarray, max_value: int):
+        """
+        Initialize from a per-code histogram.
+
+        counts -- number of pixels at each code 0..max_value
+        max_value -- saturation code, e.g. 4095 for Mono12
+        """
+        self.counts = counts
+        self.max_value = max_value
+        self.count = int(counts.sum())
+        if self.count == 0:
+            raise ValueError("no pixels")
+        self._cumsum = np.cumsum(counts)
+
+    @classmethod
+    def from_frame(cls, frame: np.ndarray, max_value: int, step: int = 1) -> "FrameStatistics":
+        """
+        Compute the statistics of an unsigned integer frame.
+
+        frame -- frame of unsigned integer codes, (h, w), (h, w, 1) as from
+                 vmbpy, or a (c, h, w) stack
+        max_value -- saturation code, e.g. 4095 for Mono12
+        step -- use every step-th row and column only
+        """
+        if not np.issubdtype(frame.dtype, np.unsignedinteger):
+            raise TypeError("statistics need unsigned integer frames, got {}".format(frame.dtype))
+        if frame.ndim == 3 and frame.shape[-1] == 1:
+            # drop the channel axis so the decimation below hits rows and columns
+            frame = frame[..., 0]
+        if step > 1:
+            frame = frame[..., ::step, ::step]
+        frame = frame.reshape(-1, frame.shape[-1])
+
+        counts = np.zeros(max_value + 1, dtype=np.int64)
+        rows = max(1, BAND_PIXELS // frame.shape[-1])
+        for start in range(0, frame.shape[0], rows):
+            band = np.bincount(frame[start : start + rows].ravel(), minlength=max_value + 1)
+            # codes above max_value (stray high bits) count as saturated
+            counts += band[: max_value + 1]
+            counts[max_value] += band[max_value + 1 :].sum()
+        return cls(counts, max_value)
+
+    @property
+    def mean(self) -> float:
+        return float(np.dot(self.counts, np.arange(len(self.counts))) / self.count)
+
+    @property
+    def std(self) -> float:
+        levels = np.arange(len(self.counts), dtype=np.float64)
+        variance = np.dot(self.counts, np.square(levels - self.mean)) / self.count
+        return float(np.sqrt(variance))
+
+    @property
+    def min(self) -> int:
+        return int(np.argmax(self.counts > 0))
+
+    @property
+    def max(self) -> int:
+        return int(len(self.counts) - 1 - np.argmax(self.counts[::-1] > 0))
+
+    @property
+    def saturated(self) -> int:
+        """Number of pixels at the saturation code."""
+        return int(self.counts[self.max_value])
+
+    @property
+    def saturated_fraction(self) -> float:
+        return self.saturated / self.count
+
+    def percentile(self, q: float | Sequence[float]) -> np.ndarray:
+        """
+        Get the lowest codes at or below which q percent of pixels lie.
+
+        q -- percentile or sequence of percentiles, 0..100
+        """
+        rank = np.ceil(np.asarray(q, dtype=np.float64) / 100.0 * self.count)
+        rank = np.clip(rank, 1, self.count)
+        return np.searchsorted(self._cumsum, rank)
+
+    def histogram(self, bins: int = 10, range: Tuple[float, float] | None = None):
+        """
+        Get a histogram with equal-width bins, like np.histogram on the frame.
+
+        bins -- number of bins
+        range -- (lo, hi) of the bins, (0, max_value) if None
+
+        Returns (hist, bin_edges).
+        """
+        lo, hi = (0, self.max_value) if range is None else range
+        edges = np.linspace(lo, hi, bins + 1)
+        levels = np.arange(len(self.counts))
+        index = np.searchsorted(edges, levels, side="right") - 1
+        # the last bin includes its right edge
+        index[levels == hi] = bins - 1
+        inside = (index >= 0) & (index < bins) & (levels >= lo) & (levels <= hi)
+        hist = np.bincount(index[inside], weights=self.counts[inside], minlength=bins)
+        return hist.astype(np.int64), edges
+
+    def as_dict(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES, bins: int = 10) -> Dict:
+        """Summarize the statistics as plain JSON-serializable values."""
+        hist, edges = self.histogram(bins)
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.min,
+            "max": self.max,
+            "saturated": self.saturated,
+            "percentiles": {
+                str(q): int(v) for q, v in zip(percentiles, self.percentile(percentiles))
+            },
+            "histogram": {"counts": hist.tolist(), "edges": edges.tolist()},
+        }
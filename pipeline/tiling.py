@@ -0,0 +1,117 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import numpy as np
+
+# Row bands are sized to stay resident in a per-core L2 cache while every
+# stage of a band runs, so the second stage reads what the first just wrote.
+DEFAULT_TILE_BYTES = 1 << 20
+
+
+class TileScheduler:
+    """
+    Splits frames into row bands and runs a band function on a thread pool.
+
+    NumPy releases the GIL inside ufunc loops, so bands of the same frame are
+    processed concurrently. Band functions only ever touch their own rows,
+    which keeps the result identical to processing the whole frame at once.
+    """
+
+    def __init__(
+        self,
+        tile_height: int | None = None,
+        workers: int | None = None,
+        tile_bytes: int = DEFAULT_TILE_BYTES,
+    ):
+        """
+        Initialize the scheduler.
+
+        tile_height -- rows per band, derived from tile_bytes if None
+        workers -- size of the thread pool, at least 1; os.cpu_count() if None
+        tile_bytes -- target band size when tile_height is None
+        """
+        if tile_height is not None and tile_height < 1:
+            raise ValueError("tile_height must be positive")
+        if workers is not None and workers < 1:
+            raise ValueError("workers must be positive")
+        self.tile_height = tile_height
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.tile_bytes = tile_bytes
+        self._executor: ThreadPoolExecutor | None = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def bands(self, height: int, row_bytes: int = 0) -> List[slice]:
+        """
+        Get the row bands covering a frame.
+
+        height -- number of rows in the frame
+        row_bytes -- bytes per row, used to size bands when tile_height is None
+        """
+        tile_height = self.tile_height
+        if tile_height is None:
+            tile_height = max(1, self.tile_bytes // max(1, row_bytes))
+        return [
+            slice(start, min(start + tile_height, height))
+            for start in range(0, height, tile_height)
+        ]
+
+    def run(self, fn: Callable[[slice], None], frame: np.ndarray) -> None:
+        """
+        Call fn(rows) for every row band of frame and wait for all of them.
+
+        fn -- band function, receives a slice over axis -2 of frame
+        frame -- array whose rows (axis -2) are split into bands
+        """
+        height = frame.shape[-2]
+        bands = self.bands(height, frame.nbytes // max(1, height))
+
+        if self.workers == 1 or len(bands) == 1:
+            for rows in bands:
+                fn(rows)
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="tile"
+            )
+        futures = [self._executor.submit(fn, rows) for rows in bands]
+        for future in futures:
+            future.result()
+
+    def shutdown(self) -> None:
+        """Stop the worker threads."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def row_band(array: np.ndarray, rows: slice) -> np.ndarray:
+    """
+    Get the rows of a band of array, a view.
+
+    Bands always run over axis -2, so that frames with a trailing channel
+    axis are split by rows, and so are any per-pixel maps banded with them.
+    """
+    return array[..., rows, :]
+
+
+def for_each_band(
+    fn: Callable[[slice], None],
+    frame: np.ndarray,
+    scheduler: TileScheduler | None = None,
+) -> None:
+    """
+    Run a band function over frame, tiled if a scheduler is given.
+
+    Without a scheduler fn is called once with a slice over all rows.
+    """
+    if scheduler is None:
+        fn(slice(None))
+    else:
+        scheduler.run(fn, frame)
@@ -0,0 +1,133 @@
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+from .tiling import TileScheduler
+
+
+class RadialFlatModel(NamedTuple):
+    """
+    Radially symmetric flat field, F(r) = polyval(coeffs, r).
+
+    coeffs -- polynomial coefficients, highest power first as for np.polyval
+    center -- (row, column) of the optical axis
+    shape -- (height, width) of the frame the model describes
+    """
+
+    coeffs: Tuple[float, ...]
+    center: Tuple[float, float]
+    shape: Tuple[int, int]
+
+    def to_array(self) -> np.ndarray:
+        """Pack the model into a float64 vector, e.g. for a CalibrationStore."""
+        return np.array([*self.shape, *self.center, *self.coeffs], dtype=np.float64)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray) -> "RadialFlatModel":
+        h, w, cy, cx, *coeffs = (float(v) for v in array)
+        return cls(tuple(coeffs), (cy, cx), (int(h), int(w)))
+
+    def field(self, scheduler: TileScheduler | None = None) -> np.ndarray:
+        """Get the flat field as a read-only float32 frame, see radial_field."""
+        return radial_field(self.coeffs, self.shape, self.center, scheduler)
+
+
+def fit_radial_model(
+    bright_field_img: np.ndarray,
+    deg: int = 4,
+    center: Tuple[float, float] | None = None,
+    step: int = 8,
+) -> RadialFlatModel:
+    """
+    Fit a radial polynomial vignetting model to a flat (bright) frame.
+
+    bright_field_img -- flat frame, dark-subtracted
+    deg -- degree of the polynomial in r
+    center -- (row, column) of the optical axis, frame center if None
+    step -- fit on every step-th pixel in both directions
+    """
+    h, w = bright_field_img.shape
+    if center is None:
+        center = (h // 2, w // 2)
+    cy, cx = center
+
+    sample = bright_field_img[::step, ::step]
+    dy = np.arange(0, h, step, dtype=np.float64) - cy
+    dx = np.arange(0, w, step, dtype=np.float64) - cx
+    r = np.hypot(dy[:, None], dx[None, :])
+
+    # fit in r/scale for conditioning, then rescale to coefficients in r
+    scale = max(float(r.max()), 1.0)
+    coeffs = np.polyfit(r.ravel() / scale, sample.ravel().astype(np.float64), deg)
+    coeffs /= scale ** np.arange(deg, -1, -1)
+    return RadialFlatModel(
+        tuple(float(c) for c in coeffs), (float(cy), float(cx)), (h, w)
+    )
+
+
+# fields are large; keep only the few geometries in use
+FIELD_CACHE_SIZE = 4
+_field_cache: OrderedDict = OrderedDict()
+_field_cache_lock = threading.Lock()
+
+
+def _evaluate_field(coeffs, shape, center, scheduler: TileScheduler) -> np.ndarray:
+    h, w = shape
+    cy, cx = center
+    dy2 = np.square(np.arange(h, dtype=np.float32) - np.float32(cy))
+    dx2 = np.square(np.arange(w, dtype=np.float32) - np.float32(cx))
+    coeffs32 = [np.float32(c) for c in coeffs]
+    field = np.empty(shape, dtype=np.float32)
+
+    def _rows(rows):
+        out = field[rows]
+        r = np.add(dy2[rows, None], dx2[None, :])
+        np.sqrt(r, out=r)
+        # Horner's scheme, in place
+        out.fill(coeffs32[0])
+        for c in coeffs32[1:]:
+            np.multiply(out, r, out=out)
+            np.add(out, c, out=out)
+
+    scheduler.run(_rows, field)
+    field.setflags(write=False)
+    return field
+
+
+def radial_field(
+    coeffs: Tuple[float, ...],
+    shape: Tuple[int, int],
+    center: Tuple[float, float] | None = None,
+    scheduler: TileScheduler | None = None,
+) -> np.ndarray:
+    """
+    Evaluate a radial polynomial over a frame.
+
+    coeffs -- polynomial coefficients, highest power first
+    shape -- (height, width) of the frame
+    center -- (row, column) of the optical axis, frame center if None
+    scheduler -- TileScheduler to run row bands on, one thread if None
+
+    Fields are cached by coefficients and geometry; the returned array is
+    shared and read-only.
+    """
+    if center is None:
+        center = (shape[0] // 2, shape[1] // 2)
+    key = (
+        tuple(float(c) for c in coeffs),
+        (int(shape[0]), int(shape[1])),
+        (float(center[0]), float(center[1])),
+    )
+    with _field_cache_lock:
+        if key in _field_cache:
+            _field_cache.move_to_end(key)
+            return _field_cache[key]
+
+    field = _evaluate_field(*key, scheduler or TileScheduler(workers=1))
+    with _field_cache_lock:
+        _field_cache[key] = field
+        while len(_field_cache) > FIELD_CACHE_SIZE:
+            _field_cache.popitem(last=False)
+    return field
@@ -0,0 +1,298 @@
+import asyncio
+import contextlib
+import threading
+import time
+import zlib
+from typing import List
+
+import numpy as np
+from pyee import EventEmitter
+
+from pipeline.unpack import pack_mono10p, pack_mono12p, unpack_mono10p, unpack_mono12p
+from plugins.vmb_camera.stream import FrameStream
+
+BIT_DEPTHS = {
+    "Mono8": 8,
+    "Mono10": 10,
+    "Mono12": 12,
+    "Mono10p": 10,
+    "Mono12p": 12,
+}
+
+# packed formats are stored packed and unpacked per frame, as from a camera
+PACKED_FORMATS = {
+    "Mono10p": (pack_mono10p, unpack_mono10p),
+    "Mono12p": (pack_mono12p, unpack_mono12p),
+}
+
+TRIGGER_MODES = ("Software", "FreeRun")
+
+# exposure time at which the pattern reaches half of full scale, in us
+REFERENCE_EXPOSURE = 10000.0
+
+# memory for the float32 patterns; large frames get fewer distinct frames
+PATTERN_BYTES = 256 << 20
+
+
+def pattern(shape, max_value: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Synthesize a test frame: slanted edges over a vignetted field, plus noise.
+
+    Values are floats at the reference exposure, before quantization.
+    """
+    h, w = shape
+    # broadcast row and column coordinates; only the frame itself is full size
+    y = np.arange(h, dtype=np.float32)[:, None]
+    x = np.arange(w, dtype=np.float32)[None, :]
+    field = 1 - 0.6 * (np.square((y - h / 2) / h) + np.square((x - w / 2) / w))
+    # a column of dark/bright bands with 5 degree slanted edges
+    slant = np.float32(np.tan(np.radians(5)))
+    period = max(16, w // 8)
+    frame = np.mod(x - slant * y, np.float32(period))
+    bright = frame >= period / 2
+    frame.fill(0.25)
+    frame[bright] = 1.0
+    del bright
+    frame *= field
+    frame *= np.float32(0.5 * max_value)
+    noise = rng.standard_normal(shape, dtype=np.float32)
+    noise *= np.float32(0.005 * max_value)
+    frame += noise
+    return frame
+
+
+class SimulatedCamera(FrameStream, EventEmitter):
+    """
+    Camera backend producing synthetic frames, for testing without hardware.
+
+    Implements the VmbCamera interface. Frames cycle through up to bank_size
+    float patterns, as many as fit in PATTERN_BYTES, generated once when the
+    camera is opened. Each pattern is scaled to the exposure time and
+    quantized, and packed for the packed formats, when a frame needs it at
+    a new exposure; the result is kept for the next frames at that exposure.
+    At a steady exposure a frame costs an index, or an unpack for the packed
+    formats, and exposure changes cost one pattern per frame actually taken.
+    A streaming thread delivers frames at up to fps, either on every
+    software trigger or continuously in FreeRun, through the same
+    process_frame path as the Vimba frame callback.
+    """
+
+    def __init__(
+        self,
+        camera_id: str | None = None,
+        width: int = 2048,
+        height: int = 1536,
+        pixel_format: str = "Mono8",
+        fps: float = 10.0,
+        trigger_mode: str = "Software",
+        bank_size: int = 8,
+        write_frames: bool = False,
+    ):
+        """
+        Initialize the simulated camera.
+
+        camera_id -- name of the camera
+        width, height -- frame size
+        pixel_format -- one of BIT_DEPTHS
+        fps -- highest frame rate
+        trigger_mode -- one of TRIGGER_MODES
+        bank_size -- largest number of distinct frames cycled through
+        write_frames -- whether frames are written to disk like real captures
+        """
+        EventEmitter.__init__(self)
+        self.init_stream()
+        if pixel_format not in BIT_DEPTHS:
+            raise ValueError("pixel_format must be one of {}".format(", ".join(BIT_DEPTHS)))
+        if trigger_mode not in TRIGGER_MODES:
+            raise ValueError("trigger_mode must be one of {}".format(", ".join(TRIGGER_MODES)))
+        self.camera_id = camera_id
+        self.shape = (height, width)
+        self.pixel_format = pixel_format
+        self.fps = fps
+        self.trigger_mode = trigger_mode
+        self.bank_size = bank_size
+        self.write_frames = write_frames
+
+        self.disarm_evt = asyncio.Event()
+        self.image_ready_evt = asyncio.Event()
+        self.is_initialized = False
+        self.is_opened = False
+        self.is_armed = False
+        self.id = None
+        self.cam = contextlib.nullcontext(self)
+
+        self.patterns: List[np.ndarray] = []
+        self.exposure = REFERENCE_EXPOSURE
+        # each pattern as delivered, and the exposure it was rendered at
+        self.bank: List[np.ndarray] = []
+        self._bank_exposures: List[float | None] = []
+        self._scaled = np.empty(self.shape, dtype=np.float32)
+        self._quantized = np.empty(self.shape, dtype=np.uint16)
+        self.unpack_buffer = np.empty(self.shape, dtype=np.uint16)
+
+        self._triggers = threading.Semaphore(0)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.frames_generated = 0
+
+    @classmethod
+    def from_settings(cls, camera_id: str | None, settings) -> "SimulatedCamera":
+        """Create a camera configured by the sim_* fields of ServerSettings."""
+        return cls(
+            camera_id,
+            width=settings.sim_width,
+            height=settings.sim_height,
+            pixel_format=settings.sim_pixel_format,
+            fps=settings.sim_fps,
+            trigger_mode=settings.sim_trigger_mode,
+            write_frames=settings.sim_write_frames,
+        )
+
+    def set_pixel_format(self, pixel_format: str) -> None:
+        if pixel_format not in BIT_DEPTHS:
+            raise ValueError("pixel_format must be one of {}".format(", ".join(BIT_DEPTHS)))
+        if pixel_format != self.pixel_format:
+            self.pixel_format = pixel_format
+            # the patterns are scaled to the bit depth
+            self.patterns = []
+
+    def max_value(self) -> int:
+        return (1 << BIT_DEPTHS[self.pixel_format]) - 1
+
+    def frame_dtype(self) -> np.dtype:
+        return np.dtype(np.uint8 if BIT_DEPTHS[self.pixel_format] == 8 else np.uint16)
+
+    def _build_patterns(self) -> None:
+        if self.patterns:
+            return
+        count = max(1, min(self.bank_size, PATTERN_BYTES // (4 * self.shape[0] * self.shape[1])))
+        # seeded from the id, so a camera's frames are the same in every run
+        rng = np.random.default_rng(zlib.crc32(str(self.camera_id).encode()))
+        self.patterns = [pattern(self.shape, self.max_value(), rng) for _ in range(count)]
+        if self.pixel_format in PACKED_FORMATS:
+            # whole groups of packed pixels, e.g. 3 bytes per 2 at 12 bits
+            size = self.shape[0] * self.shape[1] * BIT_DEPTHS[self.pixel_format] // 8
+            self.bank = [np.empty(size, dtype=np.uint8) for _ in range(count)]
+        else:
+            self.bank = [np.empty(self.shape, dtype=self.frame_dtype()) for _ in range(count)]
+        self._bank_exposures = [None] * count
+
+    def _render(self, i: int) -> None:
+        # quantize pattern i at the current exposure into its bank entry
+        exposure = self.exposure
+        scaled = np.multiply(
+            self.patterns[i], np.float32(exposure / REFERENCE_EXPOSURE), out=self._scaled
+        )
+        np.rint(scaled, out=scaled)
+        np.clip(scaled, 0, self.max_value(), out=scaled)
+        if self.pixel_format in PACKED_FORMATS:
+            np.copyto(self._quantized, scaled, casting="unsafe")
+            PACKED_FORMATS[self.pixel_format][0](self._quantized, self.bank[i])
+        else:
+            np.copyto(self.bank[i], scaled, casting="unsafe")
+        self._bank_exposures[i] = exposure
+
+    def frame(self, index: int) -> np.ndarray:
+        """Get frame index at the current exposure, unpacked for the packed formats."""
+        i = index % len(self.bank)
+        if self._bank_exposures[i] != self.exposure:
+            self._render(i)
+        data = self.bank[i]
+        if self.pixel_format in PACKED_FORMATS:
+            unpack = PACKED_FORMATS[self.pixel_format][1]
+            return unpack(data, self.shape, self.unpack_buffer)
+        return data
+
+    def _stream(self):
+        period = 1.0 / self.fps
+        next_time = time.monotonic()
+        index = 0
+        while not self._stop.is_set():
+            if self.trigger_mode == "Software" and not self._triggers.acquire(timeout=0.1):
+                continue
+            now = time.monotonic()
+            if now < next_time:
+                time.sleep(next_time - now)
+            next_time = max(now, next_time) + period
+            self.process_frame(self.frame(index), self.max_value())
+            self.frames_generated += 1
+            index += 1
+
+    def software_trigger(self):
+        self._triggers.release()
+
+    async def init(self):
+        print("initializing simulated camera system")
+        self.is_initialized = True
+
+    async def deinit(self):
+        print("deinitializing simulated camera system")
+        await self.disarm_swtrigger()
+        await asyncio.get_running_loop().run_in_executor(None, self.shutdown_stream)
+        self.is_opened = False
+        self.is_initialized = False
+
+    async def open(self):
+        await asyncio.get_running_loop().run_in_executor(None, self._build_patterns)
+        self.is_opened = True
+        print("opened simulated camera {}".format(self.camera_id))
+
+    async def close(self):
+        await self.disarm_swtrigger()
+        self.is_opened = False
+        print("closed simulated camera {}".format(self.camera_id))
+
+    async def arm_task(self, input=None):
+        if not self.is_armed:
+            if input:
+                self.set_pixel_format(input.get("pixel_format", self.pixel_format))
+                await self.set_integration_time(input["exposure_time_hint"])
+            await asyncio.get_running_loop().run_in_executor(None, self._build_patterns)
+            ring_size = input.get("ring_size") if input else None
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.allocate_ring, self.shape, self.frame_dtype(), ring_size
+            )
+            self._stop.clear()
+            self.trigger_times.clear()
+            self._thread = threading.Thread(
+                target=self._stream, name="sim-stream-{}".format(self.camera_id), daemon=True
+            )
+            self._thread.start()
+            print("armed {} triggering".format(self.trigger_mode))
+            self.is_armed = True
+            try:
+                await self.disarm_evt.wait()
+            finally:
+                self._stop.set()
+                await asyncio.get_running_loop().run_in_executor(None, self._thread.join)
+                if self.frame_queue is not None:
+                    self.frame_queue.close()
+                print("disarmed {} triggering".format(self.trigger_mode))
+                self.disarm_evt = asyncio.Event()
+                self.is_armed = False
+
+    async def arm_swtrigger(self, input=None):
+        asyncio.create_task(self.arm_task(input))
+
+    async def disarm_swtrigger(self):
+        self.disarm_evt.set()
+
+    async def capture0(self, id):
+        self.id = id
+        self.trigger()
+
+    async def capture(self, id):
+        self.id = id
+        self.trigger()
+
+    async def capture_swtrigger(self, id, integration_time):
+        self.id = id
+        await self.set_integration_time(integration_time)
+        self.trigger()
+
+    async def set_integration_time(self, integration_time: float):
+        # frames are rescaled as they are taken
+        self.exposure = float(integration_time)
+
+    async def get_integration_time(self) -> float:
+        return self.exposure
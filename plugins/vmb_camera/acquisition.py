@@ -0,0 +1,181 @@
+import asyncio
+import collections
+import threading
+import time
+from enum import StrEnum, auto
+from typing import Any, Callable, Dict
+
+
+class QueuePolicy(StrEnum):
+    # keep the queued frames, discard the one arriving
+    DropNewest = auto()
+    # discard the oldest queued frame to make room
+    DropOldest = auto()
+    # hold the producer until the consumer makes room
+    Block = auto()
+
+
+class QueueClosed(Exception):
+    pass
+
+
+class AcquisitionQueue:
+    """
+    Bounded queue from the Vimba streaming thread to an asyncio consumer.
+
+    put() is called on the producer thread and never touches the event loop
+    except to wake a waiting consumer with call_soon_threadsafe. The policy
+    decides what happens to a frame arriving at a full queue. Under
+    QueuePolicy.Block the streaming thread waits, which pushes backpressure
+    into the driver, whose own buffers then fill. Counters of produced,
+    consumed and dropped frames are kept, so the queue can be sized against
+    the consumer's latency.
+
+    The queue is an async iterator; iteration ends once it is closed and
+    drained.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 8,
+        policy: QueuePolicy = QueuePolicy.DropOldest,
+        timeout: float | None = 1.0,
+        discard: Callable[[Any], None] | None = None,
+    ):
+        """
+        Initialize the queue.
+
+        maxsize -- frames held before the policy applies
+        policy -- what to do with a frame arriving at a full queue
+        timeout -- longest wait of the producer under QueuePolicy.Block,
+                   forever if None; the frame is dropped after it
+        discard -- called with every dropped frame, e.g. FrameLease.release
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.policy = QueuePolicy(policy)
+        self.timeout = timeout
+        self.discard = discard
+        self._items: collections.deque = collections.deque()
+        self._condition = threading.Condition()
+        self._waiter: asyncio.Future | None = None
+        self._closed = False
+
+        self.produced = 0
+        self.consumed = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _drop(self, item) -> None:
+        self.dropped += 1
+        if self.discard is not None:
+            self.discard(item)
+
+    def _wake(self) -> None:
+        # called with the condition held
+        waiter, self._waiter = self._waiter, None
+        if waiter is not None:
+            waiter.get_loop().call_soon_threadsafe(self._resolve, waiter)
+
+    @staticmethod
+    def _resolve(waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def put(self, item) -> bool:
+        """
+        Queue a frame from the producer thread.
+
+        Returns False if this frame was dropped.
+        """
+        with self._condition:
+            self.produced += 1
+            if self._closed:
+                self._drop(item)
+                return False
+            if len(self._items) >= self.maxsize:
+                if self.policy == QueuePolicy.DropNewest:
+                    self._drop(item)
+                    return False
+                if self.policy == QueuePolicy.DropOldest:
+                    self._drop(self._items.popleft())
+                else:
+                    deadline = None if self.timeout is None else time.monotonic() + self.timeout
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    if len(self._items) >= self.maxsize or self._closed:
+                        self._drop(item)
+                        return False
+            self._items.append(item)
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._wake()
+            return True
+
+    def get_nowait(self):
+        """Get the oldest frame; raises IndexError if the queue is empty."""
+        with self._condition:
+            item = self._items.popleft()
+            self.consumed += 1
+            self._condition.notify()
+            return item
+
+    async def get(self):
+        """Wait for the oldest frame; raises QueueClosed once closed and drained."""
+        while True:
+            with self._condition:
+                if self._items:
+                    item = self._items.popleft()
+                    self.consumed += 1
+                    self._condition.notify()
+                    return item
+                if self._closed:
+                    raise QueueClosed()
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiter = waiter
+            await waiter
+
+    def close(self) -> None:
+        """End iteration once the queued frames are consumed, and stop blocking the producer."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            self._wake()
+
+    def clear(self) -> None:
+        """Drop every queued frame."""
+        with self._condition:
+            while self._items:
+                self._drop(self._items.popleft())
+            self._condition.notify_all()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.get()
+        except QueueClosed:
+            raise StopAsyncIteration
+
+    def metrics(self) -> Dict:
+        """Depth and counters, as plain values."""
+        return {
+            "policy": str(self.policy),
+            "maxsize": self.maxsize,
+            "depth": len(self._items),
+            "max_depth": self.max_depth,
+            "produced": self.produced,
+            "consumed": self.consumed,
+            "dropped": self.dropped,
+        }
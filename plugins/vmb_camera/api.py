@@ -1,4 +1,3 @@
-import cv2
 from vmbpy import (  # type: ignore
     VmbSystem,
     Camera,
@@ -13,11 +12,30 @@ from enum import StrEnum, auto
 from pyee import EventEmitter
 import numpy as np
 
+from pipeline.unpack import unpack_mono10p, unpack_mono12p
+from .session import CameraSession
+from .stream import FrameStream
+
+BIT_DEPTHS = {
+    PixelFormat.Mono8: 8,
+    PixelFormat.Mono10: 10,
+    PixelFormat.Mono12: 12,
+    PixelFormat.Mono10p: 10,
+    PixelFormat.Mono12p: 12,
+}
+
+PACKED_FORMATS = {
+    PixelFormat.Mono10p: unpack_mono10p,
+    PixelFormat.Mono12p: unpack_mono12p,
+}
+
 
 class PxielFormat(StrEnum):
     Mono8 = auto()
     Mono10 = auto()
     Mono12 = auto()
+    Mono10p = auto()
+    Mono12p = auto()
 
 
 class BinningMode(StrEnum):
@@ -156,10 +174,16 @@ class VmbCameraBase:
         pass
 
 
-class VmbCamera(VmbCameraBase, EventEmitter):
-    def __init__(self, *args):
+class VmbCamera(VmbCameraBase, FrameStream, EventEmitter):
+    def __init__(self, *args, camera_id: str | None = None):
         VmbCameraBase.__init__(self, *args)
         EventEmitter.__init__(self, *args)
+        self.init_stream()
+
+        # None takes the first camera found
+        self.camera_id = camera_id
+        # names written frames; set by the capture actions
+        self.id = None
 
         self.disarm_evt = asyncio.Event()
         self.opened_evt = asyncio.Event()
@@ -172,18 +196,55 @@ class VmbCamera(VmbCameraBase, EventEmitter):
         self.is_opened = False
         self.is_armed = False
 
+        # the loop the events and tasks belong to; the change handlers run on
+        # a Vimba thread and hand their work to it
+        try:
+            self.loop: asyncio.AbstractEventLoop | None = asyncio.get_running_loop()
+        except RuntimeError:
+            self.loop = None
+
         self.vmb: VmbSystem = VmbSystem.get_instance()
-        self.vmb.register_camera_change_handler(self.camera_changed)
-        self.vmb.register_interface_change_handler(self.interface_changed)
+        self.watching = False
+        self.watch_changes(True)
 
-        self.cam: Camera
+        # held open for the life of the arm; entering it again is free
+        self.cam: CameraSession
+        self.unpack_buffer: np.ndarray | None = None
 
         self.on("camera changed", self.on_camera_changed)
 
+    def watch_changes(self, enable: bool):
+        """Register or unregister the VmbSystem change handlers, which are global."""
+        if enable == self.watching:
+            return
+        if enable:
+            self.vmb.register_camera_change_handler(self.camera_changed)
+            self.vmb.register_interface_change_handler(self.interface_changed)
+        else:
+            self.vmb.unregister_camera_change_handler(self.camera_changed)
+            self.vmb.unregister_interface_change_handler(self.interface_changed)
+        self.watching = enable
+
+    def owns(self, dev) -> bool:
+        """Whether a camera change event is about this camera."""
+        if self.camera_id is not None:
+            return dev.get_id() == self.camera_id
+        # None takes the first camera found: whichever is open, else any
+        if self.is_opened:
+            return dev.get_id() == self.cam.get_id()
+        return True
+
     def camera_changed(self, dev, state):
+        # every VmbCamera's handler sees every device
+        if not self.owns(dev):
+            return
         print("camera changed: {}, {}".format(dev, state))
+        if self.loop is None:
+            print("camera changed: no event loop yet, ignored")
+            return
         if state == CameraEvent.Missing:
-            asyncio.run(self.close())
+            # keep watching, so the camera reopens when it is detected again
+            asyncio.run_coroutine_threadsafe(self.close(keep_watching=True), self.loop)
         elif state == CameraEvent.Detected:
             # asyncio.run(self.open())
             # asyncio.create_task(self.open_task())
@@ -193,18 +254,65 @@ class VmbCamera(VmbCameraBase, EventEmitter):
         print("interface changed: {}, {}".format(dev, state))
 
     def on_camera_changed(self, d):
-        asyncio.run(self.open())
+        # emitted from camera_changed, on the Vimba thread
+        asyncio.run_coroutine_threadsafe(self.open(), self.loop)
+
+    def frame_to_ndarray(self, frame: Frame) -> np.ndarray:
+        unpack = PACKED_FORMATS.get(frame.get_pixel_format())
+        if unpack is None:
+            return frame.as_numpy_ndarray()
+
+        shape = (frame.get_height(), frame.get_width())
+        if self.unpack_buffer is None or self.unpack_buffer.shape != shape:
+            self.unpack_buffer = np.empty(shape, dtype=np.uint16)
+        return unpack(frame.get_buffer(), shape, self.unpack_buffer)
 
     def handler(self, cam: Camera, stream: Stream, frame: Frame):
-        if frame.get_status() == FrameStatus.Complete:
-            img = frame.as_numpy_ndarray()
-            print("mean: {}".format(np.mean(img)))
-            print("histo: {}".format(np.histogram(img, bins=10, range=(0, 1023))))
-            cv2.imwrite(f"capture_{self.id}.png", img)
-            self.image_ready_evt.set()
-        cam.queue_frame(frame)
+        try:
+            if frame.get_status() == FrameStatus.Complete:
+                img = self.frame_to_ndarray(frame)
+                max_value = (1 << BIT_DEPTHS.get(frame.get_pixel_format(), 16)) - 1
+                self.process_frame(img, max_value)
+        finally:
+            # the driver buffer goes back even if handing the frame off failed
+            cam.queue_frame(frame)
+
+    def frame_geometry(self):
+        """Shape and dtype of the frames frame_to_ndarray will produce."""
+        shape = (self.cam.get_feature("Height"), self.cam.get_feature("Width"))
+        pixel_format = self.cam.get_pixel_format()
+        dtype = np.uint8 if BIT_DEPTHS.get(pixel_format, 16) == 8 else np.uint16
+        if pixel_format in PACKED_FORMATS:
+            return shape, dtype
+        # as_numpy_ndarray keeps the channel axis
+        return shape + (1,), dtype
+
+    def supported_pixel_format(self, name: str) -> PixelFormat:
+        """
+        Get the vmbpy pixel format for a PxielFormat name, e.g. Mono12p.
+
+        Raises ValueError for a name outside PxielFormat or a format the
+        camera does not support.
+        """
+        try:
+            pixel_format = PixelFormat[PxielFormat(str(name).lower()).name]
+        except (KeyError, ValueError):
+            raise ValueError(
+                "pixel_format must be one of {}".format(", ".join(f.name for f in PxielFormat))
+            ) from None
+        if pixel_format not in self.cam.get_pixel_formats():
+            raise ValueError("camera does not support pixel format {}".format(pixel_format))
+        return pixel_format
+
+    def software_trigger(self):
+        self.cam.TriggerSoftware.run()
+
+    def max_value(self) -> int:
+        # cached by the session, so free while armed
+        return (1 << BIT_DEPTHS.get(self.cam.get_pixel_format(), 16)) - 1
 
     async def init_task(self):
+        self.loop = asyncio.get_running_loop()
         self.vmb = VmbSystem.get_instance()
         if not self.is_initialized:
             with self.vmb:
@@ -218,13 +326,18 @@ class VmbCamera(VmbCameraBase, EventEmitter):
             self.is_initialized = False
 
     async def deinit_task(self):
+        self.watch_changes(False)
         self.shutdown_evt.set()
+        await asyncio.get_running_loop().run_in_executor(None, self.shutdown_stream)
 
     async def open_task(self):
         if not self.is_opened:
+            self.watch_changes(True)
             with self.vmb:
-                cams = self.vmb.get_all_cameras()
-                self.cam = cams[0]
+                if self.camera_id is None:
+                    self.cam = CameraSession(self.vmb.get_all_cameras()[0])
+                else:
+                    self.cam = CameraSession(self.vmb.get_camera_by_id(self.camera_id))
                 # self.opened_evt.set()
                 print("opened")
                 self.is_opened = True
@@ -249,7 +362,9 @@ class VmbCamera(VmbCameraBase, EventEmitter):
         print("opening")
         asyncio.create_task(self.open_task())
 
-    async def close(self):
+    async def close(self, keep_watching: bool = False):
+        if not keep_watching:
+            self.watch_changes(False)
         print("setting the closed_evt: {}".format(self.closed_evt))
         self.closed_evt.set()
         print("closing")
@@ -258,13 +373,26 @@ class VmbCamera(VmbCameraBase, EventEmitter):
         if not self.is_armed:
             with self.cam as cam:
                 print("arming software triggering")
-                cam.set_pixel_format(PixelFormat.Mono8)
+                pixel_format = input.get("pixel_format", "Mono8") if input else "Mono8"
+                cam.set_pixel_format(self.supported_pixel_format(pixel_format))
                 if input:
-                    cam.ExposureTime.set(input["exposure_time_hint"])
-                cam.TriggerSource.set("Software")
-                cam.TriggerSelector.set("FrameStart")
-                cam.TriggerMode.set("On")
-                cam.AcquisitionMode.set("Continuous")
+                    cam.set_feature("ExposureTime", input["exposure_time_hint"])
+                cam.set_feature("TriggerSource", "Software")
+                cam.set_feature("TriggerSelector", "FrameStart")
+                cam.set_feature("TriggerMode", "On")
+                cam.set_feature("AcquisitionMode", "Continuous")
+                self.trigger_times.clear()
+                # every buffer the frame callback uses is allocated here, not
+                # on the driver thread with the first frame
+                shape, dtype = self.frame_geometry()
+                if cam.get_pixel_format() in PACKED_FORMATS and (
+                    self.unpack_buffer is None or self.unpack_buffer.shape != shape
+                ):
+                    self.unpack_buffer = np.empty(shape, dtype=np.uint16)
+                ring_size = input.get("ring_size") if input else None
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.allocate_ring, shape, dtype, ring_size
+                )
 
                 try:
                     cam.start_streaming(self.handler)
@@ -273,6 +401,8 @@ class VmbCamera(VmbCameraBase, EventEmitter):
                     await self.disarm_evt.wait()
                 finally:
                     cam.stop_streaming()
+                    if self.frame_queue is not None:
+                        self.frame_queue.close()
                     print("disarmed software triggering")
                     self.disarm_evt = asyncio.Event()
                     self.is_armed = False
@@ -292,20 +422,23 @@ class VmbCamera(VmbCameraBase, EventEmitter):
 
     async def capture(self, id):
         self.id = id
-        with self.cam as c:
-            c.TriggerSoftware.run()
+        with self.cam:
+            self.trigger()
 
     async def capture_swtrigger(self, id, integration_time):
         """
         Software triggering
         """
         self.id = id
-        with self.cam as cam:
+        with self.cam:
             try:
                 await self.set_integration_time(integration_time)
-                cam.TriggerSoftware.run()
+                self.trigger()
             except Exception:
                 pass
 
     async def set_integration_time(self, integration_time: int):
-        self.cam.ExposureTime.set(integration_time)
+        self.cam.set_feature("ExposureTime", integration_time)
+
+    async def get_integration_time(self) -> float:
+        return self.cam.get_feature("ExposureTime")
@@ -0,0 +1,193 @@
+import mmap
+import threading
+import time
+from enum import StrEnum, auto
+from typing import Dict, List
+
+import numpy as np
+
+PAGE_SIZE = mmap.PAGESIZE
+
+
+def aligned_empty(shape, dtype, alignment: int = PAGE_SIZE) -> np.ndarray:
+    """
+    Allocate an uninitialized array whose data starts on an alignment boundary.
+
+    The array is touched once so its pages are faulted in here rather than
+    on the first frame copied into it.
+    """
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    raw = np.empty(nbytes + alignment, dtype=np.uint8)
+    start = -raw.ctypes.data % alignment
+    array = raw[start : start + nbytes].view(dtype).reshape(shape)
+    array.fill(0)
+    return array
+
+
+class RingPolicy(StrEnum):
+    # wait for a consumer to release a buffer
+    Block = auto()
+    # take the oldest buffer back from its consumers, invalidating their leases
+    OverwriteOldest = auto()
+
+
+class FrameLease:
+    """
+    A hold on one buffer of a FrameRing.
+
+    The buffer is not reused while any lease on it is held, except under
+    RingPolicy.OverwriteOldest, where valid turns False once the buffer has
+    been handed out again. Consumers that may be overwritten read the frame
+    and then check valid.
+    """
+
+    __slots__ = ("ring", "slot", "generation", "_released")
+
+    def __init__(self, ring: "FrameRing", slot: int, generation: int):
+        self.ring = ring
+        self.slot = slot
+        self.generation = generation
+        self._released = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    @property
+    def array(self) -> np.ndarray:
+        return self.ring.buffers[self.slot]
+
+    @property
+    def valid(self) -> bool:
+        return self.ring.generations[self.slot] == self.generation
+
+    def share(self) -> "FrameLease":
+        """Get another lease on the same buffer, e.g. for a second consumer."""
+        return self.ring._share(self)
+
+    def release(self) -> None:
+        """Give up the lease; releasing twice is a no-op."""
+        if not self._released:
+            self._released = True
+            self.ring._release(self)
+
+
+class FrameRing:
+    """
+    Ring of preallocated, page-aligned frame buffers handed out as leases.
+
+    A producer acquires the next free buffer, fills it, and passes the lease
+    (or shares of it) to its consumers instead of copying the frame; each
+    consumer releases its lease when done. When every buffer is held, the
+    policy decides whether acquire waits for a release or takes back the
+    buffer written longest ago.
+    """
+
+    def __init__(
+        self,
+        shape,
+        dtype,
+        count: int = 8,
+        policy: RingPolicy = RingPolicy.Block,
+    ):
+        """
+        Allocate the ring.
+
+        shape -- frame shape
+        dtype -- frame dtype
+        count -- number of buffers
+        policy -- what acquire does when every buffer is held
+        """
+        if count < 1:
+            raise ValueError("count must be positive")
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.policy = RingPolicy(policy)
+        self.buffers: List[np.ndarray] = [
+            aligned_empty(self.shape, self.dtype) for _ in range(count)
+        ]
+        self.generations = [0] * count
+        self.refcounts = [0] * count
+        self.written = [0] * count
+        self._sequence = 0
+        self._condition = threading.Condition()
+
+        self.acquired = 0
+        self.overwritten = 0
+        self.timeouts = 0
+
+    def __len__(self):
+        return len(self.buffers)
+
+    def matches(self, img: np.ndarray) -> bool:
+        return img.shape == self.shape and img.dtype == self.dtype
+
+    def _free_slot(self) -> int | None:
+        free = [i for i, refs in enumerate(self.refcounts) if refs == 0]
+        if not free:
+            return None
+        # the least recently written, so recent frames stay readable longest
+        return min(free, key=self.written.__getitem__)
+
+    def acquire(self, timeout: float | None = None) -> FrameLease | None:
+        """
+        Get a buffer to write a frame into.
+
+        timeout -- seconds to wait under RingPolicy.Block, forever if None
+                   and not at all if 0
+
+        Returns None if no buffer was released in time.
+        """
+        with self._condition:
+            slot = self._free_slot()
+            if slot is None and self.policy == RingPolicy.OverwriteOldest:
+                slot = min(range(len(self)), key=self.written.__getitem__)
+                self.refcounts[slot] = 0
+                self.overwritten += 1
+            elif slot is None:
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while slot is None:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.timeouts += 1
+                        return None
+                    self._condition.wait(remaining)
+                    slot = self._free_slot()
+
+            self._sequence += 1
+            self.written[slot] = self._sequence
+            self.generations[slot] += 1
+            self.refcounts[slot] = 1
+            self.acquired += 1
+            return FrameLease(self, slot, self.generations[slot])
+
+    def _share(self, lease: FrameLease) -> FrameLease:
+        with self._condition:
+            if lease._released or not lease.valid:
+                raise ValueError("lease is no longer held")
+            self.refcounts[lease.slot] += 1
+            return FrameLease(self, lease.slot, lease.generation)
+
+    def _release(self, lease: FrameLease) -> None:
+        with self._condition:
+            # a lease on an overwritten buffer no longer counts
+            if lease.valid:
+                self.refcounts[lease.slot] -= 1
+                if self.refcounts[lease.slot] == 0:
+                    self._condition.notify()
+
+    def metrics(self) -> Dict:
+        """Occupancy and counters, as plain values."""
+        with self._condition:
+            held = sum(1 for refs in self.refcounts if refs)
+        return {
+            "count": len(self),
+            "held": held,
+            "policy": str(self.policy),
+            "acquired": self.acquired,
+            "overwritten": self.overwritten,
+            "timeouts": self.timeouts,
+        }
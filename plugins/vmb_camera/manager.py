@@ -0,0 +1,138 @@
+import asyncio
+import inspect
+import threading
+from typing import Callable, Dict, List
+
+
+def vmb_camera(camera_id: str | None):
+    # imported here so that other backends run without vmbpy installed
+    from .api import VmbCamera
+
+    return VmbCamera(camera_id=camera_id)
+
+
+def vmb_camera_ids() -> List[str]:
+    """Get the ids of the Vimba cameras currently detected."""
+    from vmbpy import VmbSystem  # type: ignore
+
+    with VmbSystem.get_instance() as vmb:
+        return [cam.get_id() for cam in vmb.get_all_cameras()]
+
+
+class CameraProxy:
+    """
+    Server-side handle on a camera that lives on its own thread and loop.
+
+    Coroutine methods are scheduled on the camera's loop and awaited from
+    the caller's loop, async generators are iterated across the two loops,
+    and every other attribute is the camera's own. Actions written against
+    a VmbCamera work unchanged against a proxy.
+    """
+
+    def __init__(self, camera, loop: asyncio.AbstractEventLoop):
+        self._camera = camera
+        self._loop = loop
+
+    def __getattr__(self, name):
+        attr = getattr(self._camera, name)
+        if inspect.iscoroutinefunction(attr):
+
+            def call(*args, **kwargs):
+                future = asyncio.run_coroutine_threadsafe(attr(*args, **kwargs), self._loop)
+                return asyncio.wrap_future(future)
+
+            return call
+        if inspect.isasyncgenfunction(attr):
+            return lambda *args, **kwargs: self._iterate(attr(*args, **kwargs))
+        return attr
+
+    async def _iterate(self, generator):
+        try:
+            while True:
+                future = asyncio.run_coroutine_threadsafe(generator.__anext__(), self._loop)
+                try:
+                    yield await asyncio.wrap_future(future)
+                except StopAsyncIteration:
+                    return
+        finally:
+            asyncio.run_coroutine_threadsafe(generator.aclose(), self._loop)
+
+
+class CameraThread:
+    """An event loop on a dedicated thread, running one camera."""
+
+    def __init__(self, camera_id: str | None, factory: Callable):
+        self.camera_id = camera_id
+        self.factory = factory
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self._run, name="camera-{}".format(camera_id), daemon=True
+        )
+        self.thread.start()
+        # created on its own loop, so its events and tasks belong there
+        self.camera = asyncio.run_coroutine_threadsafe(
+            self._create(), self.loop
+        ).result()
+        self.proxy = CameraProxy(self.camera, self.loop)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def _create(self):
+        return self.factory(self.camera_id)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+
+
+class CameraManager:
+    """
+    Opens every detected camera and runs each on its own thread and loop.
+
+    Frame callbacks already run on a Vimba streaming thread per camera;
+    giving each camera its own loop as well keeps one camera's captures,
+    merges and sweeps from queueing behind another's on the server loop.
+    """
+
+    def __init__(
+        self,
+        factory: Callable | None = None,
+        discover: Callable[[], List[str]] | None = None,
+    ):
+        """
+        Initialize the manager.
+
+        factory -- creates the camera for an id, VmbCamera if None
+        discover -- lists the ids of the connected cameras, Vimba's if None
+        """
+        self.factory = factory or vmb_camera
+        self.discover = discover or vmb_camera_ids
+        self.threads: Dict[str | None, CameraThread] = {}
+
+    def start(self, camera_ids: List[str] | None = None) -> List[CameraProxy]:
+        """
+        Start a thread for every camera.
+
+        camera_ids -- cameras to run, every detected one if None; if none is
+                      detected, one camera taking the first to appear is run
+
+        Returns the camera proxies, in camera_ids order.
+        """
+        if camera_ids is None:
+            camera_ids = self.discover()
+        for camera_id in camera_ids or [None]:
+            if camera_id not in self.threads:
+                self.threads[camera_id] = CameraThread(camera_id, self.factory)
+        return self.cameras
+
+    @property
+    def cameras(self) -> List[CameraProxy]:
+        return [thread.proxy for thread in self.threads.values()]
+
+    def stop(self) -> None:
+        """Stop every camera thread."""
+        for thread in self.threads.values():
+            thread.stop()
+        self.threads.clear()
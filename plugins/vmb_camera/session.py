@@ -0,0 +1,97 @@
+import threading
+from typing import Any, Dict
+
+
+class CameraSession:
+    """
+    A Vimba camera kept open across captures, with cached feature writes.
+
+    Entering a vmbpy Camera opens it, and leaving closes it, each costing
+    GenICam traffic. The session counts its holders instead: only the first
+    entry opens the camera and only the last exit closes it, so an arm held
+    for the life of the stream makes every capture's `with` free. Feature
+    writes go through set_feature, which skips a value equal to the one last
+    written; the cache is dropped whenever the camera is closed, since
+    another application may change the features in between.
+
+    Every other attribute is the camera's own.
+    """
+
+    def __init__(self, camera):
+        self.camera = camera
+        self._holders = 0
+        self._lock = threading.Lock()
+        self._written: Dict[str, Any] = {}
+        self._pixel_format = None
+
+        self.opens = 0
+        self.writes = 0
+        self.skipped_writes = 0
+
+    def __getattr__(self, name):
+        return getattr(self.camera, name)
+
+    def __enter__(self):
+        with self._lock:
+            if self._holders == 0:
+                self.camera.__enter__()
+                self.opens += 1
+            self._holders += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self._holders -= 1
+            if self._holders == 0:
+                self.invalidate()
+                self.camera.__exit__(*exc)
+
+    @property
+    def is_open(self) -> bool:
+        return self._holders > 0
+
+    def invalidate(self) -> None:
+        """Forget the cached feature values, e.g. after the camera changed them."""
+        self._written.clear()
+        self._pixel_format = None
+
+    def set_feature(self, name: str, value) -> bool:
+        """
+        Write a feature unless it already holds value.
+
+        Returns False if the write was skipped.
+        """
+        if name in self._written and self._written[name] == value:
+            self.skipped_writes += 1
+            return False
+        getattr(self.camera, name).set(value)
+        self._written[name] = value
+        self.writes += 1
+        return True
+
+    def get_feature(self, name: str):
+        """Read a feature from the camera, which may have rounded the value written."""
+        return getattr(self.camera, name).get()
+
+    def set_pixel_format(self, pixel_format) -> bool:
+        if self._pixel_format == pixel_format:
+            self.skipped_writes += 1
+            return False
+        self.camera.set_pixel_format(pixel_format)
+        self._pixel_format = pixel_format
+        self.writes += 1
+        return True
+
+    def get_pixel_format(self):
+        if self._pixel_format is None:
+            self._pixel_format = self.camera.get_pixel_format()
+        return self._pixel_format
+
+    def metrics(self) -> Dict:
+        """Opens and feature write counters, as plain values."""
+        return {
+            "open": self.is_open,
+            "opens": self.opens,
+            "writes": self.writes,
+            "skipped_writes": self.skipped_writes,
+        }
@@ -0,0 +1,391 @@
+import asyncio
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Dict, NamedTuple, Sequence
+
+import numpy as np
+
+from pipeline.exposure import AutoExposure
+from pipeline.focus import FocusResult, ThroughFocus
+from pipeline.hdr import HDRMerger
+from pipeline.statistics import FrameStatistics
+from .acquisition import AcquisitionQueue, QueuePolicy
+from .buffers import FrameLease, FrameRing, RingPolicy
+from .writer import FrameWriter
+
+# frame buffers allocated when arming, unless the arm input gives ring_size
+DEFAULT_RING_SIZE = 16
+
+
+class TriggerLatency:
+    """
+    Time from software trigger to frame arrival, over the recent triggers.
+
+    Measured on the host, from the trigger command to the frame reaching
+    process_frame, so it includes exposure, readout and transfer as well
+    as the trigger command's own round trip.
+    """
+
+    def __init__(self, window: int = 256):
+        self.samples: collections.deque = collections.deque(maxlen=window)
+        self.count = 0
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+
+    def metrics(self) -> Dict:
+        """Count and recent median, 90th percentile and maximum in ms, as plain values."""
+        if not self.samples:
+            return {"count": self.count}
+        ms = np.array(self.samples) * 1e3
+        return {
+            "count": self.count,
+            "median_ms": float(np.median(ms)),
+            "p90_ms": float(np.percentile(ms, 90)),
+            "max_ms": float(ms.max()),
+        }
+
+
+class FrameRequest(NamedTuple):
+    """A caller of trigger_and_wait, waiting for the next frame."""
+
+    future: asyncio.Future
+    # whether the caller wants a lease on the frame, or only its statistics
+    copy: bool
+    # decimation of the frame for its statistics
+    step: int
+
+
+class FrameStream:
+    """
+    Frame path and capture procedures shared by every camera backend.
+
+    A backend calls process_frame from its streaming thread for each
+    complete frame, and provides:
+
+    cam -- context manager held around multi-frame captures, cheap to
+           enter while the camera is armed
+    is_armed -- whether frames are being streamed
+    software_trigger() -- trigger one frame; callers use trigger(), which
+                          also times the frame's arrival
+    max_value() -- saturation code of the current pixel format
+    set_integration_time(t), get_integration_time() -- exposure time, async
+
+    It calls allocate_ring when arming, before the first frame arrives.
+    """
+
+    def init_stream(self):
+        self.statistics: FrameStatistics | None = None
+        # replaced, never mutated, so the streaming thread reads it whole
+        self.frame_request: FrameRequest | None = None
+        self.writer = FrameWriter()
+        self.write_frames = True
+        self.ring: FrameRing | None = None
+        self.ring_size = DEFAULT_RING_SIZE
+        self.ring_policy = RingPolicy.Block
+        self.dropped_frames = 0
+        self.frame_queue: AcquisitionQueue | None = None
+        # times of the triggers whose frames have not arrived, oldest first
+        self.trigger_times: collections.deque = collections.deque(maxlen=64)
+        self.trigger_latency = TriggerLatency()
+        # numbers the frames, so each written file has its own name
+        self.frame_number = 0
+        self._statistics_executor: ThreadPoolExecutor | None = None
+        self._statistics_pending = 0
+        self._statistics_lock = threading.Lock()
+
+    def software_trigger(self):
+        raise NotImplementedError
+
+    def max_value(self) -> int:
+        raise NotImplementedError
+
+    def trigger(self):
+        """Software-trigger one frame and time it until it arrives."""
+        self.trigger_times.append(time.perf_counter())
+        self.software_trigger()
+
+    def allocate_ring(self, shape, dtype, size: int | None = None) -> FrameRing:
+        """
+        Allocate the frame ring ahead of streaming.
+
+        shape, dtype -- geometry of the frames process_frame will be given
+        size -- number of buffers, ring_size if None
+
+        The buffers are prefaulted, which takes a while at full resolution,
+        so backends call this off the event loop when arming, never from the
+        streaming thread. A ring that already fits is kept.
+        """
+        if size is not None:
+            self.ring_size = size
+        ring = self.ring
+        if (
+            ring is None
+            or ring.shape != tuple(shape)
+            or ring.dtype != np.dtype(dtype)
+            or len(ring) != self.ring_size
+            or ring.policy != self.ring_policy
+        ):
+            # leases still held on the old ring keep its buffers alive
+            self.ring = None
+            self.ring = FrameRing(shape, dtype, self.ring_size, self.ring_policy)
+        return self.ring
+
+    def process_frame(self, img: np.ndarray, max_value: int):
+        """
+        Hand a complete frame to its consumers, on the streaming thread.
+
+        img -- frame, which may be reused as soon as this returns
+        max_value -- saturation code of the pixel format
+
+        Only the copy into the frame ring happens here; statistics, the
+        "statistics" event and the wake-up of trigger_and_wait follow on the
+        statistics thread. While that thread is busy, frames nobody waits for
+        get no statistics, so it never holds more than one of them.
+        """
+        # frames arrive in trigger order, so each is timed against the oldest
+        # trigger still pending
+        if self.trigger_times:
+            self.trigger_latency.add(time.perf_counter() - self.trigger_times.popleft())
+        self.frame_number += 1
+        # the one copy out of the driver buffer; consumers share leases on it.
+        # The ring is allocated when arming; a frame it does not fit is dropped
+        ring = self.ring
+        lease = ring.acquire(timeout=0) if ring is not None and ring.matches(img) else None
+        request = self.frame_request
+        future = request.future if request is not None else None
+        if lease is None:
+            self.dropped_frames += 1
+            if future is not None:
+                future.get_loop().call_soon_threadsafe(self.resolve_frame, future, None)
+            self.image_ready_evt.set()
+            return
+        np.copyto(lease.array, img)
+        queue = self.frame_queue
+        if queue is not None and not queue.closed:
+            queue.put(lease.share())
+        # encoding and disk I/O happen on the writer threads
+        if self.write_frames:
+            self.writer.submit(lease.share(), f"capture_{self.id}_{self.frame_number:06d}")
+        with self._statistics_lock:
+            wanted = future is not None or self._statistics_pending == 0
+            if wanted:
+                self._statistics_pending += 1
+        if wanted:
+            self.statistics_executor().submit(self.update_statistics, lease, max_value, request)
+        else:
+            lease.release()
+        self.image_ready_evt.set()
+
+    def statistics_executor(self) -> ThreadPoolExecutor:
+        # one thread, so statistics are published in frame order
+        if self._statistics_executor is None:
+            self._statistics_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="statistics"
+            )
+        return self._statistics_executor
+
+    def update_statistics(self, lease: FrameLease, max_value: int, request: FrameRequest | None):
+        future = request.future if request is not None else None
+        try:
+            self.statistics = FrameStatistics.from_frame(
+                lease.array, max_value, request.step if request is not None else 1
+            )
+            self.emit("statistics", self.statistics)
+        except Exception as e:
+            print("frame statistics: {}".format(e))
+        finally:
+            with self._statistics_lock:
+                self._statistics_pending -= 1
+            if future is not None and request.copy:
+                future.get_loop().call_soon_threadsafe(self.resolve_frame, future, lease)
+            else:
+                if future is not None:
+                    future.get_loop().call_soon_threadsafe(self.resolve_frame, future, None)
+                lease.release()
+
+    def shutdown_stream(self) -> None:
+        """Write the queued frames and stop the writer and statistics threads."""
+        self.writer.shutdown()
+        if self._statistics_executor is not None:
+            self._statistics_executor.shutdown()
+            self._statistics_executor = None
+
+    @staticmethod
+    def resolve_frame(future: asyncio.Future, lease: FrameLease | None):
+        if not future.done():
+            future.set_result(lease)
+        elif lease is not None:
+            lease.release()
+
+    async def frames(
+        self,
+        maxsize: int = 8,
+        policy: QueuePolicy = QueuePolicy.DropOldest,
+        timeout: float | None = 1.0,
+    ) -> AsyncIterator[FrameLease]:
+        """
+        Iterate over the frames of the armed camera as they arrive.
+
+        maxsize -- frames queued between the frame callback and the consumer
+        policy -- what to do with a frame arriving at a full queue
+        timeout -- longest wait of the frame callback under QueuePolicy.Block
+
+        Yields leases on the frames' ring buffers, which the consumer has to
+        release. Iteration ends when the camera is disarmed. The queue's
+        counters stay available in frame_queue afterwards.
+
+        Raises RuntimeError if the camera is not armed, or if another
+        consumer is still iterating; frames are not fanned out.
+        """
+        if not self.is_armed:
+            raise RuntimeError("camera is not armed")
+        if self.frame_queue is not None and not self.frame_queue.closed:
+            raise RuntimeError("frames() already has a consumer")
+        queue = AcquisitionQueue(maxsize, policy, timeout, FrameLease.release)
+        self.frame_queue = queue
+        try:
+            async for lease in queue:
+                yield lease
+        finally:
+            queue.close()
+            queue.clear()
+
+    async def trigger_and_wait(
+        self, timeout: float = 5.0, copy: bool = True, step: int = 1
+    ) -> FrameLease | None:
+        """
+        Software-trigger the armed camera and wait for the frame.
+
+        timeout -- seconds to wait for the frame
+        copy -- whether to return a lease on the frame
+        step -- use every step-th row and column only for the statistics
+
+        Returns a lease on the frame's ring buffer, which the caller has to
+        release, or None if copy is False and only the frame's statistics
+        are needed, or if the ring had no free buffer. The frame's
+        statistics are in self.statistics by the time this returns, unless
+        the ring had no free buffer.
+        """
+        request = FrameRequest(asyncio.get_running_loop().create_future(), copy, step)
+        self.frame_request = request
+        try:
+            self.trigger()
+            return await asyncio.wait_for(request.future, timeout)
+        finally:
+            self.frame_request = None
+
+    async def capture_hdr(self, id, exposures) -> np.ndarray:
+        """
+        Capture an exposure bracket and merge it into a radiance map.
+
+        Each frame is merged on a worker thread while the next exposure is
+        captured, so only the merge accumulators and the frames in flight are
+        held in memory.
+        """
+        self.id = id
+        loop = asyncio.get_running_loop()
+        merger: HDRMerger | None = None
+        merging = None
+        with self.cam:
+            for exposure in exposures:
+                await self.set_integration_time(exposure)
+                lease = await self.trigger_and_wait()
+                if lease is None:
+                    raise RuntimeError("no frame buffer free for exposure {}".format(exposure))
+                if merger is None:
+                    merger = HDRMerger(lease.array.shape, self.max_value())
+                if merging is not None:
+                    await merging
+                merging = loop.run_in_executor(None, self.merge_frame, merger, lease, exposure)
+            if merging is not None:
+                await merging
+        if merger is None:
+            raise ValueError("no exposures given")
+        return merger.result()
+
+    @staticmethod
+    def merge_frame(merger: HDRMerger, lease: FrameLease, exposure: float):
+        with lease:
+            merger.add(lease.array, exposure)
+
+    @staticmethod
+    def analyse_frame(analysis: ThroughFocus, position: float, lease: FrameLease):
+        with lease:
+            analysis.add(position, lease.array)
+
+    async def focus_sweep(
+        self,
+        id,
+        positions: Sequence[float],
+        move: Callable[[float], Awaitable],
+        analysis: ThroughFocus,
+    ) -> FocusResult:
+        """
+        Capture and analyse frames through focus until the peak is bracketed.
+
+        positions -- focus positions, in sweep order
+        move -- coroutine function that moves the focus to a position
+        analysis -- through-focus analysis the frames are added to
+
+        A frame is analysed on a worker thread while the focus moves to the
+        next position and that frame is captured, so the sweep runs at the
+        slower of capture and analysis rather than their sum.
+        """
+        self.id = id
+        loop = asyncio.get_running_loop()
+        analysing = None
+        with self.cam:
+            for position in positions:
+                await move(position)
+                lease = await self.trigger_and_wait()
+                if analysing is not None:
+                    await analysing
+                    if analysis.done:
+                        analysing = None
+                        if lease is not None:
+                            lease.release()
+                        break
+                if lease is None:
+                    print("focus sweep: no frame at {}".format(position))
+                    continue
+                analysing = loop.run_in_executor(
+                    None, self.analyse_frame, analysis, position, lease
+                )
+            if analysing is not None:
+                await analysing
+        return analysis.result()
+
+    async def auto_expose(self, exposure: float | None = None, **kwargs) -> Dict:
+        """
+        Find the exposure time that puts a frame percentile at a target level.
+
+        exposure -- starting exposure time, the current one if None
+        kwargs -- AutoExposure parameters, max_value excepted
+
+        Statistics of the frames it triggers are taken from a decimated
+        view, at the controller's step; other frames are unaffected. The
+        result is written through set_integration_time and reported along
+        with every iteration's statistics.
+        """
+        iterations = []
+        converged = False
+        with self.cam:
+            if exposure is None:
+                exposure = await self.get_integration_time()
+            controller = AutoExposure(self.max_value(), **kwargs)
+            for _ in range(controller.max_iterations):
+                await self.set_integration_time(exposure)
+                previous = self.statistics
+                await self.trigger_and_wait(copy=False, step=controller.step)
+                if self.statistics is previous:
+                    raise RuntimeError("no frame buffer free at exposure {}".format(exposure))
+                exposure, converged, report = controller.update(exposure, self.statistics)
+                iterations.append(report)
+                if converged:
+                    break
+            await self.set_integration_time(exposure)
+        return {"exposure": exposure, "converged": converged, "iterations": iterations}
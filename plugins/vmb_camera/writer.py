@@ -0,0 +1,169 @@
+import os
+import queue
+import threading
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from .buffers import FrameLease
+
+# encoder parameter for the compression level of each format
+COMPRESSION_PARAMS = {
+    "png": cv2.IMWRITE_PNG_COMPRESSION,
+    "jpg": cv2.IMWRITE_JPEG_QUALITY,
+    "tiff": cv2.IMWRITE_TIFF_COMPRESSION,
+}
+
+FORMATS = ("png", "jpg", "tiff", "npy")
+
+
+class FrameWriter:
+    """
+    Bounded background pool that encodes and stores frames.
+
+    submit() only queues a lease on the frame's FrameRing buffer, so it is
+    cheap enough for the Vimba frame callback, which has to requeue the
+    driver buffer before the next frame arrives. Encoding and disk writes run
+    on the writer threads, which release the lease when done. When the queue
+    is full the frame is dropped and counted rather than blocking the
+    streaming thread.
+    """
+
+    def __init__(
+        self,
+        format: str = "png",
+        compression: int | None = None,
+        workers: int = 2,
+        max_pending: int = 8,
+    ):
+        """
+        Initialize the writer pool.
+
+        format -- one of FORMATS
+        compression -- encoder level: PNG 0..9, JPEG quality 0..100, TIFF
+                       compression scheme; the codec default if None
+        workers -- number of writer threads
+        max_pending -- number of frames waiting to be written
+        """
+        if format not in FORMATS:
+            raise ValueError("format must be one of {}".format(", ".join(FORMATS)))
+        self.format = format
+        self.compression = compression
+        self.workers = workers
+        self.max_pending = max_pending
+
+        self._jobs: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.overwritten = 0
+        self.max_depth = 0
+        self.write_time = 0.0
+
+    @property
+    def params(self) -> List[int]:
+        """Encoder parameters for cv2.imwrite."""
+        if self.compression is None or self.format not in COMPRESSION_PARAMS:
+            return []
+        return [COMPRESSION_PARAMS[self.format], int(self.compression)]
+
+    def path(self, name: str) -> str:
+        """File name of a frame, name plus the extension of the format."""
+        return "{}.{}".format(name, self.format)
+
+    def submit(self, lease: FrameLease, name: str) -> bool:
+        """
+        Queue a frame for writing; the writer releases the lease.
+
+        lease -- lease on the frame's buffer, handed over to the writer
+        name -- file name without extension
+
+        Returns False if the frame was dropped because the queue is full.
+        """
+        self.submitted += 1
+        self._start()
+        try:
+            self._jobs.put_nowait((lease, self.path(name)))
+        except queue.Full:
+            lease.release()
+            self.dropped += 1
+            return False
+        self.max_depth = max(self.max_depth, self._jobs.qsize())
+        return True
+
+    def _start(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name="frame-writer-{}".format(i), daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            lease, path = job
+            start = time.perf_counter()
+            ok = overwritten = False
+            try:
+                if self.format == "npy":
+                    np.save(path, lease.array)
+                elif not cv2.imwrite(path, lease.array, self.params):
+                    raise OSError("could not write {}".format(path))
+                # the ring took the buffer back while it was being encoded
+                overwritten = not lease.valid
+                if overwritten:
+                    os.remove(path)
+                ok = not overwritten
+            except Exception as e:
+                print("frame writer: {}".format(e))
+            finally:
+                lease.release()
+                with self._lock:
+                    self.write_time += time.perf_counter() - start
+                    if ok:
+                        self.written += 1
+                    elif overwritten:
+                        self.overwritten += 1
+                    else:
+                        self.failed += 1
+
+    def metrics(self) -> Dict:
+        """Queue depth and throughput counters, as plain values."""
+        return {
+            "format": self.format,
+            "compression": self.compression,
+            "depth": self._jobs.qsize(),
+            "max_depth": self.max_depth,
+            "capacity": self.max_pending,
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "overwritten": self.overwritten,
+            "mean_write_time": self.write_time
+            / max(1, self.written + self.failed + self.overwritten),
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Write the queued frames and stop the writer threads."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._jobs.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
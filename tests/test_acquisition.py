@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+import pytest
+
+from plugins.vmb_camera.acquisition import AcquisitionQueue, QueueClosed, QueuePolicy
+
+
+def fill(queue, items):
+    return [queue.put(item) for item in items]
+
+
+def test_drop_newest_keeps_the_queued_frames():
+    dropped = []
+    queue = AcquisitionQueue(2, QueuePolicy.DropNewest, discard=dropped.append)
+    assert fill(queue, range(4)) == [True, True, False, False]
+    assert [queue.get_nowait(), queue.get_nowait()] == [0, 1]
+    assert dropped == [2, 3]
+
+
+def test_drop_oldest_keeps_the_latest_frames():
+    dropped = []
+    queue = AcquisitionQueue(2, QueuePolicy.DropOldest, discard=dropped.append)
+    assert all(fill(queue, range(4)))
+    assert [queue.get_nowait(), queue.get_nowait()] == [2, 3]
+    assert dropped == [0, 1]
+    assert queue.metrics()["dropped"] == 2
+
+
+def test_block_waits_for_the_consumer():
+    queue = AcquisitionQueue(1, QueuePolicy.Block, timeout=5)
+    queue.put(0)
+    timer = threading.Timer(0.05, queue.get_nowait)
+    timer.start()
+    assert queue.put(1)
+    timer.join()
+    assert queue.get_nowait() == 1
+
+
+def test_block_drops_after_the_timeout():
+    queue = AcquisitionQueue(1, QueuePolicy.Block, timeout=0.01)
+    assert fill(queue, range(2)) == [True, False]
+    assert queue.dropped == 1
+
+
+def test_close_releases_a_blocked_producer():
+    queue = AcquisitionQueue(1, QueuePolicy.Block, timeout=None)
+    queue.put(0)
+    timer = threading.Timer(0.05, queue.close)
+    timer.start()
+    assert not queue.put(1)
+    timer.join()
+    assert not queue.put(2)
+
+
+def test_async_iteration_across_threads():
+    async def consume():
+        queue = AcquisitionQueue(4, QueuePolicy.Block, timeout=None)
+
+        def produce():
+            for i in range(20):
+                queue.put(i)
+            queue.close()
+
+        thread = threading.Thread(target=produce)
+        thread.start()
+        received = [item async for item in queue]
+        thread.join()
+        with pytest.raises(QueueClosed):
+            await queue.get()
+        return received, queue.metrics()
+
+    received, metrics = asyncio.run(consume())
+    assert received == list(range(20))
+    assert metrics["consumed"] == metrics["produced"] == 20
+    assert metrics["max_depth"] <= 4
+
+
+def test_clear_discards_queued_frames():
+    dropped = []
+    queue = AcquisitionQueue(4, discard=dropped.append)
+    fill(queue, range(3))
+    queue.clear()
+    assert len(queue) == 0 and dropped == [0, 1, 2]
+
+
+def test_maxsize_must_be_positive():
+    with pytest.raises(ValueError):
+        AcquisitionQueue(0)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from pipeline.averaging import FrameAverager
+from pipeline.tiling import TileScheduler
+
+
+@pytest.fixture
+def frames():
+    rng = np.random.default_rng(0)
+    # a large offset, where a naive sum of squares would cancel
+    return (60000 + rng.normal(0, 20, (16, 30, 20))).astype(np.uint16)
+
+
+def test_matches_numpy(frames):
+    averager = FrameAverager(frames.shape[1:], dtype=np.float64)
+    for frame in frames:
+        averager.add(frame)
+    assert averager.count == len(frames)
+    np.testing.assert_allclose(averager.mean, frames.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(averager.variance(), frames.var(axis=0, ddof=1), rtol=1e-9)
+    np.testing.assert_allclose(averager.noise(), frames.std(axis=0, ddof=1), rtol=1e-9)
+
+
+def test_float32_keeps_the_variance(frames):
+    averager = FrameAverager(frames.shape[1:])
+    for frame in frames:
+        averager.add(frame)
+    np.testing.assert_allclose(averager.mean, frames.mean(axis=0), rtol=1e-6)
+    np.testing.assert_allclose(averager.variance(), frames.var(axis=0, ddof=1), rtol=1e-3)
+
+
+def test_tiled_matches_untiled(frames):
+    untiled = FrameAverager(frames.shape[1:])
+    with TileScheduler(tile_height=4, workers=4) as scheduler:
+        tiled = FrameAverager(frames.shape[1:], scheduler=scheduler)
+        for frame in frames:
+            untiled.add(frame)
+            tiled.add(frame)
+    np.testing.assert_array_equal(tiled.mean, untiled.mean)
+    np.testing.assert_array_equal(tiled.m2, untiled.m2)
+
+
+def test_reset(frames):
+    averager = FrameAverager(frames.shape[1:])
+    averager.add(frames[0])
+    averager.reset()
+    averager.add(frames[1])
+    np.testing.assert_array_equal(averager.mean, frames[1])
+
+
+def test_checks():
+    with pytest.raises(TypeError):
+        FrameAverager((2, 2), dtype=np.int32)
+    averager = FrameAverager((2, 2))
+    with pytest.raises(ValueError):
+        averager.add(np.zeros((2, 3)))
+    averager.add(np.zeros((2, 2)))
+    with pytest.raises(ValueError):
+        averager.variance()
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from pipeline.binning import AVERAGE, SUM, bin_frame
+from pipeline.tiling import TileScheduler
+
+
+def reference(frame, factor):
+    by, bx = factor
+    h, w = frame.shape[-2] // by * by, frame.shape[-1] // bx * bx
+    blocks = frame[..., :h, :w].reshape(frame.shape[:-2] + (h // by, by, w // bx, bx))
+    return blocks.sum(axis=(-3, -1), dtype=np.float64)
+
+
+@pytest.mark.parametrize("factor", [(1, 1), (2, 2), (4, 4), (1, 4), (3, 2)])
+def test_sum_matches_reference(factor):
+    frame = np.random.default_rng(0).integers(0, 1 << 16, (2, 37, 50), dtype=np.uint16)
+    out = bin_frame(frame, factor, SUM)
+    assert out.dtype == np.uint32
+    np.testing.assert_array_equal(out, reference(frame, factor))
+
+
+def test_sum_does_not_overflow():
+    frame = np.full((16, 16), 0xFFFF, dtype=np.uint16)
+    assert bin_frame(frame, (16, 16), SUM)[0, 0] == 256 * 0xFFFF
+
+
+def test_average():
+    frame = np.random.default_rng(1).integers(0, 4096, (40, 60), dtype=np.uint16)
+    out = bin_frame(frame, (2, 2), AVERAGE)
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out, reference(frame, (2, 2)) / 4)
+
+
+def test_float64_keeps_its_precision():
+    frame = 1e8 + np.random.default_rng(2).random((8, 8))
+    out = bin_frame(frame, (2, 2), SUM)
+    assert out.dtype == np.float64
+    np.testing.assert_allclose(out, reference(frame, (2, 2)), rtol=1e-15)
+
+
+def test_channel_axis_is_dropped():
+    frame = np.random.default_rng(3).integers(0, 256, (40, 60), dtype=np.uint8)
+    out = bin_frame(frame[..., None], (2, 2))
+    assert out.shape == (20, 30)
+    np.testing.assert_array_equal(out, bin_frame(frame, (2, 2)))
+
+
+def test_tiled_matches_untiled():
+    frame = np.random.default_rng(4).integers(0, 4096, (103, 64), dtype=np.uint16)
+    with TileScheduler(tile_height=5, workers=4) as scheduler:
+        tiled = bin_frame(frame, (2, 4), AVERAGE, scheduler=scheduler)
+    np.testing.assert_array_equal(tiled, bin_frame(frame, (2, 4), AVERAGE))
+
+
+def test_rejects_lossy_out():
+    frame = np.zeros((4, 4), dtype=np.uint16)
+    with pytest.raises(TypeError):
+        bin_frame(frame, (2, 2), AVERAGE, out=np.empty((2, 2), dtype=np.uint16))
@@ -0,0 +1,68 @@
+import threading
+
+import numpy as np
+import pytest
+
+from plugins.vmb_camera.buffers import PAGE_SIZE, FrameRing, RingPolicy, aligned_empty
+
+
+def test_aligned_empty():
+    array = aligned_empty((3, 5), np.uint16)
+    assert array.ctypes.data % PAGE_SIZE == 0
+    assert array.shape == (3, 5) and array.dtype == np.uint16
+    assert not array.any()
+
+
+def test_buffers_are_reused_least_recently_written_first():
+    ring = FrameRing((2, 2), np.uint8, count=3)
+    slots = []
+    for _ in range(6):
+        with ring.acquire() as lease:
+            slots.append(lease.slot)
+    assert slots == [0, 1, 2, 0, 1, 2]
+    assert ring.matches(np.zeros((2, 2), np.uint8))
+    assert not ring.matches(np.zeros((2, 2), np.uint16))
+
+
+def test_block_waits_for_a_release():
+    ring = FrameRing((2, 2), np.uint8, count=2)
+    held = [ring.acquire(), ring.acquire()]
+    assert ring.acquire(timeout=0) is None
+    assert ring.metrics()["timeouts"] == 1
+
+    timer = threading.Timer(0.05, held[1].release)
+    timer.start()
+    lease = ring.acquire(timeout=5)
+    timer.join()
+    assert lease.slot == held[1].slot
+
+
+def test_shared_leases_hold_the_buffer_until_all_are_released():
+    ring = FrameRing((2, 2), np.uint8, count=1)
+    lease = ring.acquire()
+    share = lease.share()
+    lease.release()
+    lease.release()  # a second release is a no-op
+    assert ring.acquire(timeout=0) is None
+    share.release()
+    assert ring.acquire(timeout=0) is not None
+
+
+def test_overwrite_oldest_invalidates_leases():
+    ring = FrameRing((2, 2), np.uint8, count=2, policy=RingPolicy.OverwriteOldest)
+    first = ring.acquire()
+    second = ring.acquire()
+    third = ring.acquire()
+    assert third.slot == first.slot
+    assert not first.valid and second.valid and third.valid
+    assert ring.metrics()["overwritten"] == 1
+    with pytest.raises(ValueError):
+        first.share()
+    # releasing the stale lease does not free the buffer the new one holds
+    first.release()
+    assert ring.refcounts[third.slot] == 1
+
+
+def test_count_must_be_positive():
+    with pytest.raises(ValueError):
+        FrameRing((2, 2), np.uint8, count=0)
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from pipeline.calibration import DARK, FLAT, CalibrationKey, CalibrationStore
+from pipeline.dark import DarkModel
+
+KEY = CalibrationKey("cam0", "Mono12", 1000.0, 0.0)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CalibrationStore(tmp_path, capacity=2)
+
+
+def test_masters_round_trip_as_read_only_maps(store, tmp_path):
+    dark = np.arange(12, dtype=np.uint16).reshape(3, 4)
+    store.save(DARK, KEY, dark)
+    loaded = CalibrationStore(tmp_path).dark(KEY)
+    assert isinstance(loaded, np.memmap)
+    assert not loaded.flags.writeable
+    np.testing.assert_array_equal(loaded, dark)
+
+
+def test_missing_master_raises_key_error(store):
+    with pytest.raises(KeyError):
+        store.flat(KEY)
+
+
+def test_loads_are_cached_until_saved_again(store):
+    store.save(DARK, KEY, np.zeros((2, 2)))
+    first = store.dark(KEY)
+    assert store.dark(KEY) is first
+    store.save(DARK, KEY, np.ones((2, 2)))
+    np.testing.assert_array_equal(store.dark(KEY), 1)
+    # the old map still reads the master it was opened on
+    np.testing.assert_array_equal(first, 0)
+
+
+def test_cache_is_bounded(store):
+    keys = [KEY._replace(exposure_time=float(t)) for t in range(3)]
+    for key in keys:
+        store.save(DARK, key, np.zeros((2, 2)))
+    first = store.dark(keys[0])
+    store.dark(keys[1])
+    store.dark(keys[2])
+    assert store.dark(keys[0]) is not first
+
+
+def test_keys(store):
+    store.save(DARK, KEY, np.zeros((2, 2)))
+    store.save(FLAT, KEY, np.ones((2, 2)))
+    assert store.keys() == [KEY]
+    assert store.keys(FLAT) == [KEY]
+    assert store.contains(DARK, KEY)
+
+
+def test_corrector_falls_back_to_the_dark_model(store):
+    rng = np.random.default_rng(0)
+    model = DarkModel(
+        rng.uniform(90, 110, (8, 8)).astype(np.float32), np.full((8, 8), 0.01, np.float32)
+    )
+    flat = model.synthesize(KEY.exposure_time) + rng.uniform(1000, 2000, (8, 8))
+    store.save_dark_model(KEY, model)
+    store.save(FLAT, KEY, flat)
+    corrector = store.corrector(KEY)
+    np.testing.assert_array_equal(corrector.dark, model.synthesize(KEY.exposure_time))
+    assert store.corrector(KEY) is corrector
+
+
+def test_corrector_needs_an_exposure_time(store):
+    with pytest.raises(ValueError):
+        store.corrector(KEY._replace(exposure_time=None))
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from pipeline.color import ColorMatrix, correct_color
+from pipeline.tiling import TileScheduler
+
+
+@pytest.fixture
+def img():
+    return np.random.default_rng(0).uniform(0, 4095, (3, 40, 30)).astype(np.float32)
+
+
+def test_matches_einsum(img):
+    matrix = np.array([[1.6, -0.4, -0.2], [-0.3, 1.5, -0.2], [0.0, -0.5, 1.5]])
+    expected = np.einsum("ij,jhw->ihw", matrix, img.astype(np.float64))
+    np.testing.assert_allclose(correct_color(matrix, img), expected, rtol=1e-5, atol=1e-2)
+
+
+def test_tiled_matches_untiled(img):
+    color = ColorMatrix(np.array([[1.6, -0.4, -0.2], [-0.3, 1.5, -0.2], [0.1, -0.5, 1.5]]))
+    with TileScheduler(tile_height=3, workers=4) as scheduler:
+        tiled = color.apply(img, scheduler=scheduler)
+    np.testing.assert_array_equal(tiled, color.apply(img))
+
+
+def test_sparse_matrices(img):
+    # channel selection and white balance, with a zero row
+    matrix = np.array([[0, 0, 1], [0, 2, 0], [0, 0, 0]])
+    out = ColorMatrix(matrix).apply(img)
+    np.testing.assert_array_equal(out[0], img[2])
+    np.testing.assert_array_equal(out[1], img[1] * np.float32(2))
+    assert not out[2].any()
+
+
+def test_diagonal_in_place_and_clip(img):
+    expected = np.clip(img * np.float32(2), 0, 4095)
+    color = ColorMatrix(np.diag([2.0, 2.0, 2.0]), clip=(0, 4095))
+    assert color.apply(img, out=img) is img
+    np.testing.assert_array_equal(img, expected)
+
+
+def test_rejects_overlapping_out_for_mixing_matrices(img):
+    with pytest.raises(ValueError):
+        ColorMatrix(np.ones((3, 3))).apply(img, out=img)
+
+
+def test_rejects_mismatched_channels(img):
+    with pytest.raises(ValueError):
+        ColorMatrix(np.eye(4)).apply(img)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from pipeline.dark import DarkModel
+from pipeline.tiling import TileScheduler
+
+
+@pytest.fixture
+def model():
+    rng = np.random.default_rng(0)
+    offset = rng.uniform(90, 110, (50, 30)).astype(np.float32)
+    dark_current = rng.uniform(0, 0.02, offset.shape).astype(np.float32)
+    return DarkModel(offset, dark_current)
+
+
+def test_fit_recovers_the_model(model):
+    frames = ((t, model.offset + model.dark_current * t) for t in (100.0, 1000.0, 5000.0))
+    fitted = DarkModel.fit(frames)
+    np.testing.assert_allclose(fitted.offset, model.offset, rtol=1e-5)
+    np.testing.assert_allclose(fitted.dark_current, model.dark_current, atol=1e-6)
+
+
+def test_fit_needs_two_exposure_times(model):
+    with pytest.raises(ValueError):
+        DarkModel.fit([(100.0, model.offset), (100.0, model.offset)])
+    with pytest.raises(ValueError):
+        DarkModel.fit([])
+
+
+def test_synthesize(model):
+    expected = model.offset + model.dark_current * np.float32(250)
+    np.testing.assert_array_equal(model.synthesize(250), expected)
+
+
+def test_synthesize_tiled_matches_untiled(model):
+    out = np.empty(model.shape, dtype=np.float32)
+    with TileScheduler(tile_height=7, workers=3) as scheduler:
+        model.synthesize(250, out=out, scheduler=scheduler)
+    np.testing.assert_array_equal(out, model.synthesize(250))
+
+
+def test_shape_mismatch():
+    with pytest.raises(ValueError):
+        DarkModel(np.zeros((2, 2)), np.zeros((2, 3)))
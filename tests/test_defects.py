@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from pipeline.defects import BadPixelCorrector, detect_bad_pixels
+
+
+def test_detects_hot_dead_and_bright_pixels():
+    rng = np.random.default_rng(0)
+    dark = rng.normal(100, 2, (40, 50)).astype(np.float32)
+    bright = dark + rng.normal(2000, 20, dark.shape).astype(np.float32)
+    dark[5, 6] += 500  # hot
+    bright[5, 6] += 500
+    bright[10, 20] = dark[10, 20] + 100  # dead
+    bright[30, 40] = dark[30, 40] + 4000  # stuck bright
+    expected = [5 * 50 + 6, 10 * 50 + 20, 30 * 50 + 40]
+    np.testing.assert_array_equal(detect_bad_pixels(dark, bright), expected)
+
+
+def reference(frame, index):
+    # median of the good pixels of the 3x3 block, excluding the defect itself
+    h, w = frame.shape
+    y, x = divmod(index, w)
+    values = [
+        frame[y + dy, x + dx]
+        for dy in (-1, 0, 1)
+        for dx in (-1, 0, 1)
+        if (dy or dx) and 0 <= y + dy < h and 0 <= x + dx < w
+    ]
+    return np.median(values)
+
+
+def test_replaces_defects_with_the_median_of_their_neighbours():
+    frame = np.random.default_rng(1).integers(0, 4096, (20, 30)).astype(np.uint16)
+    # a corner, an edge and an interior pixel
+    indices = np.array([0, 15, 5 * 30 + 7])
+    expected = [np.rint(reference(frame, i)) for i in indices]
+    out = BadPixelCorrector(indices, frame.shape).apply(frame)
+    assert out is frame
+    np.testing.assert_array_equal(frame.flat[indices], expected)
+
+
+def test_defective_neighbours_are_skipped():
+    frame = np.arange(25, dtype=np.float32).reshape(5, 5)
+    BadPixelCorrector([12, 13], frame.shape).apply(frame)
+    # 12 = (2, 2), its good neighbours are 6, 7, 8, 11, 16, 17, 18
+    assert frame[2, 2] == 11
+    # 13 = (2, 3), its good neighbours are 7, 8, 9, 14, 17, 18, 19
+    assert frame[2, 3] == 14
+
+
+def test_defects_without_good_neighbours_are_kept():
+    frame = np.ones((3, 3), dtype=np.float32)
+    frame[1, 1] = 5
+    BadPixelCorrector(np.arange(9), frame.shape).apply(frame)
+    assert frame[1, 1] == 5
+
+
+def test_checks():
+    with pytest.raises(ValueError):
+        BadPixelCorrector([9], (3, 3))
+    with pytest.raises(ValueError):
+        BadPixelCorrector([0], (3, 3)).apply(np.zeros((3, 4)))
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from pipeline.exposure import AutoExposure
+from pipeline.statistics import FrameStatistics
+
+SCENE = np.random.default_rng(0).uniform(0.2, 1.0, (64, 64))
+
+
+def capture(exposure):
+    # linear sensor, 1000 DN at the brightest pixel per 1000 us, Mono12
+    frame = np.clip(np.rint(SCENE * exposure), 0, 4095).astype(np.uint16)
+    return FrameStatistics.from_frame(frame, 4095)
+
+
+def run(controller, exposure):
+    for iteration in range(controller.max_iterations):
+        exposure, converged, report = controller.update(exposure, capture(exposure))
+        if converged:
+            return exposure, iteration + 1
+    return exposure, None
+
+
+@pytest.mark.parametrize("start", [100.0, 2500.0, 100000.0])
+def test_converges_from_dark_good_and_clipped_frames(start):
+    controller = AutoExposure(4095, target=0.7, percentile=99.0)
+    exposure, iterations = run(controller, start)
+    assert iterations is not None and iterations <= 4
+    level = controller.update(exposure, capture(exposure))[2]["level"]
+    assert level == pytest.approx(0.7 * 4095, rel=controller.tolerance)
+
+
+def test_clipped_frames_come_down_by_at_least_half():
+    controller = AutoExposure(4095)
+    next_exposure, converged, report = controller.update(100000.0, capture(100000.0))
+    assert report["clipped"] and not converged
+    assert next_exposure <= 50000.0
+
+
+def test_exposure_limits():
+    controller = AutoExposure(4095, max_exposure=1000.0)
+    assert controller.update(10.0, capture(10.0))[0] <= 1000.0
+    assert controller.update(1000.0, capture(1000.0))[0] == 1000.0
+
+
+def test_target_above_black_level():
+    with pytest.raises(ValueError):
+        AutoExposure(4095, target=0.01, black_level=100)
@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+import pytest
+
+from pipeline.focus import FocusCurve, ThroughFocus
+from pipeline.mtf import EdgeSet
+
+from .test_mtf import edge
+
+
+def gaussian(position, peak=1.3, width=2.0):
+    return math.exp(-((position - peak) ** 2) / (2 * width**2))
+
+
+def test_peak_of_a_gaussian_is_exact():
+    curve = FocusCurve(fit_points=5)
+    for position in range(-4, 7):
+        curve.add(position, gaussian(position))
+    assert curve.best_position == 1
+    assert curve.peak == pytest.approx(1.3, abs=1e-9)
+
+
+def test_bracketed_after_the_drop_on_both_sides_and_patience():
+    curve = FocusCurve(drop=0.8, patience=2)
+    for position in (-3, -2, -1, 0, 1, 2):
+        curve.add(position, gaussian(position))
+    # -3 has dropped below 0.8 of the best sample, 1, but 2 has not
+    assert not curve.bracketed
+    curve.add(3, gaussian(3))
+    assert curve.bracketed
+    # the drop alone is not enough without patience samples after the best
+    early = FocusCurve(drop=0.8, patience=2)
+    for position in (-3, 1, 4):
+        early.add(position, gaussian(position))
+    assert not early.bracketed
+
+
+def test_peak_falls_back_to_the_best_sample():
+    curve = FocusCurve()
+    assert curve.peak is None
+    curve.add(0, 1.0)
+    curve.add(1, 2.0)
+    assert curve.peak == 1
+    curve.add(2, math.nan)
+    assert curve.peak == 1
+
+
+def test_through_focus_finds_the_sharpest_frame():
+    # the edge is sharpest at position 0
+    rects = [([0, 0], [60, 120])]
+    with EdgeSet(rects, workers=1) as edges:
+        sweep = ThroughFocus(edges, frequencies=(0.125, 0.25), drop=0.9, patience=1)
+        for position in (-3, -2, -1, 0, 1, 2, 3):
+            mtf = sweep.add(position, edge(blur=0.8 + 0.5 * abs(position), noise=2.0))
+            assert mtf.shape == (1, 2)
+            if sweep.done:
+                break
+    result = sweep.result()
+    assert result.bracketed
+    assert abs(result.peak) < 0.5
+    assert result.mtf.shape == (len(result.positions), 1, 2)
+
+
+def test_frequencies_must_lie_on_the_grid():
+    with pytest.raises(ValueError):
+        ThroughFocus(EdgeSet([([0, 0], [60, 120])]), frequencies=(2.0,))
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from pipeline.hdr import HDRMerger
+from pipeline.tiling import TileScheduler
+
+EXPOSURES = (100.0, 400.0, 1600.0)
+
+
+@pytest.fixture
+def bracket():
+    # radiance over 2.5 decades, in DN per exposure time unit; the brightest
+    # pixels saturate in all but the shortest exposure
+    radiance = np.logspace(-1, 1.5, 40 * 30).reshape(40, 30).astype(np.float32)
+    frames = [
+        np.clip(np.rint(radiance * t + 64), 0, 4095).astype(np.uint16) for t in EXPOSURES
+    ]
+    return radiance, frames
+
+
+def merge(frames, scheduler=None):
+    merger = HDRMerger(frames[0].shape, 4095, black_level=64, scheduler=scheduler)
+    for frame, t in zip(frames, EXPOSURES):
+        merger.add(frame, t)
+    return merger
+
+
+def test_recovers_radiance(bracket):
+    radiance, frames = bracket
+    out = merge(frames).result()
+    # within the rounding of the longest unsaturated exposure
+    np.testing.assert_allclose(out, radiance, rtol=0.01)
+
+
+def test_fully_saturated_pixels_get_the_floor():
+    frames = [np.full((4, 4), 4095, dtype=np.uint16)] * len(EXPOSURES)
+    out = merge(frames).result()
+    np.testing.assert_allclose(out, (0.95 * 4095 - 64) / EXPOSURES[0], rtol=1e-6)
+
+
+def test_tiled_matches_untiled(bracket):
+    _, frames = bracket
+    with TileScheduler(tile_height=3, workers=4) as scheduler:
+        tiled = merge(frames, scheduler).result()
+    np.testing.assert_array_equal(tiled, merge(frames).result())
+
+
+def test_checks(bracket):
+    _, frames = bracket
+    merger = HDRMerger(frames[0].shape, 4095)
+    with pytest.raises(ValueError):
+        merger.result()
+    with pytest.raises(ValueError):
+        merger.add(frames[0], 0)
+    with pytest.raises(ValueError):
+        merger.add(frames[0][:-1], 100)
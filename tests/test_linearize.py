@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from pipeline.linearize import LinearizationLUT, bit_depth
+from pipeline.tiling import TileScheduler
+
+COEFFS = (1e-5, 0.9, 3.0)
+
+
+@pytest.mark.parametrize("pixel_format, bits", [("Mono8", 8), ("Mono10p", 10), ("mono12", 12)])
+def test_bit_depth(pixel_format, bits):
+    assert bit_depth(pixel_format) == bits
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        bit_depth("RGB8")
+
+
+def test_matches_polyval():
+    frame = np.random.default_rng(0).integers(0, 4096, (30, 40)).astype(np.uint16)
+    lut = LinearizationLUT.from_polynomial(COEFFS, "Mono12")
+    assert len(lut.table) == 4096
+    expected = np.polyval(COEFFS, frame.astype(np.float64)).astype(np.float32)
+    np.testing.assert_array_equal(lut.apply(frame), expected)
+
+
+def test_tiled_matches_untiled():
+    frame = np.random.default_rng(1).integers(0, 1024, (31, 40)).astype(np.uint16)
+    lut = LinearizationLUT.from_polynomial(COEFFS, "Mono10")
+    with TileScheduler(tile_height=4, workers=4) as scheduler:
+        tiled = lut.apply(frame, scheduler=scheduler)
+    np.testing.assert_array_equal(tiled, lut.apply(frame))
+
+
+def test_out_of_range_codes_clip_to_the_last_entry():
+    lut = LinearizationLUT(np.arange(4, dtype=np.float32))
+    np.testing.assert_array_equal(lut.apply(np.array([[0, 3, 7]], dtype=np.uint8)), [[0, 3, 3]])
+
+
+def test_needs_integer_frames():
+    with pytest.raises(TypeError):
+        LinearizationLUT(np.arange(4)).apply(np.zeros((2, 2), dtype=np.float32))
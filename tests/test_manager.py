@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+from plugins.vmb_camera.manager import CameraManager
+
+
+class Camera:
+    def __init__(self, camera_id):
+        self.camera_id = camera_id
+        self.loop = asyncio.get_running_loop()
+        self.name = "camera {}".format(camera_id)
+
+    async def where(self):
+        return threading.current_thread().name, asyncio.get_running_loop() is self.loop
+
+    async def frames(self, n):
+        for i in range(n):
+            await asyncio.sleep(0)
+            yield i, asyncio.get_running_loop() is self.loop
+
+
+def test_each_camera_runs_on_its_own_thread_and_loop():
+    manager = CameraManager(Camera, lambda: ["a", "b"])
+    try:
+        cameras = manager.start()
+
+        async def query():
+            return await asyncio.gather(*(camera.where() for camera in cameras))
+
+        (thread_a, on_loop_a), (thread_b, on_loop_b) = asyncio.run(query())
+        assert (thread_a, thread_b) == ("camera-a", "camera-b")
+        assert on_loop_a and on_loop_b
+        assert cameras[0].name == "camera a"
+        assert cameras[0].loop is not cameras[1].loop
+    finally:
+        manager.stop()
+    assert not manager.threads
+
+
+def test_async_generators_are_iterated_on_the_camera_loop():
+    manager = CameraManager(Camera, lambda: ["a"])
+    try:
+        (camera,) = manager.start()
+
+        async def collect():
+            return [item async for item in camera.frames(3)]
+
+        assert asyncio.run(collect()) == [(0, True), (1, True), (2, True)]
+    finally:
+        manager.stop()
+
+
+def test_without_cameras_one_takes_the_first_to_appear():
+    manager = CameraManager(Camera, lambda: [])
+    try:
+        (camera,) = manager.start()
+        assert camera.camera_id is None
+        # starting again does not add threads for cameras already running
+        manager.start([None])
+        assert len(manager.threads) == 1
+    finally:
+        manager.stop()
@@ -0,0 +1,167 @@
+import math
+
+import numpy as np
+import pytest
+
+from pipeline.mtf import EdgeSet, fir2fix, hamming, mtf_crossing, project2, sfr
+
+
+def edge(h=120, w=60, angle=5.0, blur=1.5, noise=0.0, seed=0):
+    y, x = np.mgrid[0:h, 0:w]
+    distance = (x - w / 2) - math.tan(math.radians(angle)) * (y - h / 2)
+    image = 200 + 3000 / (1 + np.exp(-distance / blur))
+    image += np.random.default_rng(seed).normal(0, noise, image.shape)
+    return image.astype(np.float32)
+
+
+def notebook_hamming(window_width, mid=None):
+    if mid is None:
+        mid = (window_width - 1) / 2
+    wid = max(mid, window_width - 1 - mid)
+    return np.array(
+        [0.54 + 0.45 * math.cos(math.pi * (i - mid) / wid) for i in range(window_width)]
+    )
+
+
+def notebook_deriv1(a, fil):
+    result = np.convolve(a, fil, mode="same")
+    result[0] = result[1]
+    result[-1] = result[-2]
+    return result
+
+
+def notebook_centroid(a):
+    return np.sum(a * np.arange(a.shape[1]), axis=1) / np.sum(a, axis=1)
+
+
+def notebook_fir2fix(n, m):
+    x = [math.pi * i * (m - 1) / (2 * (n + 1)) for i in range(1, n + 1)]
+    correct = [abs(v / math.sin(v)) for v in x]
+    correct[0] = 1
+    return np.minimum(correct, 10)
+
+
+def notebook_project2(ary, fit, fac=4):
+    # notebooks.common.project2, with the out-of-range bin clamped
+    nlin, npix = ary.shape
+    nn = math.floor(npix * fac)
+    offset = round(fac * (0 - (nlin - 1) * fit[0]))
+    del1 = abs(offset)
+    if offset > 0:
+        offset = 0
+    bwidth = nn + del1 + 150
+    p2 = [np.polyval(fit, y) - fit[1] for y in range(nlin)]
+    barray = np.zeros((2, bwidth))
+    for n in range(npix):
+        for m in range(nlin):
+            ling = math.ceil((n - p2[m]) * fac) + 1 - offset
+            ling = min(max(ling, 1), bwidth - 1)
+            barray[0, ling] += 1
+            barray[1, ling] += ary[m, n]
+    start = 1 + round(0.5 * del1)
+    return np.array([barray[1, i + start] / barray[0, i + start] for i in range(nn)])
+
+
+def notebook_sfr(roi, nbin=4):
+    # the steps of get_mtf in notebooks/mtf.ipynb, unwindowed after the
+    # first centroid, with the phase-cycle limit taken from the slope and
+    # the SFR corrected for the derivative filter
+    if np.sum(roi[:, :5]) > np.sum(roi[:, -5:]):
+        fil1, fil2 = [-0.5, 0.5], [-0.5, 0, 0.5]
+    else:
+        fil1, fil2 = [0.5, -0.5], [0.5, 0, -0.5]
+    deriv = np.apply_along_axis(lambda a: notebook_deriv1(a, fil1), 1, roi)
+    rows = np.arange(roi.shape[0])
+    fit = np.polyfit(rows, notebook_centroid(deriv * notebook_hamming(roi.shape[1])) - 0.5, 1)
+    fit = np.polyfit(rows, notebook_centroid(deriv), 1)
+    slope = abs(fit[0])
+    roi = roi[: round(math.floor(roi.shape[0] * slope) / slope)]
+    nn = math.ceil(deriv.shape[1] * nbin)
+    nn2 = nn // 2 + 1
+    esf = notebook_project2(roi, fit, nbin)
+    esf[-1] = esf[-2]
+    lsf = notebook_deriv1(esf, fil2)
+    temp = abs(np.fft.fft(lsf))
+    mtf = temp[:nn2] / temp[0] * notebook_fir2fix(nn2, 3)
+    freq = np.arange(nn) / (math.cos(math.atan(-fit[0])) / nbin * nn)
+    nn2out = round(nn2 / 2)
+    return freq[:nn2out], mtf[:nn2out]
+
+
+@pytest.mark.parametrize("angle", [3.0, -5.0, 10.0])
+def test_sfr_matches_the_notebook(angle):
+    roi = edge(angle=angle, noise=5.0)
+    result = sfr(roi)
+    freq, mtf = notebook_sfr(roi)
+    np.testing.assert_allclose(result.freq, freq, rtol=1e-12)
+    np.testing.assert_allclose(result.mtf, mtf, rtol=1e-12)
+    assert result.angle == pytest.approx(-angle, abs=0.05)
+
+
+def test_project2_matches_the_notebook_loop():
+    roi = edge(noise=5.0)
+    fit = np.array([math.tan(math.radians(5)), 30 - math.tan(math.radians(5)) * 60])
+    np.testing.assert_allclose(project2(roi, fit), notebook_project2(roi, fit), rtol=1e-12)
+
+
+def test_project2_fills_empty_bins():
+    # a near-vertical edge leaves bins of the oversampled profile empty
+    roi = edge(h=20, angle=0.5)
+    esf = project2(roi, np.array([math.tan(math.radians(0.5)), 30.0]))
+    assert np.all(np.isfinite(esf))
+
+
+@pytest.mark.parametrize("mid", [None, 20, 33.3])
+def test_kernels_match_the_notebook(mid):
+    np.testing.assert_array_equal(hamming(101, mid), notebook_hamming(101, mid))
+    np.testing.assert_allclose(fir2fix(121, 3), notebook_fir2fix(121, 3), rtol=1e-15)
+
+
+def test_kernels_are_cached_and_read_only():
+    assert fir2fix(121, 3) is fir2fix(121, 3)
+    assert hamming(101) is hamming(101)
+    assert not hamming(101).flags.writeable
+
+
+def test_per_line_windows():
+    mids = np.array([[20.5], [30.0], [41.25]])
+    windows = hamming(101, mids)
+    for window, mid in zip(windows, mids[:, 0]):
+        np.testing.assert_array_equal(window, notebook_hamming(101, mid))
+
+
+def test_mtf_crossing():
+    freq = np.array([0.0, 0.1, 0.2, 0.3])
+    mtf = np.array([1.0, 0.8, 0.4, 0.1])
+    assert mtf_crossing(freq, mtf, 0.5) == pytest.approx(0.175)
+    assert math.isnan(mtf_crossing(freq, mtf, 0.05))
+
+
+def test_sharper_edges_have_higher_mtf50():
+    sharp = sfr(edge(blur=0.8))
+    soft = sfr(edge(blur=2.0))
+    assert mtf_crossing(sharp.freq, sharp.mtf, 0.5) > mtf_crossing(soft.freq, soft.mtf, 0.5)
+
+
+def test_edge_set_matches_sfr():
+    image = np.tile(edge(noise=5.0), (1, 3))
+    rects = [([0, 0], [60, 120]), ([60, 10], [120, 110]), ([120, 0], [180, 100])]
+    with EdgeSet(rects, workers=3) as edges:
+        batch = edges.measure(image)
+    assert batch.mtf.shape == (3, len(edges.freq))
+    for i, (topleft, bottomright) in enumerate(rects):
+        roi = image[topleft[1] : bottomright[1], topleft[0] : bottomright[0]]
+        result = sfr(roi)
+        expected = np.interp(edges.freq, result.freq, result.mtf, left=np.nan, right=np.nan)
+        np.testing.assert_array_equal(batch.mtf[i], expected)
+        assert batch.mtf50[i] == mtf_crossing(result.freq, result.mtf, 0.5)
+        assert batch.angle[i] == result.angle
+
+
+def test_edge_set_checks():
+    with pytest.raises(ValueError):
+        EdgeSet([([10, 0], [10, 20])])
+    with pytest.raises(ValueError):
+        EdgeSet([([0, 0], [10, 20])], workers=0)
+    with pytest.raises(ValueError):
+        EdgeSet([([0, 0], [10, 200])]).measure(np.zeros((100, 100)))
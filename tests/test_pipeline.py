@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from pipeline.pipeline import Pipeline
+from pipeline.preprocess import FlatFieldCorrector
+from pipeline.stages import BinningStage, ClipStage, DarkStage, FlatStage, RoiStage
+from pipeline.tiling import TileScheduler
+
+
+@pytest.fixture
+def calibration():
+    rng = np.random.default_rng(0)
+    dark = rng.integers(90, 110, (60, 40)).astype(np.uint16)
+    bright = (dark + rng.integers(1000, 3000, dark.shape)).astype(np.uint16)
+    raw = (dark + rng.integers(0, 4000, dark.shape)).astype(np.uint16)
+    return raw, dark, bright
+
+
+def test_fused_stages_match_flat_field_corrector(calibration):
+    raw, dark, bright = calibration
+    corrector = FlatFieldCorrector(dark, bright)
+    pipeline = Pipeline([DarkStage(corrector.dark), FlatStage(corrector.gain)])
+    assert len(pipeline.groups) == 1
+    np.testing.assert_array_equal(pipeline.run(raw), corrector.apply(raw))
+
+
+def test_tiled_matches_untiled(calibration):
+    raw, dark, bright = calibration
+    corrector = FlatFieldCorrector(dark, bright)
+
+    def stages():
+        return [DarkStage(corrector.dark), FlatStage(corrector.gain), ClipStage(0, 2000)]
+
+    untiled = Pipeline(stages()).run(raw).copy()
+    with TileScheduler(tile_height=7, workers=4) as scheduler:
+        tiled = Pipeline(stages(), scheduler).run(raw)
+    np.testing.assert_array_equal(tiled, untiled)
+
+
+def test_binning_and_roi(calibration):
+    raw, dark, _ = calibration
+    pipeline = Pipeline(
+        [RoiStage([4, 10], [36, 50]), BinningStage((2, 2)), DarkStage(np.zeros((20, 16)))]
+    )
+    out = pipeline.run(raw)
+    crop = raw[10:50, 4:36].astype(np.float64)
+    expected = crop.reshape(20, 2, 16, 2).mean(axis=(1, 3))
+    np.testing.assert_allclose(out, expected, rtol=1e-6)
+    assert pipeline.timings.keys() == {"roi", "binning", "dark"}
+
+
+def test_out_and_input_untouched(calibration):
+    raw, dark, _ = calibration
+    before = raw.copy()
+    out = np.empty(raw.shape, dtype=np.uint16)
+    result = Pipeline([DarkStage(dark), ClipStage(0, 0xFFFF)]).run(raw, out=out)
+    assert result is out
+    np.testing.assert_array_equal(out, np.clip(raw.astype(np.float32) - dark, 0, 0xFFFF))
+    np.testing.assert_array_equal(raw, before)
+
+
+def test_stage_names_must_be_unique():
+    with pytest.raises(ValueError):
+        Pipeline([ClipStage(0, 1), ClipStage(0, 2)])
+    Pipeline([("low", ClipStage(0, 1)), ("high", ClipStage(0, 2))])
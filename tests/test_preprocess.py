@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from pipeline.dark import DarkModel
+from pipeline.preprocess import FlatFieldCorrector, subtract_dark
+from pipeline.tiling import TileScheduler
+
+
+@pytest.fixture
+def calibration():
+    rng = np.random.default_rng(0)
+    dark = rng.integers(90, 110, (64, 48)).astype(np.uint16)
+    bright = (dark + rng.integers(1000, 3000, dark.shape)).astype(np.uint16)
+    raw = (dark + rng.integers(0, 2000, dark.shape)).astype(np.uint16)
+    return raw, dark, bright
+
+
+def test_matches_formula(calibration):
+    raw, dark, bright = calibration
+    flat = bright.astype(np.float64) - dark
+    expected = (raw.astype(np.float64) - dark) * flat.mean() / flat
+    out = FlatFieldCorrector(dark, bright).apply(raw)
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out, expected, rtol=1e-5)
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.uint16])
+def test_tiled_matches_untiled(calibration, dtype):
+    raw, dark, bright = calibration
+    corrector = FlatFieldCorrector(dark, bright)
+    untiled = corrector.apply(raw, out=np.empty(raw.shape, dtype=dtype))
+    with TileScheduler(tile_height=5, workers=4) as scheduler:
+        tiled = corrector.apply(raw, out=np.empty(raw.shape, dtype=dtype), scheduler=scheduler)
+    np.testing.assert_array_equal(tiled, untiled)
+
+
+def test_uint16_output_is_rounded_and_clipped(calibration):
+    raw, dark, bright = calibration
+    corrector = FlatFieldCorrector(dark, bright)
+    out = corrector.apply(raw, out=np.empty(raw.shape, dtype=np.uint16))
+    expected = np.clip(np.rint(corrector.apply(raw)), 0, 0xFFFF)
+    np.testing.assert_array_equal(out, expected)
+
+
+def test_dead_pixels_are_zero(calibration):
+    raw, dark, bright = calibration
+    bright = bright.copy()
+    bright[3, 4] = dark[3, 4]
+    assert FlatFieldCorrector(dark, bright).apply(raw)[3, 4] == 0
+
+
+def test_dark_model_follows_exposure(calibration):
+    raw, dark, bright = calibration
+    model = DarkModel(dark.astype(np.float32), np.full(dark.shape, 0.5, dtype=np.float32))
+    corrector = FlatFieldCorrector(model, bright + 50, exposure_time=100)
+    out = corrector.apply(raw, exposure_time=200)
+    dark_200 = model.synthesize(200)
+    np.testing.assert_array_equal(corrector.dark, dark_200)
+    expected = np.subtract(raw, dark_200, dtype=np.float32) * corrector.gain
+    np.testing.assert_array_equal(out, expected)
+
+
+def test_fixed_dark_frame_rejects_other_exposures(calibration):
+    raw, dark, bright = calibration
+    corrector = FlatFieldCorrector(dark, bright, exposure_time=100)
+    with pytest.raises(ValueError):
+        corrector.apply(raw, exposure_time=200)
+
+
+def test_shape_mismatch(calibration):
+    raw, dark, bright = calibration
+    with pytest.raises(ValueError):
+        FlatFieldCorrector(dark, bright[:-1])
+    with pytest.raises(ValueError):
+        FlatFieldCorrector(dark, bright).apply(raw[:-1])
+
+
+def test_subtract_dark_tiled(calibration):
+    raw, dark, _ = calibration
+    with TileScheduler(tile_height=3, workers=2) as scheduler:
+        out = subtract_dark(raw, dark, scheduler=scheduler)
+    np.testing.assert_array_equal(out, raw.astype(np.float32) - dark)
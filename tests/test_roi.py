@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from pipeline.roi import ROI_DTYPE, ROISet
+
+
+def random_rois(rng, count, shape, size):
+    rois = np.empty(count, dtype=ROI_DTYPE)
+    rois["left"] = rng.integers(0, shape[1] - size + 1, count)
+    rois["top"] = rng.integers(0, shape[0] - size + 1, count)
+    rois["right"] = rois["left"] + size
+    rois["bottom"] = rois["top"] + size
+    rois["mask"] = -1
+    return rois
+
+
+def reference(frame, rois):
+    crops = [frame[r["top"] : r["bottom"], r["left"] : r["right"]] for r in rois]
+    return (
+        np.array([c.mean(dtype=np.float64) for c in crops]),
+        np.array([c.std(dtype=np.float64) for c in crops]),
+        np.array([c.min() for c in crops]),
+        np.array([c.max() for c in crops]),
+    )
+
+
+@pytest.mark.parametrize("count", [3, 400])
+@pytest.mark.parametrize("dtype", [np.uint16, np.float32])
+def test_matches_numpy(count, dtype):
+    rng = np.random.default_rng(count)
+    frame = (rng.random((120, 90)) * 4095).astype(dtype)
+    rois = random_rois(rng, count, frame.shape, 20)
+    roi_set = ROISet(rois, frame.shape)
+    # a few ROIs gather, hundreds overlap enough for the summed-area path
+    assert (roi_set.bbox is not None) == (count > 100)
+
+    result = roi_set.measure(frame, extrema=True)
+    mean, std, low, high = reference(frame, rois)
+    np.testing.assert_allclose(result["mean"], mean, rtol=1e-6)
+    np.testing.assert_allclose(result["std"], std, rtol=1e-5)
+    np.testing.assert_array_equal(result["min"], low)
+    np.testing.assert_array_equal(result["max"], high)
+    np.testing.assert_array_equal(result["count"], 400)
+
+
+def test_extrema_only_when_asked():
+    frame = np.ones((10, 10), dtype=np.uint16)
+    result = ROISet.from_rects([([0, 0], [5, 5])], frame.shape).measure(frame)
+    assert np.isnan(result["min"]).all() and np.isnan(result["max"]).all()
+
+
+def test_variance_around_large_offset():
+    rng = np.random.default_rng(1)
+    frame = 1e6 + rng.normal(0, 1e-2, (64, 64))
+    rois = random_rois(rng, 500, frame.shape, 16)
+    result = ROISet(rois, frame.shape).measure(frame)
+    np.testing.assert_allclose(result["std"], reference(frame, rois)[1], rtol=1e-6)
+
+
+def test_summed_area_bands_match_single_band(monkeypatch):
+    rng = np.random.default_rng(2)
+    frame = rng.integers(0, 4096, (50, 40), dtype=np.uint16)
+    rois = random_rois(rng, 300, frame.shape, 10)
+    expected = ROISet(rois, frame.shape).measure(frame)
+    # a band of a couple of rows, so ROI corners fall in many bands
+    monkeypatch.setattr("pipeline.roi.SAT_BAND_BYTES", 2 * 41 * 8)
+    result = ROISet(rois, frame.shape).measure(frame)
+    np.testing.assert_array_equal(result["mean"], expected["mean"])
+    np.testing.assert_array_equal(result["std"], expected["std"])
+
+
+def test_masked_roi():
+    frame = np.arange(16, dtype=np.uint16).reshape(4, 4)
+    rois = np.array([(0, 0, 2, 2, 0)], dtype=ROI_DTYPE)
+    mask = np.array([[True, False], [False, True]])
+    result = ROISet(rois, frame.shape, [mask]).measure(frame, extrema=True)
+    assert result["count"][0] == 2
+    assert result["mean"][0] == 2.5
+    assert (result["min"][0], result["max"][0]) == (0, 5)
@@ -0,0 +1,76 @@
+from plugins.vmb_camera.session import CameraSession
+
+
+class Feature:
+    def __init__(self, log, name):
+        self.log = log
+        self.name = name
+        self.value = None
+
+    def set(self, value):
+        self.log.append(("set", self.name, value))
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class Camera:
+    def __init__(self):
+        self.log = []
+        self.ExposureTime = Feature(self.log, "ExposureTime")
+        self.pixel_format = "Mono8"
+
+    def __enter__(self):
+        self.log.append("open")
+
+    def __exit__(self, *exc):
+        self.log.append("close")
+
+    def set_pixel_format(self, pixel_format):
+        self.log.append(("format", pixel_format))
+        self.pixel_format = pixel_format
+
+    def get_pixel_format(self):
+        return self.pixel_format
+
+
+def test_only_the_outermost_holder_opens_and_closes():
+    camera = Camera()
+    session = CameraSession(camera)
+    with session:
+        for _ in range(3):
+            with session:
+                assert session.is_open
+    assert camera.log == ["open", "close"]
+    assert not session.is_open
+    assert session.metrics()["opens"] == 1
+
+
+def test_repeated_feature_writes_are_skipped():
+    camera = Camera()
+    session = CameraSession(camera)
+    with session:
+        assert session.set_feature("ExposureTime", 1000.0)
+        assert not session.set_feature("ExposureTime", 1000.0)
+        assert session.set_feature("ExposureTime", 2000.0)
+        assert session.set_pixel_format("Mono12")
+        assert not session.set_pixel_format("Mono12")
+        assert session.get_feature("ExposureTime") == 2000.0
+    assert session.metrics()["writes"] == 3
+    assert session.metrics()["skipped_writes"] == 2
+
+
+def test_closing_forgets_the_written_values():
+    camera = Camera()
+    session = CameraSession(camera)
+    with session:
+        session.set_feature("ExposureTime", 1000.0)
+    with session:
+        assert session.set_feature("ExposureTime", 1000.0)
+    assert camera.log.count(("set", "ExposureTime", 1000.0)) == 2
+
+
+def test_other_attributes_are_the_cameras():
+    camera = Camera()
+    assert CameraSession(camera).ExposureTime is camera.ExposureTime
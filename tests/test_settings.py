@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("dotenv")
+
+from oicp_server.oicp_server import settings  # noqa: E402
+
+
+@pytest.fixture
+def environ(monkeypatch):
+    # load_dotenv writes into os.environ; start clean and restore it after,
+    # setting each name first so that monkeypatch removes it again
+    for name in list(os.environ):
+        if name.upper().startswith("OICP_SERVER_"):
+            monkeypatch.delenv(name)
+    with open(settings.EMULATOR_ENV) as f:
+        for line in f:
+            name = line.split("=", 1)[0].strip()
+            if name:
+                monkeypatch.setenv(name, "")
+                monkeypatch.delenv(name)
+    return monkeypatch
+
+
+def test_defaults_to_vimba_without_loading_a_file(environ):
+    assert settings.get_dotenv_path() is None
+    assert settings.get_settings().camera_backend == "vmb"
+
+
+def test_emulator_loads_the_bundled_file(environ):
+    environ.setenv("OICP_SERVER_emulator", "1")
+    assert settings.get_dotenv_path() == settings.EMULATOR_ENV
+    assert settings.get_settings().camera_backend == "simulated"
+
+
+def test_dot_env_path_loads_any_file(environ, tmp_path):
+    path = tmp_path / "server.env"
+    path.write_text("OICP_SERVER_camera_backend=simulated\n")
+    environ.setenv("OICP_SERVER_dot_env_path", str(path))
+    assert settings.get_settings().camera_backend == "simulated"
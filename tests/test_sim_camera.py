@@ -0,0 +1,61 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyee")
+pytest.importorskip("cv2")
+
+from plugins.sim_camera.api import SimulatedCamera  # noqa: E402
+
+
+def test_frames_are_scaled_to_the_exposure():
+    camera = SimulatedCamera("sim", 64, 48, "Mono12")
+    camera._build_patterns()
+    at_reference = camera.frame(0).astype(np.float64)
+    asyncio.run(camera.set_integration_time(camera.exposure / 2))
+    half = camera.frame(0).astype(np.float64)
+    np.testing.assert_allclose(half, at_reference / 2, atol=1)
+
+
+@pytest.mark.parametrize("pixel_format", ["Mono10p", "Mono12p"])
+def test_packed_frames_unpack_to_the_unpacked_format(pixel_format):
+    packed = SimulatedCamera("sim", 64, 48, pixel_format)
+    unpacked = SimulatedCamera("sim", 64, 48, pixel_format[:-1])
+    for camera in (packed, unpacked):
+        camera._build_patterns()
+    assert packed.bank[0].dtype == np.uint8
+    np.testing.assert_array_equal(packed.frame(1), unpacked.frame(1))
+
+
+def test_frames_are_rendered_only_when_taken():
+    camera = SimulatedCamera("sim", 64, 48, "Mono8", bank_size=4)
+    camera._build_patterns()
+    asyncio.run(camera.set_integration_time(2000))
+    assert camera._bank_exposures == [None] * 4
+    camera.frame(2)
+    assert camera._bank_exposures == [None, None, 2000.0, None]
+
+
+def test_armed_camera_delivers_triggered_frames():
+    async def main():
+        camera = SimulatedCamera("sim", 64, 48, "Mono8", fps=500)
+        await camera.init()
+        await camera.open()
+        await camera.arm_swtrigger(
+            {"exposure_time_hint": 10000, "pixel_format": "Mono12p", "ring_size": 3}
+        )
+        while not camera.is_armed:
+            await asyncio.sleep(0.01)
+        try:
+            assert len(camera.ring) == 3
+            lease = await camera.trigger_and_wait()
+            with lease:
+                assert lease.array.dtype == np.uint16
+                assert lease.array.max() <= camera.max_value() == 4095
+            return await camera.auto_expose(target=0.5)
+        finally:
+            await camera.deinit()
+
+    report = asyncio.run(main())
+    assert report["converged"]
@@ -0,0 +1,62 @@
+import json
+
+import numpy as np
+import pytest
+
+from pipeline import statistics
+from pipeline.statistics import FrameStatistics
+
+
+@pytest.fixture
+def frame():
+    return np.random.default_rng(0).integers(0, 4096, (60, 80)).astype(np.uint16)
+
+
+def test_moments_and_extremes(frame):
+    stats = FrameStatistics.from_frame(frame, 4095)
+    assert stats.count == frame.size
+    assert stats.mean == pytest.approx(frame.mean(), rel=1e-12)
+    assert stats.std == pytest.approx(frame.std(), rel=1e-12)
+    assert (stats.min, stats.max) == (frame.min(), frame.max())
+    assert stats.saturated == np.count_nonzero(frame == 4095)
+
+
+def test_percentiles_match_inverted_cdf(frame):
+    q = [0.1, 1, 50, 99, 99.9, 100]
+    stats = FrameStatistics.from_frame(frame, 4095)
+    expected = np.percentile(frame, q, method="inverted_cdf")
+    np.testing.assert_array_equal(stats.percentile(q), expected)
+
+
+def test_histogram_matches_numpy(frame):
+    stats = FrameStatistics.from_frame(frame, 4095)
+    for bins, range in ((10, None), (7, (100, 3000))):
+        hist, edges = stats.histogram(bins, range)
+        expected, expected_edges = np.histogram(frame, bins, range or (0, 4095))
+        np.testing.assert_array_equal(hist, expected)
+        np.testing.assert_allclose(edges, expected_edges)
+
+
+def test_bands_and_high_codes(frame, monkeypatch):
+    monkeypatch.setattr(statistics, "BAND_PIXELS", 100)
+    frame = frame.copy()
+    frame[0, :3] = 5000
+    stats = FrameStatistics.from_frame(frame, 4095)
+    assert stats.count == frame.size
+    assert stats.saturated == np.count_nonzero(frame >= 4095)
+
+
+def test_channel_axis_and_decimation(frame):
+    stats = FrameStatistics.from_frame(frame[..., None], 4095, step=4)
+    expected = FrameStatistics.from_frame(np.ascontiguousarray(frame[::4, ::4]), 4095)
+    np.testing.assert_array_equal(stats.counts, expected.counts)
+
+
+def test_as_dict_is_json(frame):
+    summary = FrameStatistics.from_frame(frame, 4095).as_dict()
+    assert json.loads(json.dumps(summary))["count"] == frame.size
+
+
+def test_needs_unsigned_frames():
+    with pytest.raises(TypeError):
+        FrameStatistics.from_frame(np.zeros((2, 2), dtype=np.int16), 4095)
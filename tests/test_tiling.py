@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from pipeline.tiling import TileScheduler, for_each_band, row_band
+
+
+def test_bands_cover_every_row_once():
+    bands = TileScheduler(tile_height=7).bands(100)
+    rows = np.concatenate([np.arange(100)[band] for band in bands])
+    np.testing.assert_array_equal(rows, np.arange(100))
+
+
+def test_bands_are_sized_from_tile_bytes():
+    bands = TileScheduler(tile_bytes=1000).bands(50, row_bytes=100)
+    assert [band.stop - band.start for band in bands] == [10] * 5
+
+
+@pytest.mark.parametrize("workers", [0, -1])
+def test_workers_must_be_positive(workers):
+    with pytest.raises(ValueError):
+        TileScheduler(workers=workers)
+
+
+def test_workers_default_to_cpu_count():
+    assert TileScheduler().workers >= 1
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_run_visits_every_row_once(workers):
+    # leading axes are carried along; bands split axis -2
+    frame = np.zeros((2, 100, 40), dtype=np.int32)
+
+    def _rows(rows):
+        row_band(frame, rows)[:] += 1
+
+    with TileScheduler(tile_height=7, workers=workers) as scheduler:
+        scheduler.run(_rows, frame)
+    assert np.all(frame == 1)
+
+
+def test_for_each_band_without_scheduler_takes_all_rows():
+    seen = []
+    for_each_band(seen.append, np.zeros((5, 3)))
+    assert seen == [slice(None)]
@@ -0,0 +1,15 @@
+import numpy as np
+import pytest
+
+from pipeline.unpack import pack_mono10p, pack_mono12p, unpack_mono10p, unpack_mono12p
+
+
+@pytest.mark.parametrize(
+    "pack, unpack, bits",
+    [(pack_mono10p, unpack_mono10p, 10), (pack_mono12p, unpack_mono12p, 12)],
+)
+def test_unpack_round_trip(pack, unpack, bits):
+    frame = np.random.default_rng(0).integers(0, 1 << bits, (48, 64), dtype=np.uint16)
+    out = np.empty_like(frame)
+    assert unpack(pack(frame), frame.shape, out) is out
+    np.testing.assert_array_equal(out, frame)
@@ -0,0 +1,42 @@
+import numpy as np
+
+from pipeline.tiling import TileScheduler
+from pipeline.vignetting import (
+    RadialFlatModel,
+    _evaluate_field,
+    fit_radial_model,
+    radial_field,
+)
+
+COEFFS = (-1e-9, 2e-7, -4e-3, 0.0, 3000.0)
+
+
+def test_field_matches_polyval():
+    field = radial_field(COEFFS, (60, 80), (25.0, 42.0))
+    y, x = np.mgrid[0:60, 0:80]
+    expected = np.polyval(COEFFS, np.hypot(y - 25.0, x - 42.0))
+    np.testing.assert_allclose(field, expected, rtol=1e-5)
+
+
+def test_fields_are_cached_read_only():
+    field = radial_field(COEFFS, (60, 80))
+    assert radial_field(COEFFS, (60, 80)) is field
+    assert not field.flags.writeable
+
+
+def test_tiled_matches_untiled():
+    key = (COEFFS, (61, 80), (30.0, 40.0))
+    with TileScheduler(tile_height=4, workers=4) as scheduler:
+        tiled = _evaluate_field(*key, scheduler)
+    np.testing.assert_array_equal(tiled, _evaluate_field(*key, TileScheduler(workers=1)))
+
+
+def test_fit_recovers_a_radial_field():
+    flat = np.array(radial_field(COEFFS, (200, 300)), dtype=np.float64)
+    model = fit_radial_model(flat, deg=4, step=2)
+    np.testing.assert_allclose(model.field(), flat, rtol=1e-4)
+
+
+def test_model_round_trips_through_an_array():
+    model = RadialFlatModel(COEFFS, (25.0, 42.0), (60, 80))
+    assert RadialFlatModel.from_array(model.to_array()) == model
@@ -0,0 +1,66 @@
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from plugins.vmb_camera.buffers import FrameRing, RingPolicy  # noqa: E402
+from plugins.vmb_camera.writer import FrameWriter  # noqa: E402
+
+
+def test_writes_and_releases(tmp_path):
+    ring = FrameRing((4, 6), np.uint16, count=2)
+    writer = FrameWriter("npy", workers=2)
+    for i in range(5):
+        lease = ring.acquire(timeout=1)
+        lease.array.fill(i)
+        assert writer.submit(lease, str(tmp_path / "frame{}".format(i)))
+    writer.shutdown()
+    assert writer.metrics()["written"] == 5
+    assert ring.metrics()["held"] == 0
+    np.testing.assert_array_equal(np.load(tmp_path / "frame3.npy"), 3)
+
+
+def test_full_queue_drops_and_releases(tmp_path, monkeypatch):
+    ring = FrameRing((4, 6), np.uint16, count=4)
+    writer = FrameWriter("npy", workers=1, max_pending=1)
+    writing = threading.Event()
+    proceed = threading.Event()
+    save = np.save
+
+    def slow_save(path, array):
+        writing.set()
+        proceed.wait(5)
+        save(path, array)
+
+    monkeypatch.setattr(np, "save", slow_save)
+    assert writer.submit(ring.acquire(), str(tmp_path / "0"))
+    assert writing.wait(5)
+    # the writer thread is busy with frame 0, frame 1 fills the queue
+    assert writer.submit(ring.acquire(), str(tmp_path / "1"))
+    assert not writer.submit(ring.acquire(), str(tmp_path / "2"))
+    proceed.set()
+    writer.shutdown()
+    assert (writer.written, writer.dropped) == (2, 1)
+    assert ring.metrics()["held"] == 0
+
+
+def test_overwritten_frames_are_removed(tmp_path):
+    ring = FrameRing((4, 6), np.uint16, count=1, policy=RingPolicy.OverwriteOldest)
+    writer = FrameWriter("npy", workers=1)
+    lease = ring.acquire()
+    # the ring hands the buffer out again before the writer gets to it
+    ring.acquire()
+    writer.submit(lease, str(tmp_path / "stale"))
+    writer.shutdown()
+    assert writer.overwritten == 1
+    assert not (tmp_path / "stale.npy").exists()
+
+
+def test_format_and_params():
+    with pytest.raises(ValueError):
+        FrameWriter("bmp")
+    assert FrameWriter("png", compression=3).params[1] == 3
+    assert FrameWriter("npy", compression=3).params == []
+    assert FrameWriter("tiff").path("a") == "a.tiff"